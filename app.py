@@ -1,37 +1,34 @@
 import streamlit as st
-import os
 import logging
+import pandas as pd
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
 
-from src.utils.report_generator import generate_pdf_report
-from src.core.data_loader import load_data
-from src.core.model_trainer import train_model
-from src.core.predictor import make_prediction
+from src.utils.report_generator import render_pdf_report, report_filename
+from src.utils.report_store import get_report_store
+from src.core.engines import FOREST_ENGINES, load_engine
+from src.core.feature_store import load_feature_matrix
+from src.core.model_trainer import MODEL_PATH
+from src.core.model_registry import ModelRegistry, ensure_model
+from src.core.prob_table import with_prob_table
+from src.core.result_store import ResultStore
+from src.core.retrainer import ModelHandle, follow_registry
+from src.core.scheduler import PredictionBatcher, BoundedExecutor
+from src.snapshot import load_snapshot
+from src.core.explainer import explain_prediction, format_contributions
+from src.core.errors import DataLoadError, ModelError, PredictionError, SchedulerBusyError
+from src.utils.assets import inject_page_style
 from src.utils.visualizer import plot_qchat_score
-from src.config import DATA_PATH, QCHAT_THRESHOLD, FEATURE_COLS, QUESTIONS, OPTIONS, image1, image2
+from src.utils.logging_setup import configure_logging
+from src.utils.metrics import snapshot as metrics_snapshot, start_metrics_writer, timed
+from src.config import QCHAT_THRESHOLD, FEATURE_COLS, QUESTIONS, OPTIONS, image1, image2, AGE_MIN, AGE_MAX, USE_PROB_TABLE, METRICS_FILE, FAST_START, SCORING_ENGINE
 
-# Setup logging
-LOG_FILE = r'logs/asd_app.log'
-os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
-logging.basicConfig(filename=LOG_FILE, level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Setup logging (queued JSON lines in logs/asd_app.log, written off the request thread)
+configure_logging()
+logger = logging.getLogger(__name__)
 
 # Set page
 st.set_page_config(page_title="ASD Screening test", layout="centered")
-st.markdown("""
-    <style>
-    .stApp {
-        font-family: 'Segoe UI', Arial, sans-serif;
-        font-size: 18px;
-    }
-    h1 {
-        font-family: 'Trebuchet MS', Arial, sans-serif;
-        color: white;
-        font-size: 2.5em;
-        font-weight: bold;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+inject_page_style()
 st.title("🧠 Autism Spectrum Disorder - Prediction system (Screening test)")
 st.write("This app predicts ASD likelihood based on Q-CHAT-10 responses and provides a downloadable PDF report.")
 st.markdown(f"- **Disclaimer**: This app is for educational purposes only and might be used for medical diagnosis.")
@@ -39,36 +36,77 @@ st.markdown("---")
 
 # === Caching the data and model ===
 @st.cache_resource(show_spinner="🔃 Loading and training model...")
+def get_registry():
+    return ModelRegistry()
+
+@st.cache_resource(show_spinner="🔃 Loading and training model...")
+@timed('get_model')
 def get_model():
-    df = load_data()
-    model = train_model(df)
-    return model
+    registry = get_registry()
+    # A valid warm-start snapshot means the dataset has not changed: skip loading it
+    key = load_snapshot(registry) if FAST_START else None
+    features = None
+    if key is None:
+        try:
+            # Memory-mapped encoded arrays; the raw table is never held in memory
+            features = load_feature_matrix()
+        except DataLoadError as e:
+            logger.warning(f"Dataset unavailable, using promoted model only: {e}")
+        key = ensure_model(registry, features, legacy_path=MODEL_PATH)
+    # Memory-mapped forest by default; the handle lets a newly promoted model be hot-swapped in
+    use_table = USE_PROB_TABLE and SCORING_ENGINE in FOREST_ENGINES
+    wrap = (lambda m: with_prob_table(m, registry.model_path())) if use_table else None
+    return ModelHandle(load_engine(SCORING_ENGINE, registry, key), wrap=wrap, key=key)
 
 try:
-    model = get_model()
+    model_handle = get_model()
+    # Pick up a model promoted by `python -m src.core.retrainer` (or a rollback) since the last page load
+    follow_registry(model_handle, get_registry(), SCORING_ENGINE)
+except ModelError as e:
+    logger.error(f"Model loading/training failed: {e}")
+    st.error(f"Failed to load data or train model: {e}")
+    st.stop()
 except Exception as e:
-    logging.error(f"Model loading/training failed: {e}")
+    logger.error(f"Model loading/training failed: {e}")
     st.error("Failed to load data or train model.")
     st.stop()
 
-# === Threaded Prediction ===
-def make_prediction_async(model, *args):
-    with ThreadPoolExecutor() as executor:
-        future = executor.submit(make_prediction, model, *args)
-        return future.result()
+# === Shared scheduler (one per process, shared by all sessions) ===
+@st.cache_resource
+def get_prediction_batcher(_model_handle):
+    return PredictionBatcher(_model_handle, FEATURE_COLS, QCHAT_THRESHOLD)
+
+@st.cache_resource
+def get_report_executor():
+    return BoundedExecutor(max_workers=2, max_pending=16, name="pdf-report")
+
+@st.cache_resource
+def get_result_store():
+    return ResultStore()
+
+@st.cache_resource
+def get_metrics_writer():
+    return start_metrics_writer(METRICS_FILE)
+
+get_metrics_writer()
+prediction_batcher = get_prediction_batcher(model_handle)
+report_executor = get_report_executor()
+result_store = get_result_store()
+
+def make_prediction_async(answers, jaundice, family_asd, age_mons):
+    return prediction_batcher.predict(answers, jaundice, family_asd, age_mons, timeout=30)
 
-# === Threaded PDF Generation ===
 def generate_report_async(data):
-    with ThreadPoolExecutor() as executor:
-        future = executor.submit(generate_pdf_report, data)
-        return future.result()
+    # Identical results reuse the stored PDF instead of rendering it again
+    _, pdf_bytes = report_executor.submit(get_report_store().get, data, render_pdf_report).result(timeout=60)
+    return pdf_bytes
 
 # === Form Input ===
 with st.form("ASD Form"):
     answers = [st.selectbox(q, [''] + OPTIONS, key=f"q{i}", index=0) for i, q in enumerate(QUESTIONS)]
     jaundice = st.radio("Was the child born with jaundice?", ['Yes', 'No'])
     family_asd = st.radio("Is there a family member with ASD?", ['Yes', 'No'])
-    age_mons = st.slider("Age of child (months):", 12, 48, 24)
+    age_mons = st.slider("Age of child (months):", AGE_MIN, AGE_MAX, 24)
     sex = st.radio('Gender of the toddler', ['M', 'F'])
     ethnicity = st.text_input('Enter the Ethnicity of the toddler')
     who_completed = st.selectbox("Who completed the test?", ['Mother', 'Parent', 'Health Care Professional', 'Family member'], index=0)
@@ -78,17 +116,27 @@ with st.form("ASD Form"):
 if submitted:
     if '' in answers:
         st.error("Please answer all the questions before submitting.")
-        logging.warning("Incomplete form submitted.")
+        logger.warning("Incomplete form submitted.")
     else:
         try:
             qchat_score, ml_result, proba, binary_answers = make_prediction_async(
-                model, answers, jaundice, family_asd, age_mons, FEATURE_COLS, QCHAT_THRESHOLD
+                answers, jaundice, family_asd, age_mons
             )
 
             st.subheader("🔎 Results")
             st.markdown(f"- **Q-Chat-10 Score**: `{qchat_score}`")
             st.markdown(f"- **Prediction**: `{ml_result}`")
             st.markdown(f"- **Confidence**: `{proba:.2f}`")
+            try:
+                # Walks the same trees that produced proba (about a millisecond)
+                explanation = explain_prediction(model_handle.get(), binary_answers, jaundice, family_asd,
+                                                 age_mons, FEATURE_COLS)
+                st.markdown("- **Answers with the largest effect on the confidence**: "
+                            + ", ".join(f"`{line}`" for line in format_contributions(explanation['contributions'])))
+            except PredictionError as e:
+                # Expected with the linear and tree engines
+                logger.debug(f"Could not explain prediction: {e}")
+                explanation = None
             plot_qchat_score(qchat_score)
 
             # === Result Data ===
@@ -106,32 +154,49 @@ if submitted:
                 'Family with ASD': family_asd,
                 'Who Completed': who_completed,
             }
+            if explanation:
+                result_data['Contributions'] = explanation['contributions']
+            # Queued for the background writer; never blocks or fails the request
+            result_store.record(result_data)
 
             st.markdown("---")
             st.subheader("📄 Generate Your Report")
 
             try:
-                pdf_path = generate_report_async(result_data)
-                if pdf_path and os.path.exists(pdf_path):
-                    with open(pdf_path, "rb") as f:
-                        st.download_button(
-                            label="Download ASD Report (PDF)",
-                            data=f,
-                            file_name=os.path.basename(pdf_path),
-                            mime="application/pdf"
-                        )
+                pdf_bytes = generate_report_async(result_data)
+                if pdf_bytes:
+                    file_name = report_filename(result_data)
+                    st.download_button(
+                        label="Download ASD Report (PDF)",
+                        data=pdf_bytes,
+                        file_name=file_name,
+                        mime="application/pdf"
+                    )
                     st.success("✅ Report successfully generated.")
-                    logging.info(f"PDF report generated: {pdf_path}")
+                    logger.info(f"PDF report generated in memory: {file_name}")
                 else:
                     st.error("❌ Failed to generate report. Check logs.")
-                    logging.error("PDF path does not exist or is empty.")
+                    logger.error("PDF report rendering returned no data.")
+            except SchedulerBusyError as e:
+                logger.warning(f"Report queue full: {e}")
+                st.warning("⏳ The server is busy generating reports. Please try again in a moment.")
             except Exception as e:
-                logging.error(f"Failed to generate or offer PDF: {e}")
+                logger.error(f"Failed to generate or offer PDF: {e}")
                 st.error("Failed to generate report.")
 
+        except PredictionError as e:
+            logger.error(f"Prediction failed: {e}")
+            st.error(f"Prediction failed: {e}")
         except Exception as e:
-            logging.error(f"Prediction failed: {e}")
+            logger.error(f"Prediction failed: {e}")
             st.error("Prediction failed. Please try again.")
 
 # === Sidebar Footer ===
+with st.sidebar.expander("Scheduler stats"):
+    st.json({'prediction': prediction_batcher.stats(), 'report': report_executor.stats(),
+             'result_store': result_store.stats(), 'report_store': get_report_store().stats()})
+with st.sidebar.expander("Stage latency"):
+    st.dataframe(pd.DataFrame.from_dict(metrics_snapshot(), orient='index'))
+with st.sidebar.expander("Model"):
+    st.json({'model_version': model_handle.version, 'model_key': model_handle.key})
 st.sidebar.info("Developed with ❤️ using Streamlit by Code-Craft")
@@ -0,0 +1,341 @@
+# loadtest.py
+"""
+Load-test the Streamlit app by driving app.py headlessly.
+
+Each simulated parent is a Streamlit AppTest session. The session opens
+the page, answers the 10 Q-CHAT questions (plus the child's details) at
+random, and submits the `ASD Form`. It counts as successful when the
+script runs without an exception and shows the report's success message.
+
+Concurrency comes from --concurrency threads in one process by default
+(--mode threads), each running its share of the sessions back to back
+after a shared warm-up. Like the threads of one `streamlit run` server,
+the sessions share the process's cached resources, so they contend on the
+same PredictionBatcher, report executor and result-store writer; the report
+counts the prediction batches formed during the run (mean_batch_size).
+
+--mode processes runs one worker process per unit of concurrency instead.
+Each loads the app once, like one server replica, and runs its sessions one
+at a time, so its sessions never share those components and throughput
+measures independent replicas competing for CPU. The report says which
+model was used (concurrency_model).
+
+Every session object is kept until the end, so the growth of a process's
+resident memory divided by its session count approximates the memory cost
+per session.
+
+The result store, report store, logs and metrics are redirected to a
+temporary directory, so a run never touches the deployment's files.
+Everything runs offline on one machine.
+
+Usage:
+    python -m benchmarks.loadtest --sessions 200 --concurrency 8
+    python -m benchmarks.loadtest --sessions 200 --concurrency 8 --mode processes
+    python -m benchmarks.loadtest --sessions 50 --concurrency 4 --engine linear -o loadtest.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+APP_PATH = 'app.py'
+SUCCESS_TEXT = 'Report successfully generated'
+CONCURRENCY_NOTES = {
+    'threads': "concurrent sessions run on threads of one process and share its prediction batcher, "
+               "report executor and result store, like one streamlit run server",
+    'processes': "sessions run one at a time inside each worker process; concurrent sessions never share "
+                 "the in-process prediction batcher, report executor or result store",
+}
+
+
+def rss_bytes():
+    """
+    Returns: Resident set size of this process (0 where /proc is unavailable).
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def percentiles(samples):
+    """
+    Returns: Dict with the count, mean, p50, p95, p99 and max of samples (seconds).
+    """
+    if not samples:
+        return {'count': 0}
+    values = np.asarray(samples)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'count': len(values), 'mean': float(values.mean()), 'p50': float(p50), 'p95': float(p95),
+            'p99': float(p99), 'max': float(values.max())}
+
+
+def run_session(rng, timeout):
+    """
+    Open the app, fill in the form at random and submit it.
+    Returns: The AppTest session and a dict with load/submit seconds, ok and error.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    from src.config import AGE_MAX, AGE_MIN, OPTIONS
+
+    sample = {'ok': False, 'error': None}
+    start = time.perf_counter()
+    # AppTest resolves relative paths against the calling file
+    at = AppTest.from_file(os.path.abspath(APP_PATH), default_timeout=timeout)
+    try:
+        at.run()
+        loaded = time.perf_counter()
+        sample['load'] = loaded - start
+        for selectbox in at.selectbox[:10]:
+            selectbox.set_value(rng.choice(OPTIONS))
+        for radio in at.radio:
+            radio.set_value(rng.choice(radio.options))
+        at.slider[0].set_value(rng.randint(AGE_MIN, AGE_MAX))
+        at.text_input[0].input(rng.choice(['asian', 'white european', 'middle eastern', 'black', '']))
+        at.button[0].click()
+        at.run()
+        sample['submit'] = time.perf_counter() - loaded
+        if at.exception:
+            sample['error'] = at.exception[0].value
+        elif not any(SUCCESS_TEXT in s.value for s in at.success):
+            sample['error'] = '; '.join(e.value for e in at.error) or 'no report'
+        else:
+            sample['ok'] = True
+    except Exception as e:
+        sample['error'] = f"{type(e).__name__}: {e}"
+    sample['total'] = time.perf_counter() - start
+    return at, sample
+
+
+def measure_sessions(rng, sessions, args, barrier):
+    """
+    Wait for the other workers, then run sessions back to back.
+    Returns: Dict with the samples, start/finish wall-clock times and the kept sessions.
+    """
+    try:
+        barrier.wait(timeout=args.timeout)
+    except threading.BrokenBarrierError:
+        # Another worker did not warm up in time; measure anyway
+        pass
+    started = time.time()
+    kept, samples = [], []
+    for _ in range(sessions):
+        at, sample = run_session(rng, args.timeout)
+        kept.append(at)
+        samples.append(sample)
+    return {'samples': samples, 'started': started, 'finished': time.time(), 'kept': kept}
+
+
+def worker(index, sessions, args, barrier, results):
+    """
+    Warm up one app process, wait for the others, then run sessions back to back.
+    """
+    rng = random.Random(args.seed + index)
+    _, warmup = run_session(rng, args.timeout)
+    baseline_rss = rss_bytes()
+    measured = measure_sessions(rng, sessions, args, barrier)
+    results.put({'warmup': warmup, 'samples': measured['samples'], 'started': measured['started'],
+                 'finished': measured['finished'], 'rss_before': baseline_rss, 'rss_after': rss_bytes()})
+
+
+def run_processes(args, counts):
+    """
+    Returns: One result dict per worker process.
+    """
+    # Spawned workers import the app fresh, as separate server processes would
+    ctx = multiprocessing.get_context('spawn')
+    barrier = ctx.Barrier(len(counts))
+    results = ctx.Queue()
+    processes = [ctx.Process(target=worker, args=(i, c, args, barrier, results)) for i, c in enumerate(counts)]
+    for p in processes:
+        p.start()
+    reports = []
+    while len(reports) < len(processes):
+        try:
+            reports.append(results.get(timeout=1))
+        except queue.Empty:
+            dead = [p for p in processes if p.exitcode not in (None, 0)]
+            if dead:
+                for p in processes:
+                    p.terminate()
+                raise RuntimeError(f"{len(dead)} load-test workers exited early (exit code {dead[0].exitcode})")
+    for p in processes:
+        p.join()
+    return reports
+
+
+def share_server_state():
+    """
+    Make AppTest sessions on different threads share what one `streamlit run`
+    server shares: a single Runtime and a single compiled-script cache.
+    AppTest installs a fresh mock Runtime and ScriptCache for every run and
+    clears the Runtime when the run ends, which breaks the runs still going
+    on other threads (and compiling the page on several threads at once trips
+    an ast.parse race in CPython 3.11).
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+
+
+def run_threads(args, counts):
+    """
+    Warm up the app once in this process, then run the sessions on one thread
+    per unit of concurrency, all sharing the app's cached resources.
+    Returns: A one-element list with the result dict of this process, plus the
+    number of prediction batches formed while measuring.
+    """
+    from src.utils.metrics import snapshot
+
+    share_server_state()
+    _, warmup = run_session(random.Random(args.seed), args.timeout)
+    baseline_rss = rss_bytes()
+    batches_before = snapshot().get('predict_proba_batch', {}).get('count', 0)
+    barrier = threading.Barrier(len(counts))
+    measured = [None] * len(counts)
+
+    def run_thread(i, sessions):
+        measured[i] = measure_sessions(random.Random(args.seed + i + 1), sessions, args, barrier)
+
+    threads = [threading.Thread(target=run_thread, args=(i, c), name=f"loadtest-{i}") for i, c in enumerate(counts)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if any(m is None for m in measured):
+        raise RuntimeError("A load-test thread exited early")
+    batches = snapshot().get('predict_proba_batch', {}).get('count', 0) - batches_before
+    report = {'warmup': warmup, 'samples': [s for m in measured for s in m['samples']],
+              'started': min(m['started'] for m in measured), 'finished': max(m['finished'] for m in measured),
+              'rss_before': baseline_rss, 'rss_after': rss_bytes()}
+    return [report], batches
+
+
+def run(args):
+    """
+    Returns: Load-test report (dict).
+    """
+    counts = [args.sessions // args.concurrency + (i < args.sessions % args.concurrency)
+              for i in range(args.concurrency)]
+    counts = [c for c in counts if c]
+    batches = None
+    if args.mode == 'threads':
+        reports, batches = run_threads(args, counts)
+    else:
+        reports = run_processes(args, counts)
+
+    samples = [s for r in reports for s in r['samples']]
+    ok = [s for s in samples if s['ok']]
+    errors = {}
+    for s in samples:
+        if not s['ok']:
+            errors[s['error']] = errors.get(s['error'], 0) + 1
+    wall = max(r['finished'] for r in reports) - min(r['started'] for r in reports)
+    growth = [(r['rss_after'] - r['rss_before']) / len(r['samples']) for r in reports]
+    return {
+        'sessions': len(samples), 'concurrency': len(counts), 'concurrency_model': args.mode,
+        'concurrency_note': CONCURRENCY_NOTES[args.mode], 'engine': args.engine,
+        'python': platform.python_version(), 'cpus': os.cpu_count(),
+        'succeeded': len(ok), 'failed': len(samples) - len(ok), 'errors': errors,
+        'wall_seconds': wall, 'throughput_per_s': len(ok) / wall if wall else 0.0,
+        'end_to_end': percentiles([s['total'] for s in ok]),
+        'load': percentiles([s['load'] for s in ok]),
+        'submit': percentiles([s['submit'] for s in ok]),
+        'prediction_batches': batches,
+        'mean_batch_size': len(samples) / batches if batches else None,
+        'warmup_seconds': [r['warmup']['total'] for r in reports],
+        'rss_per_process_mb': [r['rss_after'] / 1e6 for r in reports],
+        'memory_growth_per_session_kb': float(np.mean(growth)) / 1e3,
+    }
+
+
+def print_report(report):
+    unit = 'threads' if report['concurrency_model'] == 'threads' else 'worker processes'
+    print(f"{report['succeeded']}/{report['sessions']} sessions succeeded with {report['concurrency']} {unit} "
+          f"in {report['wall_seconds']:.1f} s ({report['throughput_per_s']:.2f} submissions/s)")
+    print(f"  note: {report['concurrency_note']}")
+    for name in ('end_to_end', 'load', 'submit'):
+        stats = report[name]
+        if stats['count']:
+            print(f"  {name:<10} p50 {stats['p50'] * 1e3:8.1f} ms  p95 {stats['p95'] * 1e3:8.1f} ms  "
+                  f"p99 {stats['p99'] * 1e3:8.1f} ms  max {stats['max'] * 1e3:8.1f} ms")
+    if report['prediction_batches']:
+        print(f"  {report['prediction_batches']} prediction batches, {report['mean_batch_size']:.2f} screenings each")
+    print(f"  memory growth {report['memory_growth_per_session_kb']:.0f} KB per session; "
+          f"process RSS {', '.join(f'{mb:.0f}' for mb in report['rss_per_process_mb'])} MB")
+    for error, count in report['errors'].items():
+        print(f"  {count} x {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive app.py with concurrent headless sessions.")
+    parser.add_argument('--sessions', type=int, default=100, help="total form submissions")
+    parser.add_argument('--concurrency', type=int, default=4, help="sessions submitting at once")
+    parser.add_argument('--mode', choices=['threads', 'processes'], default='threads',
+                        help="run concurrent sessions on threads of one process (like one server) "
+                             "or in separate worker processes (like replicas)")
+    parser.add_argument('--engine', default=None, help="ASD_SCORING_ENGINE for the app (default: configured)")
+    parser.add_argument('--timeout', type=float, default=120, help="seconds allowed per script run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help="write the report as JSON")
+    args = parser.parse_args(argv)
+    if args.sessions < 1 or args.concurrency < 1:
+        parser.error("--sessions and --concurrency must be positive")
+    if not os.path.exists(APP_PATH):
+        parser.error(f"{APP_PATH} not found; run from the repository root")
+
+    workdir = tempfile.mkdtemp(prefix='asd-loadtest-')
+    # Set before src.config is imported (here or in the spawned workers)
+    os.environ.update({
+        'ASD_RESULTS_DB': os.path.join(workdir, 'screenings.db'),
+        'ASD_REPORTS_DIR': os.path.join(workdir, 'reports'),
+        'ASD_LOG_FILE': os.path.join(workdir, 'asd_app.log'),
+        'ASD_METRICS_FILE': os.path.join(workdir, 'metrics.prom'),
+    })
+    if args.engine:
+        os.environ['ASD_SCORING_ENGINE'] = args.engine
+
+    try:
+        report = run(args)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    report['workdir'] = workdir
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0 if report['succeeded'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+# run.py
+"""
+Benchmark every pipeline stage on synthetic data.
+
+Each stage is timed separately and the results are written as JSON. The
+prediction stages score with the engine the app serves (ASD_SCORING_ENGINE,
+or --engine), loaded from a registry in the work directory. train_model
+fits on --n-jobs cores (default 1), so baselines from machines with
+different core counts stay comparable. With --baseline, the run fails
+(exit code 1) when a stage is slower than the stored baseline by more
+than --max-regression. plot_qchat_score is gated on a full matplotlib
+render of every chart; its cached and first-call timings are extra keys.
+
+Usage:
+    python -m benchmarks.run --rows 1000 100000 -o bench.json
+    python -m benchmarks.run --rows 1000 100000 -o bench.json --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --rows 1000 100000 -o bench.json --baseline benchmarks/baseline.json --max-regression 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from benchmarks.synthetic import write_screenings_csv
+from src.config import FEATURE_COLS, QCHAT_THRESHOLD, SCORING_ENGINE
+from src.core.data_loader import load_data
+from src.core.engines import ENGINES, load_engine
+from src.core.model_registry import ModelRegistry, ensure_model
+from src.core.model_trainer import fit_model
+from src.core.predictor import convert_answers, make_prediction, make_predictions_batch
+from src.utils import charts
+from src.utils.report_generator import render_pdf_report
+
+STAGES = ['load_data', 'train_model', 'convert_answers', 'make_prediction',
+          'make_predictions_batch', 'plot_qchat_score', 'generate_pdf_report']
+# Stages whose cost does not depend on the dataset size
+PER_CALL_STAGES = {'convert_answers', 'make_prediction', 'plot_qchat_score', 'generate_pdf_report'}
+SAMPLE_REPORT = {
+    'name': 'Anonymous User', 'email': 'anonymous@example.com', 'timestamp': '2025-01-01 12:00:00',
+    'Qchat-10 Score': 6, 'ML Prediction': 'YES', 'Confidence': '0.81', 'Age (Months)': 24,
+    'Sex': 'M', 'Ethnicity': 'asian', 'Jaundice': 'No', 'Family with ASD': 'No', 'Who Completed': 'Mother',
+}
+
+
+def measure(fn, repeat=5, number=1):
+    """
+    Time fn() `repeat` times, each run calling it `number` times.
+    Returns: Dict with median and min seconds per call.
+    """
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {'seconds': statistics.median(samples), 'min_seconds': min(samples), 'repeat': repeat, 'number': number}
+
+
+def run_stage(stage, ctx, repeat):
+    if stage == 'load_data':
+        return measure(lambda: load_data(ctx['csv_path']), repeat=repeat)
+    if stage == 'train_model':
+        # The cold path of train_model: encode and fit a new forest
+        return measure(lambda: fit_model(ctx['data'], n_jobs=ctx['n_jobs']), repeat=max(1, repeat // 2))
+    if stage == 'convert_answers':
+        return measure(lambda: convert_answers(ctx['answers']), repeat=repeat, number=1000)
+    if stage == 'make_prediction':
+        return measure(lambda: make_prediction(ctx['model'], ctx['answers'], 'No', 'Yes', 24,
+                                               FEATURE_COLS, QCHAT_THRESHOLD), repeat=repeat, number=50)
+    if stage == 'make_predictions_batch':
+        return measure(lambda: make_predictions_batch(ctx['model'], ctx['raw'], FEATURE_COLS, QCHAT_THRESHOLD),
+                       repeat=repeat)
+    if stage == 'plot_qchat_score':
+        def render_all():
+            for score in range(charts.MAX_SCORE + 1):
+                charts.render_chart_png(score)
+
+        def first_calls():
+            # What a fresh process pays: a baked file read if the snapshot was built, else a render
+            charts.clear_chart_cache()
+            for score in range(charts.MAX_SCORE + 1):
+                charts.qchat_chart_png(score)
+        # The gated seconds are a full matplotlib render of every chart, so a slower render fails --baseline
+        cold = measure(render_all, repeat=max(1, repeat // 2))
+        first = measure(first_calls, repeat=max(1, repeat // 2))
+        warm = measure(lambda: charts.qchat_chart_png(6), repeat=repeat, number=1000)
+        return {**cold, 'first_call_all_seconds': first['seconds'], 'warm_seconds': warm['seconds'],
+                'baked': charts.is_baked(6)}
+    if stage == 'generate_pdf_report':
+        return measure(lambda: render_pdf_report(SAMPLE_REPORT), repeat=repeat, number=20)
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def run_benchmarks(row_counts, stages=STAGES, repeat=5, seed=0, workdir=None, engine=SCORING_ENGINE, n_jobs=1):
+    """
+    Returns: Results dict keyed by "<stage>@<rows>".
+    """
+    results = {}
+    workdir = workdir or tempfile.mkdtemp(prefix='asd-bench-')
+    registry = ModelRegistry(os.path.join(workdir, 'registry'))
+    per_call_done = set()
+    for n_rows in row_counts:
+        csv_path = os.path.join(workdir, f'screenings_{n_rows}.csv')
+        if not os.path.exists(csv_path):
+            write_screenings_csv(csv_path, n_rows, seed=seed)
+        raw = pd.read_csv(csv_path)
+        ctx = {
+            'csv_path': csv_path,
+            'raw': raw,
+            'data': load_data(csv_path),
+            'answers': list(raw.loc[0, [f'A{i}' for i in range(1, 11)]]),
+            'n_jobs': n_jobs,
+        }
+        # Served like the app: registered (with its engines), then loaded through the scoring engine
+        key = ensure_model(registry, ctx['data'])
+        ctx['model'] = load_engine(engine, registry, key)
+        for stage in stages:
+            if stage in PER_CALL_STAGES:
+                if stage in per_call_done:
+                    continue
+                per_call_done.add(stage)
+                key = stage
+            else:
+                key = f'{stage}@{n_rows}'
+            res = run_stage(stage, ctx, repeat)
+            if stage not in PER_CALL_STAGES:
+                res['rows'] = n_rows
+                res['rows_per_second'] = n_rows / res['seconds'] if res['seconds'] > 0 else None
+            results[key] = res
+            print(f"{key:<32} {res['seconds'] * 1000:>12.3f} ms")
+    return results
+
+
+def compare(results, baseline, max_regression):
+    """
+    Returns: List of (key, baseline_seconds, seconds) for stages that regressed.
+    """
+    regressions = []
+    for key, res in results.items():
+        base = baseline.get('results', {}).get(key)
+        if base and res['seconds'] > base['seconds'] * (1 + max_regression):
+            regressions.append((key, base['seconds'], res['seconds']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ASD screening pipeline.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 100000])
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engine', choices=ENGINES, default=SCORING_ENGINE,
+                        help="Scoring engine for the prediction stages (default: ASD_SCORING_ENGINE)")
+    parser.add_argument('--n-jobs', type=int, default=1,
+                        help="Cores for the train_model stage; pinned so the timing does not follow the machine")
+    parser.add_argument('--workdir', default=None,
+                        help="Directory for generated datasets and their models (reused between runs)")
+    parser.add_argument('-o', '--output', default='bench_output.json')
+    parser.add_argument('--baseline', default=None, help="Baseline JSON to compare against")
+    parser.add_argument('--max-regression', type=float, default=0.25,
+                        help="Allowed slowdown vs. baseline as a fraction (0.25 = 25%%)")
+    parser.add_argument('--save-baseline', default=None, help="Also write this run as a baseline file")
+    args = parser.parse_args(argv)
+
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+    results = run_benchmarks(args.rows, args.stages, args.repeat, args.seed, args.workdir, args.engine,
+                             args.n_jobs)
+    report = {
+        'meta': {
+            'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__,
+            'engine': args.engine,
+            'n_jobs': args.n_jobs,
+            'rows': args.rows,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        base_meta = baseline.get('meta', {})
+        if base_meta.get('engine') and base_meta['engine'] != args.engine:
+            print(f"Warning: baseline was measured with the {base_meta['engine']} engine, this run uses {args.engine}",
+                  file=sys.stderr)
+        if base_meta.get('n_jobs') != args.n_jobs:
+            print(f"Warning: baseline trained with n_jobs={base_meta.get('n_jobs', -1)}, this run uses {args.n_jobs}",
+                  file=sys.stderr)
+        regressions = compare(results, baseline, args.max_regression)
+        for key, base, now in regressions:
+            print(f"REGRESSION {key}: {base * 1000:.3f} ms -> {now * 1000:.3f} ms (+{(now / base - 1) * 100:.0f}%)")
+        if regressions:
+            return 1
+        print(f"No stage regressed by more than {args.max_regression:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+# synthetic.py
+"""
+Synthetic Q-CHAT-10 screening data.
+
+Rows follow the layout of the toddler screening dataset (A1-A10 answers,
+Age_Mons, Sex, Ethnicity, Jaundice, Family_mem_with_ASD, Who completed the
+test, Class ASD Traits). Each child gets a latent trait level that drives all
+ten answers, so answers are correlated and the label follows the Q-Chat score
+(with some label noise), roughly like the real data.
+
+Usage:
+    python -m benchmarks.synthetic 1000000 -o screenings.csv
+"""
+import argparse
+import sys
+import numpy as np
+import pandas as pd
+
+from src.config import OPTIONS, QCHAT_THRESHOLD
+from src.core.encoding import ANSWER_LUT, QCHAT_COLS
+
+ETHNICITIES = ['White European', 'asian', 'middle eastern', 'south asian', 'black',
+               'Hispanic', 'Latino', 'mixed', 'Pacifica', 'Native Indian', 'Others']
+ETHNICITY_WEIGHTS = [0.33, 0.29, 0.19, 0.06, 0.05, 0.04, 0.02, 0.01, 0.004, 0.003, 0.003]
+WHO_COMPLETED = ['family member', 'Health Care Professional', 'Health care professional', 'Self', 'Others']
+WHO_WEIGHTS = [0.96, 0.02, 0.01, 0.005, 0.005]
+
+
+def generate_screenings(n_rows, seed=0, encoded=False, start_case=1):
+    """
+    Generate n_rows synthetic screenings in one vectorized pass.
+    encoded=True writes A1-A10 as already-scored 0/1 values instead of answer strings.
+    Returns: DataFrame.
+    """
+    rng = np.random.default_rng(seed)
+    # About 70% of the real dataset screens positive
+    trait = rng.beta(1.5, 1.5, size=n_rows)
+    # Answer code 0 (Always) .. 4 (Never); higher trait -> more ASD-indicative answers
+    codes = np.clip(np.rint(trait[:, None] * 4 + rng.normal(0, 1.1, size=(n_rows, 10))), 0, 4).astype(np.int8)
+    # A10 is reverse-scored, so flip its answer scale
+    codes[:, 9] = 4 - codes[:, 9]
+    binary = ANSWER_LUT[np.arange(10), codes]
+    score = binary.sum(axis=1)
+    label = (score > QCHAT_THRESHOLD) ^ (rng.random(n_rows) < 0.02)
+
+    df = pd.DataFrame({'Case_No': np.arange(start_case, start_case + n_rows)})
+    if encoded:
+        for i, col in enumerate(QCHAT_COLS):
+            df[col] = binary[:, i]
+    else:
+        options = np.array(OPTIONS)
+        for i, col in enumerate(QCHAT_COLS):
+            df[col] = options[codes[:, i]]
+    df['Age_Mons'] = rng.integers(12, 37, size=n_rows)
+    df['Qchat-10-Score'] = score
+    df['Sex'] = np.where(rng.random(n_rows) < 0.7, 'm', 'f')
+    df['Ethnicity'] = rng.choice(ETHNICITIES, size=n_rows, p=ETHNICITY_WEIGHTS)
+    df['Jaundice'] = np.where(rng.random(n_rows) < 0.27, 'yes', 'no')
+    df['Family_mem_with_ASD'] = np.where(rng.random(n_rows) < 0.16, 'yes', 'no')
+    df['Who completed the test'] = rng.choice(WHO_COMPLETED, size=n_rows, p=WHO_WEIGHTS)
+    df['Class ASD Traits'] = np.where(label, 'Yes', 'No')
+    return df
+
+
+def write_screenings_csv(path, n_rows, seed=0, encoded=False, chunk_rows=1_000_000):
+    """
+    Write n_rows synthetic screenings to a CSV in chunks, so 10M+ rows never
+    need to be held in memory at once.
+    Returns: path.
+    """
+    written = 0
+    chunk_idx = 0
+    while written < n_rows:
+        size = min(chunk_rows, n_rows - written)
+        chunk = generate_screenings(size, seed=seed + chunk_idx, encoded=encoded, start_case=written + 1)
+        chunk.to_csv(path, index=False, mode='w' if written == 0 else 'a', header=written == 0)
+        written += size
+        chunk_idx += 1
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic Q-CHAT-10 screening data.")
+    parser.add_argument('rows', type=int)
+    parser.add_argument('-o', '--output', required=True)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--encoded', action='store_true', help="Write A1-A10 as 0/1 instead of answer strings")
+    args = parser.parse_args(argv)
+    write_screenings_csv(args.output, args.rows, seed=args.seed, encoded=args.encoded)
+    print(f"Wrote {args.rows} rows -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,16 @@
 import streamlit as st
+from src.core.analytics import AnalyticsStore
+from src.core.errors import DataLoadError
+from src.utils.assets import image, inject_page_style
+
+
+@st.cache_resource
+def get_analytics():
+    return AnalyticsStore()
+
 
 st.set_page_config(page_title="Analysis", layout="centered")
-st.markdown(
-    """
-    <style>
-    .stApp {
-        font-family: 'Segoe UI', Arial, sans-serif;
-        font-size: 18px;
-    }
-    h1 {
-        font-family: 'Trebuchet MS', Arial, sans-serif;
-        color: white;
-        font-size: 2.5em;
-        font-weight: bold;
-    }
-    strong {
-        font-family: cursive;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
+inject_page_style("strong{font-family:cursive}")
 st.title("Analysis of Autism Spectrum Disorder")
 
 st.markdown("""
@@ -36,14 +26,37 @@ st.markdown("""
 - Darker red cells (-30 to -45) dominate, indicating a higher prevalence of elevated QCHAT-10 scores. This could suggest that ASD traits are more detectable or severe in this age group, consistent with developmental progression and increased screening sensitivity.
 """)
 
+analytics = get_analytics()
+try:
+    # Only screenings recorded since the last visit are read
+    analytics.refresh()
+except DataLoadError as e:
+    st.warning(f"Could not read the dataset: {e}")
+charts = analytics.charts() if analytics.dataset.rows or analytics.results.rows else None
+
+
+def show_chart(name, static_path=None):
+    if charts and name in charts:
+        st.image(charts[name], use_container_width=True)
+    elif static_path:
+        image(static_path, use_container_width=True)
+
+
 with st.expander("**Charts**"):
+    if charts is None:
+        st.info("No data available yet; showing the charts from the original study.")
+    else:
+        st.caption(f"{analytics.dataset.rows} dataset records and {analytics.results.rows} screenings. "
+                   "Dataset charts count the Class ASD Traits label; screening charts count the Q-Chat outcome.")
     st.write('Heatmap of QCHAT-10 Scores')
-    st.image(r'static/images/output.png', use_container_width=True)
+    show_chart('score_age', r'static/images/output.png')
     st.markdown("---")
     st.write('Asd vs Non-Asd Traits of Family Members')
-    st.image(r'static/images/output2.png', use_container_width=True)
+    show_chart('family', r'static/images/output2.png')
+    show_chart('family_screenings')
     st.markdown("---")
     st.write('Asd and Ethnicity Comparison')
-    st.image(r'static/images/output4.png', use_container_width=True)
+    show_chart('ethnicity', r'static/images/output4.png')
+    show_chart('ethnicity_screenings')
 
 st.sidebar.info("Developed with ❤️ using Streamlit by Code-Craft")
\ No newline at end of file
@@ -0,0 +1,66 @@
+import streamlit as st
+import io
+import pandas as pd
+from src.config import BATCH_PAGE_MAX_REPORTS, FEATURE_COLS, QCHAT_THRESHOLD, SCORING_ENGINE, USE_PROB_TABLE
+from src.core.engines import FOREST_ENGINES, load_engine
+from src.core.errors import ASDError
+from src.core.model_registry import ModelRegistry, ensure_model
+from src.core.model_trainer import MODEL_PATH
+from src.core.predictor import make_predictions_batch
+from src.core.prob_table import with_prob_table
+from src.utils.assets import inject_page_style
+from src.utils.bulk_export import batch_report_data, export_reports_zip
+
+st.set_page_config(page_title="Batch Screening", layout="centered")
+inject_page_style()
+st.title("📋 Batch Screening")
+st.write("Upload a screening sheet (A1–A10, Jaundice, Family_mem_with_ASD, Age_Mons) to score a whole cohort and download every child's report as one ZIP.")
+
+@st.cache_resource(show_spinner="🔃 Loading model...")
+def get_batch_model():
+    registry = ModelRegistry()
+    key = ensure_model(registry, None, legacy_path=MODEL_PATH)
+    # Same engine as the app (ASD_SCORING_ENGINE)
+    model = load_engine(SCORING_ENGINE, registry, key)
+    use_table = USE_PROB_TABLE and SCORING_ENGINE in FOREST_ENGINES
+    return with_prob_table(model, registry.model_path(key)) if use_table else model
+
+uploaded = st.file_uploader("Screening sheet (CSV)", type="csv")
+if uploaded is not None:
+    try:
+        results = make_predictions_batch(get_batch_model(), pd.read_csv(uploaded), FEATURE_COLS, QCHAT_THRESHOLD)
+    except ASDError as e:
+        st.error(str(e))
+        st.stop()
+
+    invalid = results[results['Errors'] != '']
+    if len(invalid):
+        st.warning(f"{len(invalid)} rows could not be parsed and were not scored; see the Errors column.")
+
+    st.subheader("🔎 Results")
+    st.dataframe(results[['Qchat-10 Score', 'ML Prediction', 'Confidence', 'Errors']], use_container_width=True)
+    st.download_button("Download results (CSV)", results.to_csv(index=False), file_name="screening_results.csv", mime="text/csv")
+
+    n_reports = len(results) - len(invalid)
+    if n_reports > BATCH_PAGE_MAX_REPORTS:
+        st.info(f"The page builds at most {BATCH_PAGE_MAX_REPORTS} reports. For larger cohorts use "
+                f"`python -m src.batch_predict sheet.csv -o results.csv --reports reports.zip`, which writes the ZIP to disk.")
+    elif st.button(f"📄 Generate {n_reports} reports (ZIP)"):
+        progress_bar = st.progress(0.0, text="Rendering reports...")
+
+        def on_progress(done, total):
+            if done == total or done % 25 == 0:
+                progress_bar.progress(done / total, text=f"Rendered {done} of {total} reports")
+
+        # download_button holds the whole archive in memory, hence the report cap above
+        archive = io.BytesIO()
+        written, failed = export_reports_zip(batch_report_data(results), archive, total=n_reports,
+                                             progress=on_progress)
+        st.download_button("Download reports (ZIP)", archive.getvalue(), file_name="asd_reports.zip",
+                           mime="application/zip")
+        if failed:
+            st.warning(f"{failed} reports could not be generated. Check logs.")
+        else:
+            st.success(f"✅ {written} reports generated.")
+
+st.sidebar.info("Developed with ❤️ using Streamlit by Code-Craft")
@@ -1,23 +1,8 @@
 import streamlit as st
+from src.utils.assets import image, inject_page_style
 # App configuration
 st.set_page_config(page_title="Toddler Parenting Support", layout="centered")
-st.markdown(
-    """
-    <style>
-    .stApp {
-        font-family: 'Segoe UI', Arial, sans-serif;
-        font-size: 18px;
-    }
-    h1 {
-        font-family: 'Trebuchet MS', Arial, sans-serif;
-        color: white;
-        font-size: 2.5em;
-        font-weight: bold;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
+inject_page_style()
 
 # Header
 st.title("👶 Toddler Parenting Support")
@@ -25,7 +10,7 @@ st.markdown("### 💖 Gentle, Practical Tips for Your Toddler’s Growth")
 
 st.markdown("Parenting a toddler can be challenging — but you're not alone! Here's a friendly, informative guide to help you build healthy habits and nurture your child’s development.")
 
-st.image(r'static/images/support.jpg')
+image(r'static/images/support.jpg')
 # 1. Emotional Growth & Play
 st.header("🎈 Emotional Development & Play")
 with st.expander("Why Play Matters"):
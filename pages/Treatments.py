@@ -1,23 +1,8 @@
 import streamlit as st
+from src.utils.assets import image, inject_page_style
 
 st.set_page_config(page_title="Autism Toddler Treatment Guide", layout="wide")
-st.markdown(
-    """
-    <style>
-    .stApp {
-        font-family: 'Segoe UI', Arial, sans-serif;
-        font-size: 18px;
-    }
-    h1 {
-        font-family: 'Trebuchet MS', Arial, sans-serif;
-        color: white;
-        font-size: 2.5em;
-        font-weight: bold;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
+inject_page_style()
 
 st.title("Treatments for Autistic Toddlers")
 
@@ -128,7 +113,7 @@ elif section == "9. Educational Interventions":
       • Visual supports  
       • Individualized instruction
     """)
-    st.image(r'static/images/strategies-for-asd-support-w1300.png', caption="Strategies for ASD Support")
+    image(r'static/images/strategies-for-asd-support-w1300.png', slot='wide', caption="Strategies for ASD Support")
 
 # Footer
 st.sidebar.markdown("---")
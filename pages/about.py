@@ -1,25 +1,10 @@
 import streamlit as st
 from src.config import image1, image2
+from src.utils.assets import image, inject_page_style
 
 
 st.set_page_config(page_title="About", layout="centered")
-st.markdown(
-    """
-    <style>
-    .stApp {
-        font-family: 'Segoe UI', Arial, sans-serif;
-        font-size: 18px;
-    }
-    h1 {
-        font-family: 'Trebuchet MS', Arial, sans-serif;
-        color: white;
-        font-size: 2.5em;
-        font-weight: bold;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
+inject_page_style()
 st.title("About the Autism Spectrum Disorder (ASD)")
 
 st.video(r'https://www.youtube.com/watch?v=TJuwhCIQQTs', start_time=0)
@@ -33,9 +18,9 @@ with st.expander("**What is Autism Spectrum Disorder?**"):
     """)
     col1, col2 = st.columns(2)
     with col1:
-        st.image(image1, use_container_width=True, width=400, caption="Autism Spectrum Disorder - Inforgraphics : Common Signs. \n Visual Summary ")
+        image(image1, slot='column', use_container_width=True, width=400, caption="Autism Spectrum Disorder - Inforgraphics : Common Signs. \n Visual Summary ")
     with col2:
-        st.image(image2, use_container_width=True, width=400)
+        image(image2, slot='column', use_container_width=True, width=400)
     st.markdown("---")
 
 with st.expander("**Signs and Symptoms**"):
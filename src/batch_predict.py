@@ -0,0 +1,125 @@
+# batch_predict.py
+"""
+Score a screening sheet from the command line.
+
+Usage:
+    python -m src.batch_predict screenings.csv -o results.csv
+    python -m src.batch_predict screenings.csv -o results.parquet
+    python -m src.batch_predict screenings.csv -o results.csv --reports reports.zip
+    python -m src.batch_predict screenings.npz -o results.csv
+"""
+import argparse
+import os
+import sys
+import time
+import pandas as pd
+
+from src.config import FEATURE_COLS, QCHAT_THRESHOLD, SCORING_ENGINE, USE_PROB_TABLE
+from src.core.data_loader import load_data
+from src.core.engines import FOREST_ENGINES, load_engine
+from src.core.errors import ModelError
+from src.core.model_registry import ModelRegistry, ensure_model
+from src.core.model_trainer import MODEL_PATH
+from src.core.predictor import ERRORS_COL, make_predictions_batch
+from src.core.prob_table import with_prob_table
+from src.utils.bulk_export import batch_report_data, export_reports_zip
+from src.utils.logging_setup import configure_logging
+
+
+def write_results(results, output_path, append=False):
+    """
+    Write results as CSV or Parquet depending on the output extension.
+    """
+    if output_path.lower().endswith('.parquet'):
+        results.to_parquet(output_path, index=False)
+    else:
+        results.to_csv(output_path, index=False, mode='a' if append else 'w', header=not append)
+
+
+def load_model(model_path=None):
+    """
+    Load the promoted registry model through the ASD_SCORING_ENGINE engine,
+    or the joblib model at model_path when one is given.
+    Returns: Model with predict_proba.
+    Raises: ModelError if no model can be loaded.
+    """
+    if model_path:
+        if not os.path.exists(model_path):
+            raise ModelError(f"Model not found at {model_path}")
+        import joblib
+
+        model = joblib.load(model_path)
+    else:
+        registry = ModelRegistry()
+        key = ensure_model(registry, None, legacy_path=MODEL_PATH)
+        model = load_engine(SCORING_ENGINE, registry, key)
+        if SCORING_ENGINE not in FOREST_ENGINES:
+            return model
+        model_path = registry.model_path(key)
+    return with_prob_table(model, model_path) if USE_PROB_TABLE else model
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch ASD screening predictions.")
+    parser.add_argument('input', help="CSV file with A1-A10, Jaundice, Family_mem_with_ASD and Age_Mons columns, "
+                                         "or a .npz file of packed records")
+    parser.add_argument('-o', '--output', required=True, help="Output .csv or .parquet file")
+    parser.add_argument('--model', default=None,
+                        help="Score with this joblib model instead of the promoted registry model")
+    parser.add_argument('--threshold', type=int, default=QCHAT_THRESHOLD, help="Q-Chat score threshold")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="Rows per chunk for CSV output (bounds memory on very large sheets)")
+    parser.add_argument('--reports', default=None, help="Also write every child's PDF report into this ZIP file")
+    parser.add_argument('--workers', type=int, default=None, help="Processes used to render reports")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    try:
+        model = load_model(args.model)
+    except ModelError as e:
+        print(e, file=sys.stderr)
+        return 1
+    start = time.perf_counter()
+    n_rows = n_invalid = 0
+
+    if args.reports and args.chunksize:
+        print("--reports cannot be combined with --chunksize", file=sys.stderr)
+        return 1
+
+    if args.input.lower().endswith('.npz'):
+        results = make_predictions_batch(model, load_data(args.input, packed=True), FEATURE_COLS, args.threshold)
+        write_results(results, args.output)
+        n_rows = len(results)
+        n_invalid = int((results[ERRORS_COL] != '').sum())
+    elif args.chunksize and not args.output.lower().endswith('.parquet'):
+        for i, chunk in enumerate(pd.read_csv(args.input, chunksize=args.chunksize)):
+            results = make_predictions_batch(model, chunk, FEATURE_COLS, args.threshold)
+            write_results(results, args.output, append=i > 0)
+            n_rows += len(results)
+            n_invalid += int((results[ERRORS_COL] != '').sum())
+    else:
+        df = pd.read_csv(args.input)
+        results = make_predictions_batch(model, df, FEATURE_COLS, args.threshold)
+        write_results(results, args.output)
+        n_rows = len(results)
+        n_invalid = int((results[ERRORS_COL] != '').sum())
+
+    elapsed = time.perf_counter() - start
+    rate = n_rows / elapsed if elapsed > 0 else float('inf')
+    print(f"Scored {n_rows} screenings in {elapsed:.2f}s ({rate:,.0f} rows/s) -> {args.output}")
+    if n_invalid:
+        print(f"{n_invalid} rows could not be parsed and were not scored (see the {ERRORS_COL} column)",
+              file=sys.stderr)
+
+    if args.reports:
+        start = time.perf_counter()
+        with open(args.reports, 'wb') as f:
+            written, failed = export_reports_zip(batch_report_data(results), f, total=n_rows - n_invalid,
+                                                 max_workers=args.workers)
+        elapsed = time.perf_counter() - start
+        print(f"Wrote {written} reports ({failed} failed) in {elapsed:.2f}s -> {args.reports}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,20 @@
 # config.py
-DATA_PATH = r'D:\Autism-Spectrum-Disorder--Medical-Analyisis\datasets'
+import os
+
+# Dataset sources: CSV files, directories of CSV exports and glob patterns,
+# separated by os.pathsep (see resolve_sources in src/core/data_loader.py)
+DATA_SOURCES = os.environ.get('ASD_DATA_SOURCES', r'datasets')
+# Processes used to parse and encode source files (0 = one per CPU)
+INGEST_WORKERS = int(os.environ.get('ASD_INGEST_WORKERS', 0)) or None
+# Encoded feature cache (see src/core/feature_store.py)
+FEATURE_CACHE_DIR = r'cache/features'
+# Rows per chunk when streaming the dataset and when training from the cache
+INGEST_CHUNK_ROWS = int(os.environ.get('ASD_INGEST_CHUNK_ROWS', 200_000))
+TRAIN_CHUNK_ROWS = int(os.environ.get('ASD_TRAIN_CHUNK_ROWS', 1_000_000))
 QCHAT_THRESHOLD = 4
+# Age range offered by the form slider (months)
+AGE_MIN = 12
+AGE_MAX = 48
 FEATURE_COLS = ['A1', 'A2', 'A3', 'A4', 'A5', 'A6', 'A7', 'A8', 'A9', 'A10', 'Jaundice', 'Family_mem_with_ASD', 'Age_Mons']
 QUESTIONS = [
     "1. Does your child look at you when you call his/her name?",
@@ -16,4 +30,67 @@ QUESTIONS = [
 ]
 OPTIONS = ['Always', 'Usually', 'Sometimes', 'Rarely', 'Never']
 image1 = r'static/images/asd1.webp'
-image2 = r'static/images/asd2.jpg'
\ No newline at end of file
+image2 = r'static/images/asd2.jpg'
+
+# Resized WebP variants of static images (see src/utils/assets.py)
+ASSET_CACHE_DIR = r'cache/assets'
+ASSET_WIDTHS = (480, 800, 1200)
+ASSET_WEBP_QUALITY = 80
+ASSET_MEMORY_BYTES = int(os.environ.get('ASD_ASSET_MEMORY_MB', 32)) * 1024 * 1024
+
+# Pre-rendered Q-Chat score charts (see src/utils/charts.py)
+CHART_CACHE_DIR = r'cache/charts'
+
+# Versioned model registry (see src/core/model_registry.py)
+REGISTRY_DIR = r'models/registry'
+
+# Precomputed probability table (python -m src.core.prob_table build)
+PROB_TABLE_PATH = r'models/asd_model.probtable.npy'
+USE_PROB_TABLE = os.environ.get('ASD_USE_PROB_TABLE', '1') == '1'
+
+# Screening history (SQLite, see src/core/result_store.py)
+RESULTS_DB_PATH = os.environ.get('ASD_RESULTS_DB', r'results/screenings.db')
+
+# Content-addressed PDF report storage with a disk budget (see src/utils/report_store.py)
+REPORTS_DIR = os.environ.get('ASD_REPORTS_DIR', r'reports')
+REPORTS_MAX_BYTES = int(float(os.environ.get('ASD_REPORTS_MAX_MB', 512)) * 1024 * 1024)
+REPORTS_MAX_AGE_DAYS = float(os.environ.get('ASD_REPORTS_MAX_AGE_DAYS', 30))
+
+# Largest ZIP of reports the Batch page builds; the archive is held in memory to be downloaded
+BATCH_PAGE_MAX_REPORTS = int(os.environ.get('ASD_BATCH_PAGE_MAX_REPORTS', 2000))
+
+# Scoring engine per deployment: forest, flat_forest, linear or tree (see src/core/engines.py)
+SCORING_ENGINE = os.environ.get('ASD_SCORING_ENGINE', 'flat_forest')
+LINEAR_WEIGHT_SCALE = 16  # linear engine weights are integers in units of 1/16
+SHALLOW_TREE_DEPTH = 4
+ENGINE_FIT_ROWS = 1_000_000  # larger datasets are subsampled to fit the lightweight engines
+
+# Number of answers listed when explaining a prediction (see src/core/explainer.py)
+EXPLAIN_TOP_FEATURES = 5
+
+# Cached out-of-fold predictions of the evaluation harness (python -m src.evaluation)
+EVAL_CACHE_DIR = r'cache/evaluation'
+
+# Materialized aggregates behind the Analysis page (see src/core/analytics.py)
+ANALYTICS_PATH = r'cache/analytics.json'
+# Minimum seconds between checks of the dataset sources for changes (one stat per source file)
+ANALYTICS_SOURCE_CHECK_SECONDS = float(os.environ.get('ASD_ANALYTICS_SOURCE_CHECK_SECONDS', 60))
+
+# Warm-start snapshot (python -m src.snapshot build); with FAST_START a valid
+# snapshot lets the app skip loading the dataset at startup
+SNAPSHOT_PATH = r'models/snapshot.json'
+FAST_START = os.environ.get('ASD_FAST_START', '1') == '1'
+
+# Per-stage metrics file in Prometheus text format, rewritten every METRICS_INTERVAL
+# seconds ({pid} is replaced by the process id; empty disables it, see src/utils/metrics.py)
+METRICS_FILE = os.environ.get('ASD_METRICS_FILE', r'logs/metrics.prom')
+METRICS_INTERVAL = float(os.environ.get('ASD_METRICS_INTERVAL', 15))
+
+# Logging (see src/utils/logging_setup.py)
+LOG_FILE = os.environ.get('ASD_LOG_FILE', r'logs/asd_app.log')
+LOG_LEVEL = os.environ.get('ASD_LOG_LEVEL', 'INFO').upper()
+# Per-module levels, e.g. "src.core.feature_store=DEBUG,src.utils.charts=WARNING"
+LOG_MODULE_LEVELS = os.environ.get('ASD_LOG_LEVELS', '')
+# Keep 1 in LOG_DEBUG_SAMPLE DEBUG records per logger
+LOG_DEBUG_SAMPLE = int(os.environ.get('ASD_LOG_DEBUG_SAMPLE', 100))
+LOG_JSON = os.environ.get('ASD_LOG_JSON', '1') == '1'
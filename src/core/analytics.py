@@ -0,0 +1,300 @@
+# analytics.py
+"""
+Materialized aggregates behind the Analysis page.
+
+Three fixed-size aggregates are kept:
+- score x age: screening counts per Q-Chat-10 score and age in months;
+- ASD x family history: a 2x2 table of counts;
+- ethnicity: counts per ASD outcome for each ethnicity.
+
+The dataset part is computed once per dataset key (see dataset_key), with
+the source files aggregated in parallel and each streamed in chunks; if a
+file fails validation the key is not recorded, so it is retried on the next
+source check. The screening history part is updated incrementally from rows
+whose id is above the last one folded in. Both parts are saved to
+ANALYTICS_PATH, so a page load costs the same no matter how much data has
+been collected.
+
+The outcome axis differs between the parts: the dataset counts its Class
+ASD Traits label, the history counts the Q-Chat screening outcome. Their
+outcome charts are therefore drawn separately; only the score x age
+heatmap, which has no outcome, combines both.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from functools import partial
+import numpy as np
+import pandas as pd
+
+from src.config import (AGE_MAX, AGE_MIN, ANALYTICS_PATH, ANALYTICS_SOURCE_CHECK_SECONDS, DATA_SOURCES,
+                        INGEST_CHUNK_ROWS, INGEST_WORKERS, RESULTS_DB_PATH)
+from src.core.data_loader import REQUIRED_COLS, iter_data, load_data, map_sources, resolve_sources
+from src.core.encoding import encode_label, encode_yes_no
+from src.core.errors import DataLoadError
+from src.core.feature_store import dataset_key
+from src.core.packed import PackedRecords
+from src.utils.charts import SCREENING_OUTCOMES, ethnicity_png, family_history_png, score_age_heatmap_png
+from src.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+N_SCORES = 11
+N_AGES = AGE_MAX - AGE_MIN + 1
+UNKNOWN_ETHNICITY = 'unknown'
+
+
+def normalize_ethnicity(values):
+    """
+    Returns: Lower-case, stripped ethnicity labels ('unknown' when missing).
+    """
+    labels = pd.Series(values, dtype=object).fillna('').astype(str).str.strip().str.lower()
+    return labels.where(labels != '', UNKNOWN_ETHNICITY).to_numpy()
+
+
+class Aggregates:
+    """
+    Count tables that can be updated with new records and merged.
+    """
+    def __init__(self):
+        self.score_age = np.zeros((N_SCORES, N_AGES), dtype=np.int64)
+        self.asd_family = np.zeros((2, 2), dtype=np.int64)  # [asd, family history]
+        self.ethnicity = {}  # label -> [no ASD, ASD]
+        self.rows = 0
+
+    def add(self, scores, ages, family, asd, ethnicity):
+        """
+        Fold a batch of records in (array-likes of equal length).
+        """
+        scores = np.clip(np.asarray(scores, dtype=np.int64), 0, N_SCORES - 1)
+        ages = np.clip(np.asarray(ages, dtype=np.int64), AGE_MIN, AGE_MAX) - AGE_MIN
+        family = np.asarray(family, dtype=np.int64)
+        asd = np.asarray(asd, dtype=np.int64)
+        np.add.at(self.score_age, (scores, ages), 1)
+        np.add.at(self.asd_family, (asd, family), 1)
+        labels, inverse = np.unique(np.asarray(ethnicity, dtype=object).astype(str), return_inverse=True)
+        counts = np.zeros((len(labels), 2), dtype=np.int64)
+        np.add.at(counts, (inverse, asd), 1)
+        for label, (no, yes) in zip(labels, counts.tolist()):
+            current = self.ethnicity.setdefault(str(label), [0, 0])
+            current[0] += no
+            current[1] += yes
+        self.rows += len(scores)
+
+    def add_records(self, records, ethnicity=None):
+        """
+        Fold in PackedRecords (scores by popcount), with optional ethnicity labels.
+        """
+        if ethnicity is None:
+            ethnicity = np.full(len(records), UNKNOWN_ETHNICITY, dtype=object)
+        self.add(records.qchat_scores(), records.age, records.family(), records.labels(), ethnicity)
+
+    def merge(self, other):
+        """
+        Returns: New Aggregates holding the sum of both.
+        """
+        merged = Aggregates()
+        merged.score_age = self.score_age + other.score_age
+        merged.asd_family = self.asd_family + other.asd_family
+        for source in (self.ethnicity, other.ethnicity):
+            for label, (no, yes) in source.items():
+                current = merged.ethnicity.setdefault(label, [0, 0])
+                current[0] += no
+                current[1] += yes
+        merged.rows = self.rows + other.rows
+        return merged
+
+    def copy(self):
+        return self.merge(Aggregates())
+
+    def to_dict(self):
+        return {
+            'score_age': self.score_age.tolist(),
+            'asd_family': self.asd_family.tolist(),
+            'ethnicity': self.ethnicity,
+            'rows': self.rows,
+            'age_min': AGE_MIN,
+            'age_max': AGE_MAX,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        aggregates = cls()
+        if (data.get('age_min'), data.get('age_max')) != (AGE_MIN, AGE_MAX):
+            return aggregates
+        aggregates.score_age = np.array(data['score_age'], dtype=np.int64)
+        aggregates.asd_family = np.array(data['asd_family'], dtype=np.int64)
+        aggregates.ethnicity = {k: list(v) for k, v in data['ethnicity'].items()}
+        aggregates.rows = data['rows']
+        return aggregates
+
+
+def _file_aggregates(path, chunksize=INGEST_CHUNK_ROWS):
+    """
+    Aggregate one source file one chunk at a time.
+    Returns: Aggregates.
+    Raises: DataLoadError if the file cannot be read.
+    """
+    aggregates = Aggregates()
+    if str(path).lower().endswith('.npz'):
+        # Packed records carry no ethnicity
+        aggregates.add_records(load_data(path, packed=True))
+        return aggregates
+    for chunk in iter_data(path, chunksize, columns=REQUIRED_COLS + ['Ethnicity']):
+        ethnicity = chunk['Ethnicity'] if 'Ethnicity' in chunk else [UNKNOWN_ETHNICITY] * len(chunk)
+        aggregates.add_records(PackedRecords.from_frame(chunk), normalize_ethnicity(ethnicity))
+    return aggregates
+
+
+@timed('analytics_dataset')
+def dataset_aggregates(path=DATA_SOURCES, chunksize=INGEST_CHUNK_ROWS, max_workers=INGEST_WORKERS):
+    """
+    Aggregate every source file in a process pool and merge the results.
+    Files that fail validation are skipped.
+    Returns: Aggregates and the number of skipped files.
+    Raises: DataLoadError if no source file can be read.
+    """
+    files = resolve_sources(path)
+    aggregates = Aggregates()
+    parts = map_sources(partial(_file_aggregates, chunksize=chunksize), files, max_workers)
+    for _, part in parts:
+        aggregates = aggregates.merge(part)
+    return aggregates, len(files) - len(parts)
+
+
+@timed('analytics_results')
+def add_results_since(aggregates, db_path=RESULTS_DB_PATH, last_id=0, chunksize=50_000):
+    """
+    Fold screening history rows with id > last_id into aggregates. The
+    outcome axis counts the screening outcome (ML Prediction), not a label.
+    Returns: Highest id folded in.
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        query = ("SELECT id, qchat_score, age_mons, family_asd, prediction, ethnicity "
+                 "FROM screenings WHERE id > ? ORDER BY id")
+        for chunk in pd.read_sql_query(query, conn, params=(last_id,), chunksize=chunksize):
+            if chunk.empty:
+                continue
+            aggregates.add(
+                chunk['qchat_score'].fillna(0).to_numpy(),
+                chunk['age_mons'].fillna(AGE_MIN).to_numpy(),
+                encode_yes_no(chunk['family_asd']),
+                encode_label(chunk['prediction']),
+                normalize_ethnicity(chunk['ethnicity']),
+            )
+            last_id = int(chunk['id'].iloc[-1])
+    except (sqlite3.Error, pd.errors.DatabaseError) as e:
+        # No history table yet
+        logger.debug(f"No screening history to aggregate: {e}")
+    finally:
+        conn.close()
+    return last_id
+
+
+class AnalyticsStore:
+    """
+    Persistent dataset and screening-history aggregates with incremental refresh.
+    """
+    def __init__(self, path=ANALYTICS_PATH, data_path=DATA_SOURCES, db_path=RESULTS_DB_PATH,
+                 source_check_seconds=ANALYTICS_SOURCE_CHECK_SECONDS):
+        self.path = path
+        self.data_path = data_path
+        self.db_path = db_path
+        self.source_check_seconds = source_check_seconds
+        self._lock = threading.Lock()
+        self._source_checked = None
+        self.source_key = None
+        self.dataset = Aggregates()
+        self.results = Aggregates()
+        self.last_id = 0
+        self.version = 0
+        self._charts = (None, None)
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.source_key = state.get('source_key')
+        self.dataset = Aggregates.from_dict(state['dataset'])
+        if state.get('db_path') == os.path.abspath(self.db_path):
+            self.results = Aggregates.from_dict(state['results'])
+            self.last_id = state['last_id'] if self.results.rows == state['results']['rows'] else 0
+
+    def _save(self):
+        state = {
+            'source_key': self.source_key,
+            'dataset': self.dataset.to_dict(),
+            'db_path': os.path.abspath(self.db_path),
+            'last_id': self.last_id,
+            'results': self.results.to_dict(),
+        }
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def refresh(self):
+        """
+        Bring the aggregates up to date: recompute the dataset part if the
+        dataset changed, fold in screenings recorded since the last refresh.
+        The dataset sources are checked at most every source_check_seconds.
+        Returns: True if anything changed.
+        """
+        with self._lock:
+            changed = False
+            now = time.monotonic()
+            if self._source_checked is None or now - self._source_checked >= self.source_check_seconds:
+                self._source_checked = now
+                try:
+                    key = dataset_key(self.data_path)
+                except DataLoadError:
+                    key = None
+                if key is not None and key != self.source_key:
+                    self.dataset, skipped = dataset_aggregates(self.data_path)
+                    # Leave the key unset while files fail, so they are retried
+                    self.source_key = key if not skipped else None
+                    changed = True
+            if os.path.exists(self.db_path):
+                last_id = add_results_since(self.results, self.db_path, self.last_id)
+                changed = changed or last_id != self.last_id
+                self.last_id = last_id
+            if changed:
+                self.version += 1
+                self._save()
+            return changed
+
+    def charts(self, top_ethnicities=8):
+        """
+        Render the Analysis charts, re-rendered only after a refresh changed the aggregates.
+        'score_age' covers dataset records and screenings; 'family' and 'ethnicity'
+        use the dataset labels, and 'family_screenings' and 'ethnicity_screenings'
+        the screening outcomes (each only when that part has rows).
+        Returns: Dict of chart name to PNG bytes.
+        """
+        version, charts = self._charts
+        if version == self.version:
+            return charts
+        with self._lock:
+            version = self.version
+            # Copies, so rendering does not race the next refresh
+            dataset, results = self.dataset.copy(), self.results.copy()
+        score_age = dataset.score_age + results.score_age
+        charts = {'score_age': score_age_heatmap_png(score_age, AGE_MIN)}
+        if dataset.rows:
+            charts['family'] = family_history_png(dataset.asd_family)
+            charts['ethnicity'] = ethnicity_png(dataset.ethnicity, top_ethnicities)
+        if results.rows:
+            charts['family_screenings'] = family_history_png(
+                results.asd_family, SCREENING_OUTCOMES, "Screening Outcomes vs Family Members with ASD")
+            charts['ethnicity_screenings'] = ethnicity_png(
+                results.ethnicity, top_ethnicities, SCREENING_OUTCOMES, "Screening Outcomes by Ethnicity")
+        self._charts = (version, charts)
+        return charts
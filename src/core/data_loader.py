@@ -1,56 +1,207 @@
 # data_loader.py
-import streamlit as st
+import glob
+import os
 import pandas as pd
 import logging
-from src.config import DATA_PATH
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from src.config import DATA_SOURCES, FEATURE_COLS, INGEST_CHUNK_ROWS, INGEST_WORKERS
+from src.core.errors import DataLoadError
+from src.core.packed import PackedRecords
+from src.utils.metrics import count_error
 
-logging.basicConfig(filename='asd_app.log', level=logging.DEBUG)
+logger = logging.getLogger(__name__)
 
-def load_data():
+REQUIRED_COLS = ['A1', 'A2', 'A3', 'A4', 'A5', 'A6', 'A7', 'A8', 'A9', 'A10',
+                 'Jaundice', 'Family_mem_with_ASD', 'Age_Mons', 'Class ASD Traits']
+GLOB_CHARS = '*?['
+
+def resolve_sources(sources=DATA_SOURCES):
     """
-    Load and preprocess the dataset.
-    Returns: Preprocessed DataFrame or None if loading fails.
+    Expand data sources into the files they name. sources is a list or an
+    os.pathsep-separated string of files, directories (every *.csv directly
+    inside) and glob patterns (** matches subdirectories).
+    Returns: List of file paths, sorted within each source, without duplicates.
+    Raises: DataLoadError if no file matches.
     """
-    logging.debug(f"Attempting to load dataset from: {DATA_PATH}")
-    try:
-        df = pd.read_csv(DATA_PATH)
-        logging.debug("Dataset loaded successfully")
-        df.columns = [col.strip() for col in df.columns]
-        
-        # Validate required columns
-        required_cols = ['A1', 'A2', 'A3', 'A4', 'A5', 'A6', 'A7', 'A8', 'A9', 'A10', 
-                        'Jaundice', 'Family_mem_with_ASD', 'Age_Mons', 'Class ASD Traits']
-        if not all(col in df.columns for col in required_cols):
-            missing_cols = set(required_cols) - set(df.columns)
-            logging.error(f"Missing columns in dataset: {missing_cols}")
-            st.error(f"Dataset missing required columns: {missing_cols}")
-            return None
-        
-        # Preprocess Jaundice
-        if df['Jaundice'].dtype == object:  # Likely strings
-            df['Jaundice'] = df['Jaundice'].astype(str).str.strip().str.lower().map({'yes': 1, 'no': 0, 'nan': 0}).fillna(0)
-        else:  # Already numeric
-            df['Jaundice'] = pd.to_numeric(df['Jaundice'], errors='coerce').fillna(0).astype(int)
-
-        # Preprocess Family_mem_with_ASD
-        if df['Family_mem_with_ASD'].dtype == object:
-            df['Family_mem_with_ASD'] = df['Family_mem_with_ASD'].astype(str).str.strip().str.lower().map({'yes': 1, 'no': 0, 'nan': 0}).fillna(0)
+    specs = sources.split(os.pathsep) if isinstance(sources, str) else list(sources)
+    files, seen = [], set()
+    for spec in (str(s).strip() for s in specs):
+        if not spec:
+            continue
+        if os.path.isdir(spec):
+            matches = glob.glob(os.path.join(glob.escape(spec), '*.csv'))
+        elif any(c in spec for c in GLOB_CHARS):
+            matches = glob.glob(spec, recursive=True)
         else:
-            df['Family_mem_with_ASD'] = pd.to_numeric(df['Family_mem_with_ASD'], errors='coerce').fillna(0).astype(int)
+            matches = [spec]
+        matches = sorted(m for m in matches if os.path.isfile(m))
+        if not matches:
+            logger.warning(f"Data source {spec} matches no files")
+        for match in matches:
+            if os.path.abspath(match) not in seen:
+                seen.add(os.path.abspath(match))
+                files.append(match)
+    if not files:
+        raise DataLoadError(f"Dataset not found at {sources}")
+    return files
+
+def _run_source(fn, path):
+    # Validation failures are returned rather than raised out of the pool
+    try:
+        return fn(path), None
+    except DataLoadError as e:
+        return None, str(e)
 
-        # Preprocess Class ASD Traits
-        if df['Class ASD Traits'].dtype == object:
-            df['Class ASD Traits'] = df['Class ASD Traits'].astype(str).str.strip().str.upper().map({'YES': 1, 'NO': 0, 'nan': 0}).fillna(0)
+def map_sources(fn, files, max_workers=INGEST_WORKERS):
+    """
+    Call fn(path) for every file in a process pool (in this process for a
+    single file). fn must be picklable. A file that fails with DataLoadError,
+    e.g. one missing required columns, is logged and skipped.
+    Returns: List of (path, result) pairs in file order.
+    Raises: DataLoadError if no file could be processed.
+    """
+    if len(files) == 1 or max_workers == 1:
+        outcomes = [_run_source(fn, path) for path in files]
+    else:
+        with ProcessPoolExecutor(max_workers=min(len(files), max_workers or os.cpu_count())) as pool:
+            outcomes = list(pool.map(_run_source, [fn] * len(files), files))
+    results, error = [], None
+    for path, (result, error_message) in zip(files, outcomes):
+        if error_message is None:
+            results.append((path, result))
         else:
-            df['Class ASD Traits'] = pd.to_numeric(df['Class ASD Traits'], errors='coerce').fillna(0).astype(int)
+            error = error_message
+            count_error('ingest_file')
+            logger.error(f"Skipping data source {path}: {error_message}")
+    if not results:
+        raise DataLoadError(f"No valid dataset among {len(files)} source files: {error}")
+    return results
+
+def check_columns(df, required=REQUIRED_COLS):
+    """
+    Strip the column names of a raw dataset (or chunk) in place and check
+    that the required columns are present.
+    Returns: The same DataFrame.
+    Raises: DataLoadError if required columns are missing.
+    """
+    df.columns = [col.strip() for col in df.columns]
+    if not all(col in df.columns for col in required):
+        missing_cols = set(required) - set(df.columns)
+        logger.error(f"Missing columns in dataset: {missing_cols}")
+        raise DataLoadError(f"Dataset missing required columns: {missing_cols}")
+    return df
+
+def preprocess_data(df):
+    """
+    Validate and preprocess a raw dataset (or one chunk of it) in place.
+    Returns: Preprocessed DataFrame.
+    Raises: DataLoadError if required columns are missing.
+    """
+    check_columns(df)
+
+    # Preprocess Jaundice
+    if df['Jaundice'].dtype == object:  # Likely strings
+        df['Jaundice'] = df['Jaundice'].astype(str).str.strip().str.lower().map({'yes': 1, 'no': 0, 'nan': 0}).fillna(0)
+    else:  # Already numeric
+        df['Jaundice'] = pd.to_numeric(df['Jaundice'], errors='coerce').fillna(0).astype(int)
+
+    # Preprocess Family_mem_with_ASD
+    if df['Family_mem_with_ASD'].dtype == object:
+        df['Family_mem_with_ASD'] = df['Family_mem_with_ASD'].astype(str).str.strip().str.lower().map({'yes': 1, 'no': 0, 'nan': 0}).fillna(0)
+    else:
+        df['Family_mem_with_ASD'] = pd.to_numeric(df['Family_mem_with_ASD'], errors='coerce').fillna(0).astype(int)
+
+    # Preprocess Class ASD Traits
+    if df['Class ASD Traits'].dtype == object:
+        df['Class ASD Traits'] = df['Class ASD Traits'].astype(str).str.strip().str.upper().map({'YES': 1, 'NO': 0, 'nan': 0}).fillna(0)
+    else:
+        df['Class ASD Traits'] = pd.to_numeric(df['Class ASD Traits'], errors='coerce').fillna(0).astype(int)
+
+    return df
 
-        logging.debug("Dataset preprocessed successfully")
+def load_data(path=DATA_SOURCES, packed=False, max_workers=INGEST_WORKERS):
+    """
+    Load and preprocess the dataset at path (defaults to DATA_SOURCES).
+    When path names several files (see resolve_sources), they are parsed in
+    a process pool; files that fail validation are skipped and the rest are
+    concatenated in order.
+    A .npz file written by PackedRecords.save is read as packed records.
+    With packed=True the CSV is streamed in chunks and each raw chunk is
+    packed, so the full pandas table is never held in memory. Packing does
+    not need the Class ASD Traits column, so unlabeled sheets can be packed
+    for prediction; rows failing screening_checks are flagged in the records.
+    Returns: Preprocessed DataFrame, or PackedRecords if packed is True.
+    Raises: DataLoadError if the dataset cannot be loaded.
+    """
+    files = resolve_sources(path)
+    if len(files) > 1:
+        parts = [part for _, part in map_sources(partial(load_file, packed=packed), files, max_workers)]
+        return PackedRecords.concat(parts) if packed else pd.concat(parts, ignore_index=True)
+    return load_file(files[0], packed)
+
+def load_file(path, packed=False):
+    """
+    Load and preprocess a single dataset file (see load_data).
+    Returns: Preprocessed DataFrame, or PackedRecords if packed is True.
+    Raises: DataLoadError if the file cannot be loaded or is missing columns.
+    """
+    logger.debug(f"Attempting to load dataset from: {path}")
+    if str(path).lower().endswith('.npz'):
+        return _load_packed(path, packed)
+    if packed:
+        chunks = iter_data(path, prepare=partial(check_columns, required=FEATURE_COLS))
+        return PackedRecords.concat(PackedRecords.from_frame(chunk) for chunk in chunks)
+    try:
+        df = pd.read_csv(path)
+        logger.debug("Dataset loaded successfully")
+        df = preprocess_data(df)
+        logger.debug("Dataset preprocessed successfully")
         return df
-    except FileNotFoundError:
-        logging.error(f"Dataset not found at {DATA_PATH}")
-        
-        return None
+    except DataLoadError:
+        raise
+    except FileNotFoundError as e:
+        logger.error(f"Dataset not found at {path}")
+        raise DataLoadError(f"Dataset not found at {path}") from e
+    except Exception as e:
+        logger.error(f"Error loading dataset: {e}")
+        raise DataLoadError(f"Error loading dataset: {e}") from e
+
+def _load_packed(path, packed):
+    try:
+        records = PackedRecords.load(path)
+    except FileNotFoundError as e:
+        logger.error(f"Dataset not found at {path}")
+        raise DataLoadError(f"Dataset not found at {path}") from e
+    except Exception as e:
+        logger.error(f"Error loading packed dataset: {e}")
+        raise DataLoadError(f"Error loading packed dataset: {e}") from e
+    return records if packed else records.to_frame()
+
+def iter_data(path=DATA_SOURCES, chunksize=INGEST_CHUNK_ROWS, columns=REQUIRED_COLS, prepare=preprocess_data):
+    """
+    Stream the dataset in preprocessed chunks of at most chunksize rows,
+    one source file after another. Only the given columns are read, so
+    memory follows the chunk size instead of the size of the files.
+    Each chunk is passed through prepare (preprocess_data by default).
+    Yields: Preprocessed DataFrame chunks.
+    Raises: DataLoadError if a source file cannot be read.
+    """
+    for file in resolve_sources(path):
+        yield from _iter_file(file, chunksize, columns, prepare)
+
+def _iter_file(path, chunksize, columns, prepare):
+    logger.debug(f"Streaming dataset from: {path} ({chunksize} rows per chunk)")
+    wanted = set(columns)
+    try:
+        reader = pd.read_csv(path, chunksize=chunksize, usecols=lambda col: col.strip() in wanted)
+        for chunk in reader:
+            yield prepare(chunk)
+    except DataLoadError:
+        raise
+    except FileNotFoundError as e:
+        logger.error(f"Dataset not found at {path}")
+        raise DataLoadError(f"Dataset not found at {path}") from e
     except Exception as e:
-        logging.error(f"Error loading dataset: {e}")
-        st.error(f"Error loading dataset: {e}")
-        return None
\ No newline at end of file
+        logger.error(f"Error streaming dataset: {e}")
+        raise DataLoadError(f"Error streaming dataset: {e}") from e
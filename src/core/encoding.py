@@ -0,0 +1,138 @@
+# encoding.py
+import numpy as np
+import pandas as pd
+
+from src.config import AGE_MAX, AGE_MIN
+
+# Bump whenever an encoding rule below changes; cached features are keyed on it
+ENCODING_VERSION = 1
+
+QCHAT_COLS = ['A1', 'A2', 'A3', 'A4', 'A5', 'A6', 'A7', 'A8', 'A9', 'A10']
+ANSWER_OPTIONS = ['always', 'usually', 'sometimes', 'rarely', 'never']
+DEFAULT_ANSWER_CODE = ANSWER_OPTIONS.index('never')
+
+# Lookup table indexed by [question, answer code] -> binary Q-Chat value.
+# A1-A9 score 1 for sometimes/rarely/never, A10 has reversed scoring.
+ANSWER_LUT = np.array(
+    [[0, 0, 1, 1, 1]] * 9 + [[1, 1, 1, 0, 0]],
+    dtype=np.uint8
+)
+
+
+def answer_codes(values):
+    """
+    Map raw answer strings to their index in ANSWER_OPTIONS.
+    Invalid or missing answers default to 'never', like convert_answers.
+    Returns: int8 NumPy array of answer codes.
+    """
+    normalized = pd.Series(values, copy=False).astype(str).str.strip().str.lower()
+    codes = pd.Categorical(normalized, categories=ANSWER_OPTIONS).codes
+    return np.where(codes < 0, DEFAULT_ANSWER_CODE, codes).astype(np.int8)
+
+
+def encode_answer_column(values, question_idx):
+    """
+    Encode one Q-Chat column to binary values.
+    Numeric columns are treated as already scored and clipped to 0/1.
+    Returns: uint8 NumPy array.
+    """
+    series = pd.Series(values, copy=False)
+    if pd.api.types.is_numeric_dtype(series):
+        return (series.fillna(0).to_numpy() > 0).astype(np.uint8)
+    return ANSWER_LUT[question_idx, answer_codes(series)]
+
+
+def encode_answers_frame(df):
+    """
+    Encode the A1-A10 columns of a DataFrame in one vectorized pass.
+    Returns: uint8 NumPy array of shape (n_rows, 10).
+    """
+    out = np.empty((len(df), len(QCHAT_COLS)), dtype=np.uint8)
+    for i, col in enumerate(QCHAT_COLS):
+        out[:, i] = encode_answer_column(df[col], i)
+    return out
+
+
+def encode_yes_no(values):
+    """
+    Encode a yes/no column to 1/0. Anything other than 'yes' maps to 0.
+    Returns: uint8 NumPy array.
+    """
+    series = pd.Series(values, copy=False)
+    if pd.api.types.is_numeric_dtype(series):
+        return (series.fillna(0).to_numpy() > 0).astype(np.uint8)
+    return (series.astype(str).str.strip().str.lower() == 'yes').to_numpy().astype(np.uint8)
+
+
+def encoding_rules():
+    """
+    Describe every encoding rule so caches can be invalidated when one changes.
+    Returns: JSON-serializable dict.
+    """
+    return {
+        'version': ENCODING_VERSION,
+        'qchat_cols': QCHAT_COLS,
+        'answer_options': ANSWER_OPTIONS,
+        'default_answer': ANSWER_OPTIONS[DEFAULT_ANSWER_CODE],
+        'answer_lut': ANSWER_LUT.tolist(),
+        'yes_no': {'yes': 1, 'other': 0},
+        'label': {'YES': 1, 'NO': 0, 'other': 0},
+    }
+
+
+def encode_label(values):
+    """
+    Encode the Class ASD Traits column to 1/0 ('YES' -> 1, anything else -> 0).
+    Returns: uint8 NumPy array.
+    """
+    series = pd.Series(values, copy=False)
+    if pd.api.types.is_numeric_dtype(series):
+        return (series.fillna(0).to_numpy() > 0).astype(np.uint8)
+    return (series.astype(str).str.strip().str.upper() == 'YES').to_numpy().astype(np.uint8)
+
+
+def _invalid_masks(frame, valid_strings):
+    # Already-scored columns must be 0/1; text must be one of valid_strings.
+    # All text columns are normalized in one pass, which keeps single rows cheap.
+    masks = np.empty(frame.shape, dtype=bool)
+    text_cols = []
+    for i, dtype in enumerate(frame.dtypes):
+        if pd.api.types.is_numeric_dtype(dtype):
+            masks[:, i] = ~np.isin(frame.iloc[:, i].to_numpy(), [0, 1])
+        else:
+            text_cols.append(i)
+    if text_cols:
+        values = pd.Series(frame.iloc[:, text_cols].to_numpy(dtype=object).ravel(order='F'))
+        normalized = values.astype(str).str.strip().str.lower()
+        invalid = (~normalized.isin(valid_strings) | values.isna()).to_numpy()
+        masks[:, text_cols] = invalid.reshape((len(frame), len(text_cols)), order='F')
+    return masks
+
+
+def screening_checks(df):
+    """
+    Apply the validation rules of screening_errors column by column.
+    Returns: List of (column, boolean NumPy mask of invalid rows) pairs.
+    """
+    flag_cols = ['Jaundice', 'Family_mem_with_ASD']
+    checks = list(zip(QCHAT_COLS, _invalid_masks(df[QCHAT_COLS], ANSWER_OPTIONS).T))
+    checks += list(zip(flag_cols, _invalid_masks(df[flag_cols], ['yes', 'no']).T))
+    ages = pd.to_numeric(df['Age_Mons'], errors='coerce')
+    checks.append(('Age_Mons', (ages.isna() | (ages < AGE_MIN) | (ages > AGE_MAX)).to_numpy()))
+    return checks
+
+
+def screening_errors(df):
+    """
+    Find the rows of a raw screening batch that cannot be scored as given:
+    unknown answers, yes/no values other than yes or no, and missing,
+    non-numeric or out-of-range (AGE_MIN..AGE_MAX) ages. The lenient
+    encoders above would silently default these.
+    Returns: Array of error strings per row ('' for valid rows).
+    """
+    checks = screening_checks(df)
+    errors = np.full(len(df), '', dtype=object)
+    invalid = np.logical_or.reduce([mask for _, mask in checks]) if len(df) else np.zeros(0, dtype=bool)
+    for i in np.flatnonzero(invalid):
+        errors[i] = "; ".join(f"{col}={str(df[col].iloc[i])!r}" for col, mask in checks if mask[i])
+    return errors
@@ -0,0 +1,236 @@
+# engines.py
+"""
+Pluggable scoring engines.
+
+Anything with classes_ and predict_proba(X) can be passed to make_prediction.
+The engines differ in how they score:
+- forest: the fitted sklearn RandomForestClassifier (joblib file);
+- flat_forest: the same forest flattened into memory-mapped arrays (default);
+- linear: an integer-weighted sum of the 13 features through a logistic link;
+- tree: a single shallow decision tree walked level by level over node
+  arrays (and by a plain loop for single rows).
+
+The linear and tree engines are fitted on a registry entry's own training
+data when the entry is registered (or by ensure_model, which holds that data,
+for entries registered without them) and saved next to it as small JSON
+files (engines/<name>.json). They trade
+some accuracy for a scoring cost of a few microseconds and a few hundred
+bytes of state. Choose one per deployment with ASD_SCORING_ENGINE, and
+compare them with `python -m src.evaluation --engines forest,linear,tree`.
+"""
+import json
+import logging
+import math
+import os
+import numpy as np
+
+from src.config import ENGINE_FIT_ROWS, FEATURE_COLS, LINEAR_WEIGHT_SCALE, SHALLOW_TREE_DEPTH
+from src.core.errors import ModelError
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ('forest', 'flat_forest', 'linear', 'tree')
+# Engines that serve the registry's forest itself (the probability table applies to these)
+FOREST_ENGINES = ('forest', 'flat_forest')
+
+
+class ScoringEngine:
+    """
+    Small fitted engine with an sklearn-like predict_proba and a JSON form.
+    """
+    name = None
+
+    def __init__(self, feature_names=FEATURE_COLS):
+        self.classes_ = np.array([0, 1])
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.shape[0] == 1:
+            # Single screenings skip the array machinery altogether
+            p1 = self.score_row(X[0].tolist())
+            return np.array([[1.0 - p1, p1]])
+        p1 = self._proba(X)
+        return np.column_stack([1.0 - p1, p1])
+
+    def predict(self, X):
+        return self.classes_[(self.predict_proba(X)[:, 1] > 0.5).astype(int)]
+
+    @property
+    def nbytes(self):
+        return len(json.dumps(self.to_dict()))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'engine': self.name, **self.to_dict()}, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+class LinearScoreEngine(ScoringEngine):
+    """
+    proba = sigmoid((x @ weights + intercept) / scale) with integer weights.
+    """
+    name = 'linear'
+
+    def __init__(self, weights, intercept, scale=LINEAR_WEIGHT_SCALE, feature_names=FEATURE_COLS):
+        super().__init__(feature_names)
+        self.weights = np.asarray(weights, dtype=np.int64)
+        self.intercept = int(intercept)
+        self.scale = scale
+        self._weights = self.weights.tolist()
+
+    @classmethod
+    def fit(cls, x, y, scale=LINEAR_WEIGHT_SCALE):
+        """
+        Fit a class-balanced logistic regression and round its weights to integers.
+        Returns: LinearScoreEngine.
+        """
+        from sklearn.linear_model import LogisticRegression
+
+        model = LogisticRegression(class_weight='balanced', max_iter=1000).fit(x, y)
+        return cls(np.rint(model.coef_[0] * scale), round(float(model.intercept_[0]) * scale), scale)
+
+    def score_row(self, row):
+        score = self.intercept + sum(w * v for w, v in zip(self._weights, row))
+        return 1.0 / (1.0 + math.exp(-score / self.scale))
+
+    def _proba(self, X):
+        score = X @ self.weights + self.intercept
+        return 1.0 / (1.0 + np.exp(-score / self.scale))
+
+    def to_dict(self):
+        return {'weights': self.weights.tolist(), 'intercept': self.intercept, 'scale': self.scale,
+                'feature_names': [str(c) for c in self.feature_names_in_]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['weights'], data['intercept'], data['scale'], data['feature_names'])
+
+
+class ShallowTreeEngine(ScoringEngine):
+    """
+    One shallow decision tree stored as node arrays (sklearn's tree_ layout).
+    """
+    name = 'tree'
+
+    def __init__(self, feature, threshold, left, right, value, feature_names=FEATURE_COLS):
+        super().__init__(feature_names)
+        self.feature = [int(f) for f in feature]
+        self.threshold = [float(t) for t in threshold]
+        self.left = [int(n) for n in left]
+        self.right = [int(n) for n in right]
+        self.value = [float(v) for v in value]
+        # Leaves point to themselves, so every row can take max_depth steps
+        nodes = np.arange(len(self.left))
+        is_leaf = np.asarray(self.left) == -1
+        self._feature = np.where(is_leaf, 0, self.feature)
+        self._threshold = np.asarray(self.threshold, dtype=np.float64)
+        self._left = np.where(is_leaf, nodes, self.left)
+        self._right = np.where(is_leaf, nodes, self.right)
+        self._value = np.asarray(self.value, dtype=np.float64)
+        self.max_depth = self._depth(0)
+
+    def _depth(self, node):
+        if self.left[node] == -1:
+            return 0
+        return 1 + max(self._depth(self.left[node]), self._depth(self.right[node]))
+
+    @classmethod
+    def fit(cls, x, y, max_depth=SHALLOW_TREE_DEPTH):
+        """
+        Fit a class-balanced decision tree.
+        Returns: ShallowTreeEngine.
+        """
+        from sklearn.tree import DecisionTreeClassifier
+
+        tree = DecisionTreeClassifier(max_depth=max_depth, class_weight='balanced', random_state=42).fit(x, y).tree_
+        fractions = tree.value[:, 0, :] / tree.value[:, 0, :].sum(axis=1, keepdims=True)
+        return cls(tree.feature, tree.threshold, tree.children_left, tree.children_right, fractions[:, 1])
+
+    def score_row(self, row):
+        node = 0
+        while self.left[node] != -1:
+            node = self.left[node] if row[self.feature[node]] <= self.threshold[node] else self.right[node]
+        return self.value[node]
+
+    def _proba(self, X):
+        node = np.zeros(X.shape[0], dtype=np.int64)
+        rows = np.arange(X.shape[0])
+        for _ in range(self.max_depth):
+            go_left = X[rows, self._feature[node]] <= self._threshold[node]
+            node = np.where(go_left, self._left[node], self._right[node])
+        return self._value[node]
+
+    def to_dict(self):
+        return {'feature': self.feature, 'threshold': self.threshold, 'left': self.left, 'right': self.right,
+                'value': self.value, 'feature_names': [str(c) for c in self.feature_names_in_]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['feature'], data['threshold'], data['left'], data['right'], data['value'],
+                   data['feature_names'])
+
+
+FITTED_ENGINES = {'linear': LinearScoreEngine, 'tree': ShallowTreeEngine}
+
+
+def engine_training_data(data, max_rows=ENGINE_FIT_ROWS):
+    """
+    Encoded features and labels from a DataFrame or an (x, y) pair, evenly
+    subsampled to at most max_rows rows.
+    Returns: float64 feature array and int label array.
+    """
+    if isinstance(data, tuple):
+        x, y = data
+    else:
+        from src.core.model_trainer import prepare_training_data
+
+        x, y = prepare_training_data(data)
+    step = max(1, -(-len(y) // max_rows))
+    return np.asarray(x[::step], dtype=np.float64), np.asarray(y[::step], dtype=np.int64)
+
+
+def fit_engine(name, data):
+    """
+    Returns: Fitted lightweight engine.
+    """
+    return FITTED_ENGINES[name].fit(*engine_training_data(data))
+
+
+def build_engines(entry_dir, data):
+    """
+    Fit every lightweight engine on data and save it under entry_dir/engines.
+    data must be the training data of the model stored in entry_dir.
+    """
+    x, y = engine_training_data(data)
+    for name, engine_cls in FITTED_ENGINES.items():
+        engine = engine_cls.fit(x, y)
+        engine.save(os.path.join(entry_dir, 'engines', f'{name}.json'))
+        logger.info(f"Built {name} scoring engine in {entry_dir} ({engine.nbytes} bytes)")
+
+
+def engine_path(registry, key, name):
+    return os.path.join(registry.entry_dir(key), 'engines', f'{name}.json')
+
+
+def load_engine(name, registry, key):
+    """
+    Load the named engine for a registry entry.
+    Returns: Model object with predict_proba.
+    Raises: ModelError for an unknown engine or a lightweight engine that was
+    not built with the entry.
+    """
+    if name == 'forest':
+        return registry.load_model(key)
+    if name == 'flat_forest':
+        return registry.load_serving(key)
+    if name not in FITTED_ENGINES:
+        raise ModelError(f"Unknown scoring engine {name!r}; choose one of {', '.join(ENGINES)}")
+    path = engine_path(registry, key, name)
+    if not os.path.exists(path):
+        raise ModelError(f"Scoring engine {name!r} was not built for model {key}; it is built from the "
+                         f"model's training data by python -m src.snapshot build or the retrainer")
+    with open(path) as f:
+        return FITTED_ENGINES[name].from_dict(json.load(f))
@@ -0,0 +1,21 @@
+# errors.py
+
+
+class ASDError(Exception):
+    """Base class for errors raised by the ASD core."""
+
+
+class DataLoadError(ASDError):
+    """Raised when the dataset cannot be loaded or is missing columns."""
+
+
+class ModelError(ASDError):
+    """Raised when a model cannot be loaded or trained."""
+
+
+class PredictionError(ASDError):
+    """Raised when input cannot be scored."""
+
+
+class SchedulerBusyError(ASDError):
+    """Raised when a shared work queue is full."""
@@ -0,0 +1,90 @@
+# explainer.py
+"""
+Per-prediction feature contributions for the served forest.
+
+Each split on a child's decision path moves the ASD probability, and the
+change is credited to the feature that was split on (FlatForest.contributions).
+The paths of all trees and of a whole batch of children are walked together
+in max_depth vectorized steps, so explaining one screening costs about as
+much as scoring it. The forest's prior plus the contributions add up to the
+probability that was returned.
+"""
+import logging
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+
+from src.config import EXPLAIN_TOP_FEATURES
+from src.core.errors import PredictionError
+from src.core.flat_forest import FlatForest
+from src.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# sklearn forests flattened for explanations, kept while the model is alive
+_flattened = weakref.WeakKeyDictionary()
+_flatten_lock = threading.Lock()
+
+
+def serving_forest(model):
+    """
+    Find the forest behind a serving model (FlatForest, probability-table
+    wrapper or fitted RandomForestClassifier).
+    Returns: FlatForest.
+    Raises: PredictionError if the model is not a tree ensemble.
+    """
+    # TabulatedModel and similar wrappers keep the live model in .model
+    while not isinstance(model, FlatForest) and hasattr(model, 'model'):
+        model = model.model
+    if isinstance(model, FlatForest):
+        return model
+    if not hasattr(model, 'estimators_'):
+        raise PredictionError(f"Cannot explain predictions of {type(model).__name__}")
+    with _flatten_lock:
+        forest = _flattened.get(model)
+        if forest is None:
+            forest = _flattened[model] = FlatForest.from_model(model)
+    return forest
+
+
+@timed('explain')
+def explain_features(model, features):
+    """
+    Contributions of every feature to the ASD probability, for a batch.
+    Returns: Prior probability and a DataFrame of contributions shaped like features.
+    """
+    forest = serving_forest(model)
+    bias, contributions = forest.contributions(np.asarray(features))
+    columns = features.columns if hasattr(features, 'columns') else forest.feature_names_in_
+    index = features.index if hasattr(features, 'index') else None
+    return bias, pd.DataFrame(contributions, columns=columns, index=index)
+
+
+def top_contributions(row, top=EXPLAIN_TOP_FEATURES):
+    """
+    Largest contributions of one row (a Series indexed by feature), strongest first.
+    Returns: List of (feature, contribution) pairs.
+    """
+    order = np.argsort(-np.abs(row.to_numpy()), kind='stable')[:top]
+    return [(str(row.index[i]), float(row.iloc[i])) for i in order]
+
+
+def explain_prediction(model, binary_answers, jaundice, family_asd, age_mons, feature_cols, top=EXPLAIN_TOP_FEATURES):
+    """
+    Explain a single screening scored by make_prediction.
+    Returns: Dict with 'bias' and the 'contributions' of the top features.
+    Raises: PredictionError if the input cannot be explained.
+    """
+    input_vec = list(binary_answers) + [int(jaundice.lower() == 'yes'), int(family_asd.lower() == 'yes'), age_mons]
+    if len(input_vec) != len(feature_cols):
+        raise PredictionError("Input vector length mismatch with expected features.")
+    bias, contributions = explain_features(model, pd.DataFrame([input_vec], columns=feature_cols))
+    return {'bias': bias, 'contributions': top_contributions(contributions.iloc[0], top)}
+
+
+def format_contributions(contributions):
+    """
+    Returns: Lines like 'A7: +0.124' for display and reports.
+    """
+    return [f"{feature}: {value:+.3f}" for feature, value in contributions]
@@ -0,0 +1,274 @@
+# feature_store.py
+"""
+On-disk cache of the fully encoded feature matrix and labels.
+
+Entries live in FEATURE_CACHE_DIR/<key>/ as plain .npy files, where key is
+built from the source file's SHA-256 and the encoding rules. A cache hit is
+a memory-mapped load; a miss streams the source in chunks, encoding each one
+straight to disk, so building an entry never holds the raw table in memory.
+
+When the data sources resolve to several files, each file gets its own entry,
+built in a process pool, and a merged entry keyed by all of the files' keys
+lists the per-file entries it is made of; it holds no arrays of its own, so
+the matrix is stored once. A file whose size and mtime have not changed is
+not even re-hashed, so a daily refresh only encodes the new exports. A file
+that fails validation leaves no entry and is retried on the next load; the
+merged entry of the files that did load is keyed by their keys only.
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+from functools import partial
+import numpy as np
+import pandas as pd
+
+from src.config import DATA_SOURCES, FEATURE_CACHE_DIR, FEATURE_COLS, INGEST_CHUNK_ROWS, INGEST_WORKERS, TRAIN_CHUNK_ROWS
+from src.core.data_loader import iter_data, map_sources, resolve_sources
+from src.core.encoding import encode_answers_frame, encode_label, encode_yes_no, encoding_rules
+from src.core.errors import DataLoadError
+from src.utils.fingerprint import file_fingerprint, stable_hash
+from src.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+LABEL_COL = 'Class ASD Traits'
+
+
+def source_fingerprint(path, cache_dir=FEATURE_CACHE_DIR):
+    """
+    SHA-256 of the source file, remembered per (size, mtime) so an unchanged
+    file is not re-read on every load.
+    Returns: Hex digest.
+    """
+    stat = os.stat(path)
+    index_path = os.path.join(cache_dir, 'sources.json')
+    entry_key = os.path.abspath(path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    cached = index.get(entry_key)
+    if cached and cached['stamp'] == stamp:
+        return cached['sha256']
+
+    digest = file_fingerprint(path)
+    index[entry_key] = {'stamp': stamp, 'sha256': digest}
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+    return digest
+
+
+def cache_key(path, cache_dir=FEATURE_CACHE_DIR):
+    """
+    Returns: Cache key for the source file under the current encoding rules.
+    """
+    return stable_hash({
+        'source_sha256': source_fingerprint(path, cache_dir),
+        'rules': encoding_rules(),
+        'feature_cols': FEATURE_COLS,
+    })[:20]
+
+
+def dataset_key(sources=DATA_SOURCES, cache_dir=FEATURE_CACHE_DIR):
+    """
+    Returns: Cache key of the dataset the sources resolve to (the file's own
+    key for a single file).
+    Raises: DataLoadError if no source file exists.
+    """
+    return _dataset_key([cache_key(path, cache_dir) for path in resolve_sources(sources)])
+
+
+def _dataset_key(keys):
+    return keys[0] if len(keys) == 1 else stable_hash({'parts': keys})[:20]
+
+
+def encode_dataset(df):
+    """
+    Encode a preprocessed dataset (as returned by load_data).
+    Returns: int16 feature matrix ordered like FEATURE_COLS and uint8 labels.
+    """
+    x = np.empty((len(df), len(FEATURE_COLS)), dtype=np.int16)
+    x[:, :10] = encode_answers_frame(df)
+    x[:, 10] = encode_yes_no(df['Jaundice'])
+    x[:, 11] = encode_yes_no(df['Family_mem_with_ASD'])
+    x[:, 12] = pd.to_numeric(df['Age_Mons'], errors='coerce').fillna(0).astype(int).to_numpy()
+    y = encode_label(df[LABEL_COL])
+    return x, y
+
+
+def _write_npy(path, raw_path, dtype, shape):
+    """
+    Wrap a file of raw C-ordered array bytes in an .npy header, copying in blocks.
+    """
+    with open(path, 'wb') as out, open(raw_path, 'rb') as raw:
+        header = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': shape}
+        np.lib.format.write_array_header_1_0(out, header)
+        shutil.copyfileobj(raw, out, 1 << 20)
+    os.remove(raw_path)
+
+
+def _publish_entry(entry_dir, fill):
+    """
+    Build a cache entry with fill(tmp_dir) in a temporary directory and
+    publish it with an atomic rename.
+    Returns: What fill returned.
+    """
+    parent = os.path.dirname(entry_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+    try:
+        result = fill(tmp_dir)
+        os.rename(tmp_dir, entry_dir)
+    except OSError:
+        # Another process published the same entry first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not os.path.isdir(entry_dir):
+            raise
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return result
+
+
+def _write_meta(entry_dir, meta):
+    with open(os.path.join(entry_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+
+def _write_entry(entry_dir, chunks, meta):
+    """
+    Encode (x, y) chunks into a new cache entry. The arrays are appended to
+    disk chunk by chunk and the entry is published with an atomic rename.
+    Returns: Number of rows written.
+    """
+    def fill(tmp_dir):
+        x_raw, y_raw = os.path.join(tmp_dir, 'x.bin'), os.path.join(tmp_dir, 'y.bin')
+        n_rows = 0
+        with open(x_raw, 'wb') as fx, open(y_raw, 'wb') as fy:
+            for x, y in chunks:
+                fx.write(np.ascontiguousarray(x, dtype=np.int16).tobytes())
+                fy.write(np.ascontiguousarray(y, dtype=np.uint8).tobytes())
+                n_rows += len(y)
+        _write_npy(os.path.join(tmp_dir, 'x.npy'), x_raw, np.int16, (n_rows, len(FEATURE_COLS)))
+        _write_npy(os.path.join(tmp_dir, 'y.npy'), y_raw, np.uint8, (n_rows,))
+        _write_meta(tmp_dir, {**meta, 'rows': n_rows})
+        return n_rows
+
+    return _publish_entry(entry_dir, fill)
+
+
+def _build_file_entry(path, cache_dir=FEATURE_CACHE_DIR, chunksize=INGEST_CHUNK_ROWS):
+    """
+    Encode one source file into its own cache entry unless it exists.
+    Returns: Entry directory.
+    Raises: DataLoadError if the file cannot be read or is missing columns.
+    """
+    entry_dir = os.path.join(cache_dir, cache_key(path, cache_dir))
+    if not os.path.isdir(entry_dir):
+        chunks = (encode_dataset(chunk) for chunk in iter_data(path, chunksize))
+        n_rows = _write_entry(entry_dir, chunks, {'source': os.path.abspath(path), 'rules': encoding_rules()})
+        logger.info(f"Feature cache written: {entry_dir} ({n_rows} rows)")
+    return entry_dir
+
+
+def _merge_sources(files, keys, cache_dir, chunksize, max_workers):
+    """
+    Build the missing per-file entries in a process pool, then publish a
+    merged entry referencing all valid ones. Files that fail validation are
+    skipped without caching anything for them, so they are retried on the
+    next load. Older merged entries are removed.
+    Returns: Merged entry directory (the part's own entry if only one file is valid).
+    Raises: DataLoadError if no source file is valid.
+    """
+    part_dirs = [os.path.join(cache_dir, key) for key in keys]
+    missing = [path for path, part in zip(files, part_dirs) if not os.path.isdir(part)]
+    if missing:
+        logger.info(f"Encoding {len(missing)} of {len(files)} source files")
+        try:
+            map_sources(partial(_build_file_entry, cache_dir=cache_dir, chunksize=chunksize), missing, max_workers)
+        except DataLoadError as e:
+            logger.error(f"No new source file could be encoded: {e}")
+    valid = [(path, key) for path, key, part in zip(files, keys, part_dirs) if os.path.isdir(part)]
+    if not valid:
+        raise DataLoadError(f"No valid dataset among {len(files)} source files")
+
+    entry_dir = os.path.join(cache_dir, _dataset_key([key for _, key in valid]))
+    if os.path.isdir(entry_dir):
+        return entry_dir
+    meta = {'sources': [os.path.abspath(path) for path, _ in valid], 'parts': [key for _, key in valid],
+            'rules': encoding_rules()}
+    _publish_entry(entry_dir, lambda tmp_dir: _write_meta(tmp_dir, meta))
+    logger.info(f"Feature cache merged: {entry_dir} ({len(valid)} of {len(files)} files)")
+    for name in os.listdir(cache_dir):
+        stale_dir = os.path.join(cache_dir, name)
+        if name == os.path.basename(entry_dir) or not os.path.isdir(stale_dir):
+            continue
+        try:
+            with open(os.path.join(stale_dir, 'meta.json')) as f:
+                is_merged = 'parts' in json.load(f)
+        except (OSError, ValueError):
+            continue
+        if is_merged:
+            shutil.rmtree(stale_dir, ignore_errors=True)
+    return entry_dir
+
+
+def _load_entry(entry_dir):
+    """
+    Returns: (x, y) of a cache entry; memory-mapped for a per-file entry,
+    concatenated from the memory-mapped parts for a merged one.
+    Raises: DataLoadError if the entry, or a part of it, has been removed.
+    """
+    try:
+        with open(os.path.join(entry_dir, 'meta.json')) as f:
+            parts = json.load(f).get('parts')
+        if parts is None:
+            return (np.load(os.path.join(entry_dir, 'x.npy'), mmap_mode='r'),
+                    np.load(os.path.join(entry_dir, 'y.npy'), mmap_mode='r'))
+        loaded = [_load_entry(os.path.join(os.path.dirname(entry_dir), key)) for key in parts]
+    except FileNotFoundError as e:
+        raise DataLoadError(f"Feature cache entry {entry_dir} was removed while loading: {e}") from e
+    return np.concatenate([x for x, _ in loaded]), np.concatenate([y for _, y in loaded])
+
+
+@timed('load_features')
+def load_feature_matrix(path=DATA_SOURCES, cache_dir=FEATURE_CACHE_DIR, chunksize=INGEST_CHUNK_ROWS,
+                        max_workers=INGEST_WORKERS):
+    """
+    Load the encoded feature matrix and labels of every source file, building
+    the cache entries if needed.
+    Returns: (x, y) NumPy arrays; x columns follow FEATURE_COLS. They are
+    memory-mapped for a single source file; for several files the parts are
+    concatenated in memory (the encoded matrix, never the raw table).
+    Raises: DataLoadError if the source dataset cannot be loaded.
+    """
+    files = resolve_sources(path)
+    keys = [cache_key(file, cache_dir) for file in files]
+    entry_dir = os.path.join(cache_dir, _dataset_key(keys))
+    if os.path.isdir(entry_dir):
+        logger.debug(f"Feature cache hit: {entry_dir}")
+    elif len(files) == 1:
+        _build_file_entry(files[0], cache_dir, chunksize)
+    else:
+        entry_dir = _merge_sources(files, keys, cache_dir, chunksize, max_workers)
+    return _load_entry(entry_dir)
+
+
+def iter_training_frames(x, y, chunk_rows=TRAIN_CHUNK_ROWS):
+    """
+    Slice an encoded matrix into DataFrames with FEATURE_COLS and the label
+    column, reading at most chunk_rows rows of a memory-mapped array at a time.
+    Yields: DataFrames accepted by train_model.
+    """
+    for start in range(0, len(y), chunk_rows):
+        df = pd.DataFrame(np.asarray(x[start:start + chunk_rows]), columns=FEATURE_COLS)
+        df[LABEL_COL] = np.asarray(y[start:start + chunk_rows])
+        yield df
+
@@ -0,0 +1,160 @@
+# flat_forest.py
+"""
+Flattened, read-only copy of a fitted RandomForestClassifier.
+
+All trees are concatenated into a handful of plain NumPy arrays that can be
+saved as .npy files and memory-mapped, so several processes on one host
+share a single copy of the forest through the page cache. sklearn's own
+unpickling copies every tree into private memory, which this avoids.
+Predictions match RandomForestClassifier.predict_proba exactly. The same
+arrays give per-feature contributions along each decision path.
+"""
+import json
+import os
+import numpy as np
+
+ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+
+
+class FlatForest:
+    """
+    Vectorized predict_proba over flattened tree arrays.
+    """
+    def __init__(self, feature, threshold, left, right, value, roots, classes, feature_names, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = np.asarray(classes)
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.max_depth = int(max_depth)
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        Flatten a fitted RandomForestClassifier.
+        Leaves point to themselves, so every sample can take max_depth steps.
+        Returns: FlatForest.
+        """
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for est in model.estimators_:
+            tree = est.tree_
+            n = tree.node_count
+            ids = np.arange(n, dtype=np.int64) + offset
+            is_leaf = tree.children_left == -1
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold).astype(np.float64))
+            lefts.append(np.where(is_leaf, ids, tree.children_left + offset).astype(np.int64))
+            rights.append(np.where(is_leaf, ids, tree.children_right + offset).astype(np.int64))
+            # Classifier trees already store per-node class fractions
+            values.append(tree.value[:, 0, :].astype(np.float64))
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+        feature_names = getattr(model, 'feature_names_in_', np.arange(model.n_features_in_))
+        return cls(
+            np.concatenate(features), np.concatenate(thresholds), np.concatenate(lefts),
+            np.concatenate(rights), np.concatenate(values), np.asarray(roots, dtype=np.int64),
+            model.classes_, list(feature_names), max_depth,
+        )
+
+    def save(self, directory):
+        """
+        Write each array as .npy plus a small JSON header.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(directory, f'{name}.npy'), getattr(self, name))
+        with open(os.path.join(directory, 'forest.json'), 'w') as f:
+            json.dump({
+                'classes': self.classes_.tolist(),
+                'feature_names': [str(c) for c in self.feature_names_in_],
+                'max_depth': self.max_depth,
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Load a saved forest; with mmap_mode='r' the arrays are shared read-only pages.
+        Returns: FlatForest.
+        """
+        with open(os.path.join(directory, 'forest.json')) as f:
+            header = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode) for name in ARRAYS}
+        return cls(classes=header['classes'], feature_names=header['feature_names'],
+                   max_depth=header['max_depth'], **arrays)
+
+    def apply(self, X):
+        """
+        Leaf node id reached in every tree.
+        Returns: int64 array of shape (n_trees, n_samples).
+        """
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[None, :]
+        node = np.broadcast_to(np.asarray(self.roots)[:, None], (len(self.roots), X.shape[0]))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_proba(self, X, block_size=4096):
+        """
+        Returns: Class probabilities, identical to the source forest's predict_proba.
+        """
+        X = np.asarray(X)
+        out = np.zeros((X.shape[0], len(self.classes_)), dtype=np.float64)
+        for start in range(0, X.shape[0], block_size):
+            leaves = self.apply(X[start:start + block_size])
+            block = out[start:start + block_size]
+            # Accumulate tree by tree, in the same order as sklearn
+            for tree_leaves in leaves:
+                block += self.value[tree_leaves]
+        out /= len(self.roots)
+        return out
+
+    def contributions(self, X, class_index=1, block_size=4096):
+        """
+        Decompose the probability of one class along each tree's decision path:
+        every split moves the node's class fraction, and the change is credited
+        to the split feature. Averaged over the trees,
+        bias + contributions.sum(axis=1) equals predict_proba(X)[:, class_index]
+        (up to float rounding).
+        Returns: bias (the forest's prior for the class) and float64 array of
+        shape (n_samples, n_features).
+        """
+        X = np.asarray(X, dtype=np.float32)
+        n_features = len(self.feature_names_in_)
+        value = np.ascontiguousarray(self.value[:, class_index])
+        roots = np.asarray(self.roots)
+        out = np.zeros((X.shape[0], n_features), dtype=np.float64)
+        for start in range(0, X.shape[0], block_size):
+            block = X[start:start + block_size]
+            n = block.shape[0]
+            rows = np.arange(n)[None, :]
+            # Flat (sample, feature) cell of each tree's current split
+            cell_base = np.arange(n, dtype=np.int64)[None, :] * n_features
+            node = np.broadcast_to(roots[:, None], (len(roots), n))
+            totals = np.zeros(n * n_features, dtype=np.float64)
+            for _ in range(self.max_depth):
+                split_feature = self.feature[node]
+                go_left = block[rows, split_feature] <= self.threshold[node]
+                child = np.where(go_left, self.left[node], self.right[node])
+                # Leaves point to themselves, so finished paths add 0
+                totals += np.bincount((cell_base + split_feature).ravel(),
+                                      weights=(value[child] - value[node]).ravel(), minlength=n * n_features)
+                node = child
+            out[start:start + n] = totals.reshape(n, n_features)
+        out /= len(roots)
+        return float(value[roots].mean()), out
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
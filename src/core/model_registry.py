@@ -0,0 +1,334 @@
+# model_registry.py
+"""
+Versioned model registry.
+
+Each model is stored under REGISTRY_DIR/<key>/ where key hashes the training
+data fingerprint, FEATURE_COLS and the hyperparameters, so a change to any of
+them yields a new key instead of silently reusing a stale model. An entry
+holds the sklearn model (model.joblib), a flattened copy of the forest
+(forest/*.npy, memory-mapped for serving), the linear and tree scoring
+engines fitted on the same data (engines/*.json) and meta.json. CURRENT.json points
+at the promoted key and keeps a history for rollback; it is replaced
+atomically.
+
+Usage:
+    python -m src.core.model_registry list
+    python -m src.core.model_registry promote <key>
+    python -m src.core.model_registry rollback
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from src.config import FEATURE_COLS, REGISTRY_DIR
+from src.core.engines import build_engines
+from src.core.errors import ModelError
+from src.core.feature_store import encode_dataset, iter_training_frames
+from src.core.flat_forest import FlatForest
+from src.core.model_trainer import MODEL_PARAMS, fit_model, fit_model_chunked, label_counts
+from src.utils.fingerprint import file_fingerprint, stable_hash
+
+logger = logging.getLogger(__name__)
+
+POINTER_FILE = 'CURRENT.json'
+
+
+def dataset_fingerprint(data, columns=None):
+    """
+    Content hash of the training columns of a DataFrame, or of an encoded
+    (x, y) matrix pair. The pair is hashed chunk by chunk (iter_training_frames)
+    and gives the same digest as a DataFrame of the same encoded rows.
+    Returns: Hex digest.
+    """
+    columns = columns or FEATURE_COLS + ['Class ASD Traits']
+    digest = hashlib.sha256(stable_hash(columns).encode('utf-8'))
+    frames = iter_training_frames(*data) if isinstance(data, tuple) else [data]
+    for frame in frames:
+        digest.update(pd.util.hash_pandas_object(frame[columns], index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Directory-backed store of trained models with promote/rollback.
+    """
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+
+    @staticmethod
+    def key_for(data_sha256, feature_cols=FEATURE_COLS, params=MODEL_PARAMS):
+        """
+        Returns: Registry key for a dataset fingerprint, feature list and hyperparameters.
+        """
+        # n_jobs does not change the fitted model
+        params = {k: v for k, v in params.items() if k != 'n_jobs'}
+        return stable_hash({'data': data_sha256, 'features': list(feature_cols), 'params': params})[:16]
+
+    def entry_dir(self, key):
+        return os.path.join(self.root, key)
+
+    def model_path(self, key=None):
+        key = key or self.current_key()
+        return os.path.join(self.entry_dir(key), 'model.joblib') if key else None
+
+    def exists(self, key):
+        return os.path.isfile(os.path.join(self.entry_dir(key), 'meta.json'))
+
+    def register(self, model, key, data_sha256=None, params=None, extra=None, model_file=None,
+                 engine_data=None, engines_from=None):
+        """
+        Store a fitted model under key. Writing happens in a temporary directory
+        that is renamed into place, so readers never see a partial entry.
+        model_file copies an existing joblib file byte for byte instead of re-dumping.
+        engine_data is the model's training data (DataFrame or encoded (x, y));
+        the lightweight scoring engines are fitted on it. engines_from copies
+        the engines of another entry instead (an incrementally grown forest).
+        Returns: key.
+        """
+        if self.exists(key):
+            return key
+        import joblib
+        import sklearn
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.root)
+        try:
+            model_path = os.path.join(tmp_dir, 'model.joblib')
+            if model_file:
+                shutil.copyfile(model_file, model_path)
+            else:
+                joblib.dump(model, model_path)
+            FlatForest.from_model(model).save(os.path.join(tmp_dir, 'forest'))
+            if engine_data is not None:
+                build_engines(tmp_dir, engine_data)
+            elif engines_from and self.has_engines(engines_from):
+                shutil.copytree(os.path.join(self.entry_dir(engines_from), 'engines'),
+                                os.path.join(tmp_dir, 'engines'))
+            meta = {
+                'key': key,
+                'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+                'data_sha256': data_sha256,
+                'feature_cols': FEATURE_COLS,
+                'params': params if params is not None else model.get_params(),
+                'n_estimators': len(model.estimators_),
+                'sklearn_version': sklearn.__version__,
+                'model_sha256': file_fingerprint(model_path),
+                **(extra or {}),
+            }
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+                json.dump(meta, f, indent=2, default=str)
+            os.rename(tmp_dir, self.entry_dir(key))
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            # Another process may have registered the same key first
+            if not self.exists(key):
+                raise
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        logger.info(f"Registered model {key}")
+        return key
+
+    def has_engines(self, key):
+        return os.path.isdir(os.path.join(self.entry_dir(key), 'engines'))
+
+    def add_engines(self, key, data, data_sha256=None):
+        """
+        Build the lightweight engines of an entry registered without them.
+        data must be the entry's training data (data_sha256 is its fingerprint, if known).
+        Raises: ModelError if data does not match the entry's data fingerprint.
+        """
+        if (data_sha256 or dataset_fingerprint(data)) != self.meta(key).get('data_sha256'):
+            raise ModelError(f"Data does not match the training data of model {key}")
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp-engines-', dir=self.entry_dir(key))
+        try:
+            build_engines(tmp_dir, data)
+            os.rename(os.path.join(tmp_dir, 'engines'), os.path.join(self.entry_dir(key), 'engines'))
+        except OSError:
+            # Another process may have built them first
+            if not self.has_engines(key):
+                raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def meta(self, key):
+        with open(os.path.join(self.entry_dir(key), 'meta.json')) as f:
+            return json.load(f)
+
+    def list(self):
+        """
+        Returns: Metadata of every registered model, oldest first.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        entries = [self.meta(k) for k in os.listdir(self.root) if not k.startswith('.') and self.exists(k)]
+        return sorted(entries, key=lambda m: m['created'])
+
+    def _read_pointer(self):
+        try:
+            with open(os.path.join(self.root, POINTER_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'current': None, 'history': []}
+
+    def _write_pointer(self, pointer):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, POINTER_FILE)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(pointer, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def pointer_mtime(self):
+        try:
+            return os.stat(os.path.join(self.root, POINTER_FILE)).st_mtime_ns
+        except OSError:
+            return None
+
+    def current_key(self):
+        return self._read_pointer()['current']
+
+    def promote(self, key):
+        """
+        Make key the serving model, remembering the previous one for rollback.
+        """
+        if not self.exists(key):
+            raise ModelError(f"Unknown model key: {key}")
+        pointer = self._read_pointer()
+        if pointer['current'] == key:
+            return
+        if pointer['current']:
+            pointer['history'].append(pointer['current'])
+        pointer['current'] = key
+        self._write_pointer(pointer)
+        logger.info(f"Promoted model {key}")
+
+    def rollback(self):
+        """
+        Re-promote the previously served model.
+        Returns: Key now being served.
+        """
+        pointer = self._read_pointer()
+        if not pointer['history']:
+            raise ModelError("No previous model to roll back to")
+        pointer['current'] = pointer['history'].pop()
+        self._write_pointer(pointer)
+        logger.info(f"Rolled back to model {pointer['current']}")
+        return pointer['current']
+
+    def lineage(self, key):
+        """
+        Returns: key followed by the keys it was incrementally grown from.
+        """
+        chain = []
+        while key and self.exists(key) and key not in chain:
+            chain.append(key)
+            key = (self.meta(key).get('params') or {}).get('incremental_from')
+        return chain
+
+    def load_model(self, key=None):
+        """
+        Load the sklearn model (needed for retraining).
+        Returns: Fitted estimator.
+        """
+        # joblib and scikit-learn are only imported when the estimator itself is needed
+        import joblib
+
+        key = key or self.current_key()
+        if not key:
+            raise ModelError("No model has been promoted")
+        return joblib.load(self.model_path(key), mmap_mode='r')
+
+    def load_serving(self, key=None):
+        """
+        Load the memory-mapped flattened forest used for predictions.
+        Returns: FlatForest.
+        """
+        key = key or self.current_key()
+        if not key:
+            raise ModelError("No model has been promoted")
+        return FlatForest.load(os.path.join(self.entry_dir(key), 'forest'), mmap_mode='r')
+
+
+def trimmed_counts(counts):
+    """
+    Returns: label_counts output as a list indexed by label, without trailing zeros (for meta.json).
+    """
+    return counts[:np.flatnonzero(counts).max(initial=-1) + 1].tolist()
+
+
+def ensure_model(registry, data=None, legacy_path=None):
+    """
+    Return the key of a model that matches data, training and promoting one if needed.
+    data is a DataFrame or an encoded (x, y) pair from load_feature_matrix; the
+    pair is trained chunk by chunk without materializing the whole table.
+    A promoted model incrementally grown from the matching model is kept. The
+    matching entry gets its lightweight scoring engines, fitted on data.
+    Without data, the promoted model (or the legacy model file) is used as is.
+    Returns: Promoted registry key.
+    Raises: ModelError if no suitable model exists and none can be trained.
+    """
+    if data is not None:
+        data_sha256 = dataset_fingerprint(data)
+        key = registry.key_for(data_sha256)
+        if not registry.exists(key):
+            logger.info(f"No registered model for data {data_sha256[:12]}; training {key}")
+            model = fit_model_chunked(*data) if isinstance(data, tuple) else fit_model(data)
+            y = data[1] if isinstance(data, tuple) else encode_dataset(data)[1]
+            registry.register(model, key, data_sha256, MODEL_PARAMS,
+                              extra={'label_counts': trimmed_counts(label_counts(y))}, engine_data=data)
+        elif not registry.has_engines(key):
+            registry.add_engines(key, data, data_sha256)
+        current = registry.current_key()
+        if key in registry.lineage(current):
+            return current
+        registry.promote(key)
+        return key
+
+    key = registry.current_key()
+    if key:
+        return key
+    if legacy_path and os.path.exists(legacy_path):
+        import joblib
+
+        key = f"legacy-{file_fingerprint(legacy_path)[:12]}"
+        registry.register(joblib.load(legacy_path), key, extra={'source': legacy_path}, model_file=legacy_path)
+        registry.promote(key)
+        return key
+    raise ModelError("No registered model and no training data available")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and manage the model registry.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list')
+    promote = sub.add_parser('promote')
+    promote.add_argument('key')
+    sub.add_parser('rollback')
+    parser.add_argument('--root', default=REGISTRY_DIR)
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.root)
+    if args.command == 'list':
+        current = registry.current_key()
+        for meta in registry.list():
+            marker = '*' if meta['key'] == current else ' '
+            print(f"{marker} {meta['key']}  {meta['created']}  trees={meta['n_estimators']}  data={str(meta['data_sha256'])[:12]}")
+    elif args.command == 'promote':
+        registry.promote(args.key)
+        print(f"Promoted {args.key}")
+    else:
+        print(f"Rolled back to {registry.rollback()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
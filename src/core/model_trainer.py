@@ -1,50 +1,189 @@
 # model_trainer.py
-import streamlit as st
+import copy
+import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-import joblib
+import logging
 import os
-from src.config import FEATURE_COLS
+from src.config import FEATURE_COLS, TRAIN_CHUNK_ROWS
+from src.core.encoding import QCHAT_COLS, encode_answers_frame, encode_label, encode_yes_no
+from src.core.errors import ModelError
+from src.core.feature_store import iter_training_frames
+from src.core.packed import PackedRecords
+from src.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
 
 MODEL_PATH = r'models/asd_model.joblib'
+MODEL_PARAMS = {
+    'n_estimators': 100,
+    'random_state': 42,
+    'class_weight': 'balanced',
+    'max_depth': 5,
+    'n_jobs': -1,
+}
+
+def prepare_training_data(data):
+    """
+    Encode a raw or preprocessed dataset (or PackedRecords) for training.
+    Returns: Feature DataFrame (FEATURE_COLS) and integer labels.
+    """
+    if isinstance(data, PackedRecords):
+        return pd.DataFrame(data.features(), columns=FEATURE_COLS), pd.Series(data.labels(), dtype=int)
+    x = pd.DataFrame(index=data.index)
+    # Convert Q-Chat answers to binary (already-encoded columns pass through)
+    x[QCHAT_COLS] = encode_answers_frame(data)
+    x['Jaundice'] = encode_yes_no(data['Jaundice'])
+    x['Family_mem_with_ASD'] = encode_yes_no(data['Family_mem_with_ASD'])
+    x['Age_Mons'] = pd.to_numeric(data['Age_Mons'], errors='coerce').fillna(0).astype(int)
+    y = pd.Series(encode_label(data['Class ASD Traits']), index=data.index).astype(int)
+    return x[FEATURE_COLS], y
+
+@timed('fit_model')
+def fit_model(data, **params):
+    """
+    Fit a new Random Forest on all cores.
+    Returns: Fitted model.
+    """
+    # scikit-learn is only imported to train; serving uses the flattened forest
+    from sklearn.ensemble import RandomForestClassifier
+
+    x, y = prepare_training_data(data)
+    model = RandomForestClassifier(**{**MODEL_PARAMS, **params})
+    model.fit(x, y)
+    return model
+
+def label_counts(y, chunk_rows=TRAIN_CHUNK_ROWS):
+    """
+    Count labels of a (possibly memory-mapped) array one chunk at a time.
+    Returns: int64 array of counts indexed by label.
+    """
+    counts = np.zeros(256, dtype=np.int64)
+    for start in range(0, len(y), chunk_rows):
+        counts += np.bincount(np.asarray(y[start:start + chunk_rows], dtype=np.uint8), minlength=256)
+    return counts
+
+def balanced_class_weight(counts):
+    """
+    Returns: The class_weight dict that 'balanced' gives for these label counts.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    classes = np.flatnonzero(counts)
+    return {int(c): counts.sum() / (len(classes) * counts[c]) for c in classes}
+
+@timed('fit_model')
+def fit_model_chunked(x, y, chunk_rows=TRAIN_CHUNK_ROWS, **params):
+    """
+    Fit a Random Forest on an encoded (x, y) matrix, e.g. the memory-mapped
+    feature cache, one chunk of rows at a time. Each chunk grows its share of
+    the trees with warm_start, so peak memory follows chunk_rows rather than
+    the dataset size. Class weights are computed over the whole dataset.
+    A chunk missing a class is merged into the next one.
+    A dataset that fits in one chunk is fitted exactly like fit_model.
+    Returns: Fitted model.
+    Raises: ModelError if there is nothing to train on.
+    """
+    params = {**MODEL_PARAMS, **params}
+    n_rows = len(y)
+    if n_rows == 0:
+        raise ModelError("No training data")
+    if n_rows <= chunk_rows:
+        return fit_model(next(iter_training_frames(x, y, chunk_rows)), **params)
+
+    counts = label_counts(y, chunk_rows)
+    classes = np.flatnonzero(counts)
+    class_weight = params.get('class_weight')
+    if class_weight == 'balanced':
+        # Same weights a single fit on all rows would use
+        params['class_weight'] = balanced_class_weight(counts)
+    n_trees = params.pop('n_estimators')
+    n_chunks = -(-n_rows // chunk_rows)
+
+    from sklearn.ensemble import RandomForestClassifier
+
+    model = RandomForestClassifier(**params, warm_start=True)
+    pending = None
+    for i, frame in enumerate(iter_training_frames(x, y, chunk_rows)):
+        pending = frame if pending is None else pd.concat([pending, frame], ignore_index=True)
+        xc, yc = prepare_training_data(pending)
+        if yc.nunique() < len(classes):
+            continue
+        grown = len(getattr(model, 'estimators_', []))
+        # Spread the trees evenly over the chunks, at least one per fit
+        target = max(grown + 1, round(n_trees * (i + 1) / n_chunks))
+        model.set_params(n_estimators=target)
+        model.fit(xc, yc)
+        pending = None
+        logger.debug(f"Chunk {i + 1}/{n_chunks}: {len(yc)} rows, forest now has {target} trees")
+
+    if pending is not None:
+        logger.warning(f"Skipped {len(pending)} trailing rows that do not contain every class")
+    if not hasattr(model, 'estimators_'):
+        raise ModelError("No chunk of the training data contains every class")
+    model.set_params(warm_start=False, class_weight=class_weight)
+    return model
+
+def update_model(model, data, n_new_trees=20, prior_counts=None):
+    """
+    Grow a copy of the forest with n_new_trees trees fitted on new data only.
+    The existing trees are kept unchanged, so the cost scales with the new data.
+    prior_counts are the label counts (see label_counts) of the data the forest
+    was trained on; with class_weight='balanced' the new trees are weighted over
+    prior_counts plus the new labels, like fit_model_chunked, instead of
+    re-balancing the new data alone.
+    Returns: Updated copy of the model.
+    Raises: ModelError if the new data does not contain every known class.
+    """
+    x, y = prepare_training_data(data)
+    if set(model.classes_) - set(y.unique()):
+        raise ModelError(f"New data must contain every class {model.classes_.tolist()} for an incremental update")
+    updated = copy.deepcopy(model)
+    params = {'warm_start': True, 'n_estimators': len(updated.estimators_) + n_new_trees, 'n_jobs': -1}
+    if prior_counts is not None and updated.get_params()['class_weight'] == 'balanced':
+        counts = label_counts(y.to_numpy())
+        counts[:len(prior_counts)] += np.asarray(prior_counts, dtype=np.int64)
+        params['class_weight'] = balanced_class_weight(counts)
+    updated.set_params(**params)
+    updated.fit(x, y)
+    updated.set_params(warm_start=False, class_weight=model.get_params()['class_weight'])
+    return updated
+
+def save_model(model, path=MODEL_PATH):
+    """
+    Atomically replace the saved model so readers never see a partial file.
+    """
+    import joblib
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
 
 def train_model(data):
     """
     Train a Random Forest model or load it if it exists.
     Returns: Trained or loaded model.
+    Raises: ModelError if the model cannot be loaded or trained.
     """
     try:
         # Check if the model file exists
         if os.path.exists(MODEL_PATH):
+            import joblib
+
             model = joblib.load(MODEL_PATH)
             return model
 
         # If no model exists, train a new one
-        x = data[FEATURE_COLS].copy()
-        y = data['Class ASD Traits'].copy()
-
-        # Convert Q-Chat answers to binary
-        for col in ['A1', 'A2', 'A3', 'A4', 'A5', 'A6', 'A7', 'A8', 'A9']:
-            x[col] = x[col].astype(str).str.strip().str.lower().map(
-                lambda val: 1 if val in ['sometimes', 'rarely', 'never'] else 0
-            ).fillna(0)
-        x['A10'] = x['A10'].astype(str).str.strip().str.lower().map(
-            lambda val: 1 if val in ['always', 'usually', 'sometimes'] else 0
-        ).fillna(0)
-
-        x = x.apply(pd.to_numeric, errors='coerce').fillna(0)
-        valid_idx = y.notna()
-        x = x[valid_idx]
-        y = y[valid_idx].astype(int)
-
-        model = RandomForestClassifier(n_estimators=100, random_state=42, class_weight='balanced', max_depth=5)
-        model.fit(x, y)
+        if data is None:
+            raise ModelError(f"No saved model at {MODEL_PATH} and no training data available")
+        model = fit_model(data)
 
         # Save the trained model
-        joblib.dump(model, MODEL_PATH)
-        st.write("Trained and saved new model.")
+        save_model(model, MODEL_PATH)
+        logger.info("Trained and saved new model.")
 
         return model
+    except ModelError:
+        raise
     except Exception as e:
-        st.error(f"Error training or loading model: {e}")
-        return None
\ No newline at end of file
+        logger.error(f"Error training or loading model: {e}")
+        raise ModelError(f"Error training or loading model: {e}") from e
@@ -0,0 +1,224 @@
+# packed.py
+"""
+Compact in-memory form of encoded screening records.
+
+Every screening is stored in three bytes:
+- bits: uint16 holding the ten binary Q-Chat answers (bit 0 = A1 ... bit 9 = A10),
+  Jaundice (bit 10), Family_mem_with_ASD (bit 11), the ASD label (bit 12, only
+  if the packed data had one) and whether the answers (bit 13), the yes/no
+  flags (bit 14) or the age (bit 15) failed screening_checks when packed;
+- age: uint8 age in months. An age that does not fit (missing, non-numeric,
+  negative or above 255) is stored as 0 rather than clipped; bit 15 marks it.
+
+The equivalent pandas frame of object and int64 columns takes tens of bytes
+per cell. The Q-Chat-10 score is a popcount of the answer bits, and
+features() decodes the bits back to the model's feature matrix.
+
+Usage:
+    python -m src.core.packed screenings.csv -o screenings.npz
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from src.config import FEATURE_COLS
+from src.core.encoding import QCHAT_COLS, encode_answers_frame, encode_label, encode_yes_no, screening_checks
+from src.core.errors import DataLoadError
+
+LABEL_COL = 'Class ASD Traits'
+JAUNDICE_BIT = 10
+FAMILY_BIT = 11
+LABEL_BIT = 12
+# Validation failures recorded at packing time, by bit
+INVALID_BITS = {13: 'A1-A10', 14: 'Jaundice/Family_mem_with_ASD', 15: 'Age_Mons'}
+INVALID_MASK = sum(1 << bit for bit in INVALID_BITS)
+ANSWER_MASK = (1 << len(QCHAT_COLS)) - 1
+# Shift of each feature bit, ordered like FEATURE_COLS without Age_Mons
+FEATURE_SHIFTS = np.arange(len(QCHAT_COLS) + 2, dtype=np.uint16)
+
+
+def pack_bits(answers, jaundice, family, label=None):
+    """
+    Pack binary answers (n_rows x 10) and flag arrays into one uint16 per row.
+    Returns: uint16 NumPy array.
+    """
+    answers = np.asarray(answers, dtype=np.uint16)
+    bits = (answers << FEATURE_SHIFTS[:len(QCHAT_COLS)]).sum(axis=1, dtype=np.uint16)
+    bits |= np.asarray(jaundice, dtype=np.uint16) << JAUNDICE_BIT
+    bits |= np.asarray(family, dtype=np.uint16) << FAMILY_BIT
+    if label is not None:
+        bits |= np.asarray(label, dtype=np.uint16) << LABEL_BIT
+    return bits
+
+
+def pack_age(values):
+    """
+    Ages that do not fit a uint8 (missing, non-numeric, negative or above 255)
+    are stored as 0 instead of being clipped.
+    Returns: uint8 NumPy array of ages in months.
+    """
+    ages = pd.to_numeric(pd.Series(values, copy=False), errors='coerce').to_numpy(dtype=np.float64)
+    # NaN fails both comparisons
+    return np.where((ages >= 0) & (ages <= 255), ages, 0).astype(np.uint8)
+
+
+def pack_invalid(df):
+    """
+    Run screening_checks on a frame and pack which field groups failed.
+    Returns: uint16 NumPy array of INVALID_BITS flags.
+    """
+    checks = dict(screening_checks(df))
+    groups = {13: QCHAT_COLS, 14: ['Jaundice', 'Family_mem_with_ASD'], 15: ['Age_Mons']}
+    bits = np.zeros(len(df), dtype=np.uint16)
+    for bit, cols in groups.items():
+        bits |= np.logical_or.reduce([checks[col] for col in cols]).astype(np.uint16) << bit
+    return bits
+
+
+class PackedRecords:
+    """
+    Screening records as one uint16 of bit flags and one uint8 age per row.
+    """
+    def __init__(self, bits, age, has_labels=True):
+        self.bits = np.asarray(bits, dtype=np.uint16)
+        self.age = np.asarray(age, dtype=np.uint8)
+        self.has_labels = bool(has_labels)
+        if self.bits.shape != self.age.shape or self.bits.ndim != 1:
+            raise ValueError(f"bits {self.bits.shape} and age {self.age.shape} must be equal-length 1-D arrays")
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Pack a raw or preprocessed dataset (A1-A10, Jaundice, Family_mem_with_ASD,
+        Age_Mons and optionally Class ASD Traits columns). Rows that fail
+        screening_checks are packed with their INVALID_BITS set.
+        Returns: PackedRecords.
+        """
+        label = encode_label(df[LABEL_COL]) if LABEL_COL in df.columns else None
+        bits = pack_bits(encode_answers_frame(df), encode_yes_no(df['Jaundice']),
+                         encode_yes_no(df['Family_mem_with_ASD']), label)
+        return cls(bits | pack_invalid(df), pack_age(df['Age_Mons']), has_labels=label is not None)
+
+    @classmethod
+    def from_features(cls, x, y=None):
+        """
+        Pack an encoded feature matrix ordered like FEATURE_COLS (e.g. the feature cache).
+        Returns: PackedRecords.
+        """
+        x = np.asarray(x)
+        return cls(pack_bits(x[:, :10], x[:, 10], x[:, 11], y), pack_age(x[:, 12]), has_labels=y is not None)
+
+    @classmethod
+    def concat(cls, records):
+        records = list(records)
+        return cls(np.concatenate([r.bits for r in records]) if records else np.empty(0, np.uint16),
+                   np.concatenate([r.age for r in records]) if records else np.empty(0, np.uint8),
+                   has_labels=all(r.has_labels for r in records))
+
+    def __len__(self):
+        return len(self.bits)
+
+    def __getitem__(self, index):
+        return PackedRecords(self.bits[index], self.age[index], self.has_labels)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes + self.age.nbytes
+
+    def qchat_scores(self):
+        """
+        Returns: uint8 Q-Chat-10 scores (popcount of the answer bits).
+        """
+        return np.bitwise_count(self.bits & ANSWER_MASK)
+
+    def answers(self):
+        """
+        Returns: uint8 array of binary answers, shape (n_rows, 10).
+        """
+        return ((self.bits[:, None] >> FEATURE_SHIFTS[:len(QCHAT_COLS)]) & 1).astype(np.uint8)
+
+    def flag(self, bit):
+        return ((self.bits >> bit) & 1).astype(np.uint8)
+
+    def jaundice(self):
+        return self.flag(JAUNDICE_BIT)
+
+    def family(self):
+        return self.flag(FAMILY_BIT)
+
+    def labels(self):
+        """
+        Returns: uint8 ASD labels.
+        Raises: DataLoadError if the records were packed without labels.
+        """
+        if not self.has_labels:
+            raise DataLoadError("Packed records have no Class ASD Traits labels")
+        return self.flag(LABEL_BIT)
+
+    def invalid(self):
+        """
+        Returns: Boolean mask of rows that failed screening_checks when packed.
+        """
+        return (self.bits & INVALID_MASK) != 0
+
+    def errors(self):
+        """
+        Returns: Array of error strings per row ('' for rows that were valid when packed).
+        """
+        errors = np.full(len(self), '', dtype=object)
+        for i in np.flatnonzero(self.invalid()):
+            errors[i] = "; ".join(f"{name} invalid" for bit, name in INVALID_BITS.items() if self.bits[i] >> bit & 1)
+        return errors
+
+    def features(self):
+        """
+        Decode to the model's input.
+        Returns: int16 matrix ordered like FEATURE_COLS.
+        """
+        x = np.empty((len(self), len(FEATURE_COLS)), dtype=np.int16)
+        x[:, :12] = (self.bits[:, None] >> FEATURE_SHIFTS) & 1
+        x[:, 12] = self.age
+        return x
+
+    def to_frame(self):
+        """
+        Decode to a preprocessed dataset frame (FEATURE_COLS, plus the label
+        column if the records were packed with labels).
+        Returns: DataFrame with uint8/int16 columns.
+        """
+        df = pd.DataFrame(self.features(), columns=FEATURE_COLS)
+        if self.has_labels:
+            df[LABEL_COL] = self.labels()
+        return df
+
+    def save(self, path):
+        """
+        Write the records as an uncompressed .npz file.
+        """
+        np.savez(path, bits=self.bits, age=self.age, has_labels=self.has_labels)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            # Files written before has_labels was stored always had labels
+            return cls(data['bits'], data['age'], bool(data['has_labels']) if 'has_labels' in data else True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack a screening CSV into a compact .npz file.")
+    parser.add_argument('input', help="CSV with the load_data columns (Class ASD Traits is optional)")
+    parser.add_argument('-o', '--output', required=True, help="Output .npz file")
+    args = parser.parse_args(argv)
+
+    from src.core.data_loader import load_data
+
+    records = load_data(args.input, packed=True)
+    records.save(args.output)
+    print(f"Packed {len(records)} screenings into {records.nbytes / 1e6:.1f} MB -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
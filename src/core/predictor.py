@@ -1,7 +1,16 @@
 # predictor.py
-import streamlit as st
+import logging
+import numpy as np
 import pandas as pd
+from src.config import FEATURE_COLS
+from src.core.encoding import QCHAT_COLS, encode_answers_frame, encode_yes_no, screening_errors
+from src.core.errors import PredictionError
+from src.core.packed import PackedRecords
+from src.utils.metrics import timed
 
+logger = logging.getLogger(__name__)
+
+@timed('encode_answers')
 def convert_answers(answers):
     """
     Convert Q-Chat answers to binary values.
@@ -12,7 +21,7 @@ def convert_answers(answers):
     for i, ans in enumerate(answers):
         ans = ans.strip().lower()
         if ans not in valid_options:
-            st.warning(f"Invalid answer for question {i+1}: {ans}. Defaulting to 'Never'.")
+            logger.warning(f"Invalid answer for question {i+1}: {ans}. Defaulting to 'Never'.")
             ans = 'never'
         if i == 9:  # A10 has reversed scoring
             binary.append(1 if ans in ['always', 'usually', 'sometimes'] else 0)
@@ -20,28 +29,109 @@ def convert_answers(answers):
             binary.append(1 if ans in ['sometimes', 'rarely', 'never'] else 0)
     return binary
 
+@timed('make_prediction')
 def make_prediction(model, answers, jaundice, family_asd, age_mons, feature_cols, threshold):
     """
     Generate ML-based prediction based on Q-Chat score threshold.
     Returns: Q-Chat score, ML result, ML probability, and binary answers.
+    Raises: PredictionError if the input cannot be scored.
     """
     try:
+        validate_screening(answers, jaundice, family_asd, age_mons)
         binary_answers = convert_answers(answers)
         jaundice_val = 1 if jaundice.lower() == 'yes' else 0
         family_val = 1 if family_asd.lower() == 'yes' else 0
         input_vec = binary_answers + [jaundice_val, family_val, age_mons]
 
         if len(input_vec) != len(feature_cols):
-            st.error("Input vector length mismatch with expected features.")
-            return None, None, None, None
+            raise PredictionError("Input vector length mismatch with expected features.")
 
         input_df = pd.DataFrame([input_vec], columns=feature_cols)
         qchat_score = sum(binary_answers)
         
         ml_result = "YES" if qchat_score > threshold else "NO"
-        proba = model.predict_proba(input_df)[0][1]
+        with timed('predict_proba'):
+            proba = model.predict_proba(input_df)[0][1]
 
         return qchat_score, ml_result, proba, binary_answers
+    except PredictionError:
+        raise
     except Exception as e:
-        st.error(f"Prediction failed: {e}")
-        return None, None, None, None
\ No newline at end of file
+        raise PredictionError(f"Prediction failed: {e}") from e
+
+@timed('encode_batch')
+def encode_features_batch(df, feature_cols):
+    """
+    Encode a batch of raw screenings (or PackedRecords) to model features.
+    Expects A1-A10, Jaundice, Family_mem_with_ASD and Age_Mons columns.
+    Returns: Feature DataFrame and uint8 array of binary answers.
+    Raises: PredictionError if required columns are missing.
+    """
+    if isinstance(df, PackedRecords):
+        return pd.DataFrame(df.features(), columns=FEATURE_COLS)[feature_cols], df.answers()
+    missing_cols = set(feature_cols) - set(df.columns)
+    if missing_cols:
+        raise PredictionError(f"Screening data missing required columns: {missing_cols}")
+
+    binary_answers = encode_answers_frame(df)
+    features = pd.DataFrame(binary_answers, columns=QCHAT_COLS, index=df.index)
+    features['Jaundice'] = encode_yes_no(df['Jaundice'])
+    features['Family_mem_with_ASD'] = encode_yes_no(df['Family_mem_with_ASD'])
+    features['Age_Mons'] = pd.to_numeric(df['Age_Mons'], errors='coerce').fillna(0).astype(int)
+    return features[feature_cols], binary_answers
+
+ERRORS_COL = 'Errors'
+INVALID_RESULT = 'INVALID'
+
+
+def validate_screening(answers, jaundice, family_asd, age_mons):
+    """
+    Check a single screening with the same rules as screening_errors.
+    Returns: Dict of the raw inputs keyed by screening column.
+    Raises: PredictionError if the screening cannot be scored as given.
+    """
+    if len(answers) != len(QCHAT_COLS):
+        raise PredictionError("Input vector length mismatch with expected features.")
+    row = dict(zip(QCHAT_COLS, answers))
+    row.update({'Jaundice': jaundice, 'Family_mem_with_ASD': family_asd, 'Age_Mons': age_mons})
+    errors = screening_errors(pd.DataFrame([row]))
+    if errors[0]:
+        raise PredictionError(f"Invalid screening: {errors[0]}")
+    return row
+
+
+@timed('make_predictions_batch')
+def make_predictions_batch(model, df, feature_cols, threshold):
+    """
+    Score a whole batch of screenings with a single predict_proba call.
+    PackedRecords are scored straight from their bits and decoded for the output;
+    their rows flagged invalid at packing time are reported like screening_errors.
+    Rows that fail screening_errors are not scored: they get ML Prediction
+    'INVALID', no score or confidence, and the reason in the Errors column.
+    Returns: Copy of df with Qchat-10 Score, ML Prediction, Confidence and Errors columns.
+    Raises: PredictionError if required columns are missing.
+    """
+    if isinstance(df, PackedRecords):
+        qchat_scores = df.qchat_scores().astype(np.int64)
+        errors = df.errors()
+        df = features = pd.DataFrame(df.features(), columns=FEATURE_COLS)[feature_cols]
+    else:
+        df = df.rename(columns=lambda col: str(col).strip())
+        features, binary_answers = encode_features_batch(df, feature_cols)
+        qchat_scores = binary_answers.sum(axis=1, dtype=np.int64)
+        errors = screening_errors(df)
+    valid = errors == ''
+    if not valid.all():
+        logger.warning(f"{int((~valid).sum())} of {len(df)} screenings could not be parsed and were not scored")
+    probas = np.full(len(df), np.nan)
+    with timed('predict_proba_batch'):
+        if valid.any():
+            probas[valid] = model.predict_proba(features[valid])[:, 1]
+
+    results = df.copy()
+    results['Qchat-10 Score'] = pd.array(np.where(valid, qchat_scores, 0), dtype='Int64')
+    results.loc[~valid, 'Qchat-10 Score'] = pd.NA
+    results['ML Prediction'] = np.where(~valid, INVALID_RESULT, np.where(qchat_scores > threshold, "YES", "NO"))
+    results['Confidence'] = probas
+    results[ERRORS_COL] = errors
+    return results
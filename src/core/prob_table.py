@@ -0,0 +1,180 @@
+# prob_table.py
+"""
+Precomputed probability table for the whole Q-CHAT-10 feature space.
+
+The model sees 10 binary answers, 2 binary flags and an age in months, so
+every in-range input vector fits in a table of 2**12 * n_ages entries. The
+table is memory-mapped and looked up by index instead of walking the forest.
+
+Usage:
+    python -m src.core.prob_table build
+    python -m src.core.prob_table verify
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+from src.config import AGE_MAX, AGE_MIN, FEATURE_COLS, PROB_TABLE_PATH
+from src.core.model_trainer import MODEL_PATH
+from src.utils.fingerprint import file_fingerprint
+
+logger = logging.getLogger(__name__)
+
+N_BINARY = 12  # A1-A10, Jaundice, Family_mem_with_ASD
+N_AGES = AGE_MAX - AGE_MIN + 1
+BIT_WEIGHTS = (1 << np.arange(N_BINARY)).astype(np.int64)
+
+
+def meta_path(table_path):
+    return os.path.splitext(table_path)[0] + '.json'
+
+
+def feature_grid():
+    """
+    Enumerate every in-range input vector in table order.
+    Returns: float64 array of shape (2**12 * N_AGES, 13) ordered like FEATURE_COLS.
+    """
+    codes = np.arange(1 << N_BINARY)
+    bits = (codes[:, None] >> np.arange(N_BINARY)) & 1
+    ages = np.arange(AGE_MIN, AGE_MAX + 1)
+    grid = np.empty((len(codes) * N_AGES, N_BINARY + 1), dtype=np.float64)
+    grid[:, :N_BINARY] = np.repeat(bits, N_AGES, axis=0)
+    grid[:, N_BINARY] = np.tile(ages, len(codes))
+    return grid
+
+
+def model_probabilities(model, grid):
+    """
+    Returns: P(ASD) from the live model for every row of the grid.
+    """
+    return model.predict_proba(pd.DataFrame(grid, columns=FEATURE_COLS))[:, 1]
+
+
+def build_table(model, model_path=MODEL_PATH, table_path=PROB_TABLE_PATH):
+    """
+    Precompute P(ASD) for every input vector and save it next to a metadata file.
+    Returns: Path of the saved table.
+    """
+    table = model_probabilities(model, feature_grid())
+    os.makedirs(os.path.dirname(table_path) or '.', exist_ok=True)
+    tmp_path = table_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, table)
+    os.replace(tmp_path, table_path)
+    meta = {
+        'model_sha256': file_fingerprint(model_path),
+        'feature_cols': FEATURE_COLS,
+        'age_min': AGE_MIN,
+        'age_max': AGE_MAX,
+        'entries': int(table.size),
+    }
+    with open(meta_path(table_path), 'w') as f:
+        json.dump(meta, f, indent=2)
+    logger.info(f"Probability table written to {table_path} ({table.size} entries)")
+    return table_path
+
+
+class TabulatedModel:
+    """
+    Drop-in predict_proba wrapper that reads in-range inputs from the table
+    and falls back to the live model for anything else (e.g. out-of-range ages).
+    """
+    def __init__(self, model, table):
+        self.model = model
+        self.table = table
+        self.classes_ = model.classes_
+
+    def lookup_index(self, X):
+        """
+        Returns: Table index per row and a mask of rows that are in the table.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        binary = X[:, :N_BINARY]
+        ages = X[:, N_BINARY]
+        in_table = (
+            np.all((binary == 0) | (binary == 1), axis=1)
+            & (ages >= AGE_MIN) & (ages <= AGE_MAX) & (ages == np.floor(ages))
+        )
+        codes = binary.astype(np.int64) @ BIT_WEIGHTS
+        index = codes * N_AGES + (np.where(in_table, ages, AGE_MIN).astype(np.int64) - AGE_MIN)
+        return np.where(in_table, index, 0), in_table
+
+    def predict_proba(self, X):
+        index, in_table = self.lookup_index(X)
+        p1 = np.asarray(self.table[index], dtype=np.float64)
+        if not in_table.all():
+            fallback = ~in_table
+            X_fallback = X.loc[fallback] if hasattr(X, 'columns') else np.asarray(X)[fallback]
+            p1[fallback] = self.model.predict_proba(X_fallback)[:, 1]
+        return np.column_stack([1.0 - p1, p1])
+
+    def predict(self, X):
+        return self.classes_[(self.predict_proba(X)[:, 1] > 0.5).astype(int)]
+
+
+def load_table(model_path=MODEL_PATH, table_path=PROB_TABLE_PATH):
+    """
+    Memory-map the table if it exists and matches the model file.
+    Returns: Read-only table array, or None if missing or stale.
+    """
+    if not (os.path.exists(table_path) and os.path.exists(meta_path(table_path))):
+        return None
+    with open(meta_path(table_path)) as f:
+        meta = json.load(f)
+    if (meta.get('model_sha256') != file_fingerprint(model_path)
+            or meta.get('feature_cols') != FEATURE_COLS
+            or (meta.get('age_min'), meta.get('age_max')) != (AGE_MIN, AGE_MAX)):
+        logger.warning(f"Probability table {table_path} does not match {model_path}; ignoring it")
+        return None
+    return np.load(table_path, mmap_mode='r')
+
+
+def with_prob_table(model, model_path=MODEL_PATH, table_path=PROB_TABLE_PATH):
+    """
+    Wrap model in a TabulatedModel when a valid table is available.
+    Returns: TabulatedModel or the original model.
+    """
+    table = load_table(model_path, table_path)
+    if table is None:
+        return model
+    logger.info(f"Using precomputed probability table {table_path}")
+    return TabulatedModel(model, table)
+
+
+def verify_table(model, model_path=MODEL_PATH, table_path=PROB_TABLE_PATH):
+    """
+    Compare every table entry with the live model.
+    Returns: (ok, max_abs_diff); ok requires a matching fingerprint and exact equality.
+    """
+    table = load_table(model_path, table_path)
+    if table is None:
+        return False, float('nan')
+    expected = model_probabilities(model, feature_grid())
+    diff = float(np.max(np.abs(expected - table)))
+    return bool(np.array_equal(expected, table)), diff
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or verify the precomputed probability table.")
+    parser.add_argument('command', choices=['build', 'verify'])
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--table', default=PROB_TABLE_PATH)
+    args = parser.parse_args(argv)
+    import joblib
+
+    model = joblib.load(args.model)
+    if args.command == 'build':
+        path = build_table(model, args.model, args.table)
+        print(f"Wrote {path}")
+        return 0
+    ok, diff = verify_table(model, args.model, args.table)
+    print(f"{'OK' if ok else 'MISMATCH'}: max abs difference {diff}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
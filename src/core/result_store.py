@@ -0,0 +1,277 @@
+# result_store.py
+"""
+Embedded store of every screening result (SQLite in WAL mode).
+
+record() only puts the result on a queue; a writer thread commits queued
+results in batches of up to batch_size rows, or every flush_interval
+seconds, in one transaction each. A batch that fails to commit is logged and
+counted as an error of the result_store_write stage in the metrics. WAL lets
+readers (audits, analytics) query while the writer appends. The screenings
+table is indexed on timestamp, age, score and prediction.
+
+Usage:
+    python -m src.core.result_store show --limit 20
+    python -m src.core.result_store show --since "2025-01-01" --prediction YES
+    python -m src.core.result_store export history.csv
+"""
+import argparse
+import atexit
+import logging
+import os
+import pathlib
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import pandas as pd
+
+from src.config import RESULTS_DB_PATH
+from src.utils.metrics import count_error, observe
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ['timestamp', 'name', 'email', 'qchat_score', 'prediction', 'confidence', 'age_mons',
+           'sex', 'ethnicity', 'jaundice', 'family_asd', 'who_completed', 'source']
+# result_data keys (see app.py) for each column
+RESULT_KEYS = {
+    'timestamp': 'timestamp', 'name': 'name', 'email': 'email', 'qchat_score': 'Qchat-10 Score',
+    'prediction': 'ML Prediction', 'confidence': 'Confidence', 'age_mons': 'Age (Months)', 'sex': 'Sex',
+    'ethnicity': 'Ethnicity', 'jaundice': 'Jaundice', 'family_asd': 'Family with ASD',
+    'who_completed': 'Who Completed',
+}
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS screenings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    name TEXT,
+    email TEXT,
+    qchat_score INTEGER NOT NULL,
+    prediction TEXT NOT NULL,
+    confidence REAL,
+    age_mons INTEGER,
+    sex TEXT,
+    ethnicity TEXT,
+    jaundice TEXT,
+    family_asd TEXT,
+    who_completed TEXT,
+    source TEXT NOT NULL DEFAULT 'app'
+);
+CREATE INDEX IF NOT EXISTS idx_screenings_timestamp ON screenings (timestamp);
+CREATE INDEX IF NOT EXISTS idx_screenings_age_mons ON screenings (age_mons);
+CREATE INDEX IF NOT EXISTS idx_screenings_qchat_score ON screenings (qchat_score);
+CREATE INDEX IF NOT EXISTS idx_screenings_prediction ON screenings (prediction);
+"""
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def result_row(result, source='app'):
+    """
+    Map a result_data dict to a row tuple ordered like COLUMNS.
+    """
+    row = {column: result.get(key) for column, key in RESULT_KEYS.items()}
+    row['qchat_score'] = _to_int(row['qchat_score'])
+    row['confidence'] = _to_float(row['confidence'])
+    row['age_mons'] = _to_int(row['age_mons'])
+    row['timestamp'] = row['timestamp'] or time.strftime("%Y-%m-%d %H:%M:%S")
+    row['source'] = source
+    return tuple(row[column] for column in COLUMNS)
+
+
+def connect(path=RESULTS_DB_PATH):
+    """
+    Open the database in WAL mode, creating the schema if needed.
+    Returns: sqlite3 connection.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # Durable at checkpoints; a crash can lose at most the last batches, never corrupt the file
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class ResultStore:
+    """
+    Screening history with non-blocking, batched writes.
+    """
+    def __init__(self, path=RESULTS_DB_PATH, batch_size=64, flush_interval=0.5, max_pending=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._conn = connect(path)
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="result-store-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, result, source='app'):
+        """
+        Queue one result_data dict for writing. Never blocks; if the queue is
+        full the result is dropped and counted.
+        Returns: True if queued.
+        """
+        try:
+            self._queue.put_nowait(result_row(result, source))
+        except queue.Full:
+            self.dropped += 1
+            count_error('result_store_write')
+            logger.error("Result store queue is full; dropping a screening result")
+            return False
+        return True
+
+    def flush(self, timeout=10.0):
+        """
+        Wait until everything queued so far is committed.
+        Returns: True if flushed within timeout.
+        """
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self):
+        if self._thread.is_alive():
+            self.flush()
+
+    def _collect(self):
+        batch, events = [], []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            if isinstance(item, threading.Event):
+                # A flush request: commit what we have now
+                events.append(item)
+                break
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+        return batch, events
+
+    def _run(self):
+        placeholders = ', '.join('?' for _ in COLUMNS)
+        sql = f"INSERT INTO screenings ({', '.join(COLUMNS)}) VALUES ({placeholders})"
+        while True:
+            batch, events = self._collect()
+            if batch:
+                started = time.perf_counter()
+                try:
+                    with self._conn:
+                        self._conn.executemany(sql, batch)
+                except Exception as e:
+                    self.failed += len(batch)
+                    count_error('result_store_write')
+                    logger.error(f"Failed to write {len(batch)} screening results: {e}", exc_info=True)
+                else:
+                    observe('result_store_write', time.perf_counter() - started)
+                    self.written += len(batch)
+            for event in events:
+                event.set()
+
+    def stats(self):
+        return {'written': self.written, 'pending': self._queue.qsize(), 'dropped': self.dropped, 'failed': self.failed}
+
+    def query(self, sql, params=()):
+        """
+        Run a read-only query on a separate connection (does not wait for the writer).
+        Returns: DataFrame.
+        """
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            return pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+
+    def history(self, limit=100, since=None, until=None, prediction=None, min_score=None):
+        """
+        Most recent screenings, newest first, optionally filtered.
+        Returns: DataFrame.
+        """
+        return history(self.path, limit, since, until, prediction, min_score)
+
+
+def history(path=RESULTS_DB_PATH, limit=100, since=None, until=None, prediction=None, min_score=None):
+    """
+    Query the stored screenings without starting a writer. The database is
+    opened read-only, so a query never creates it or its schema.
+    Returns: DataFrame, newest first (empty if nothing was stored yet).
+    """
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['id'] + COLUMNS)
+    clauses, params = [], []
+    if since:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        clauses.append("timestamp < ?")
+        params.append(until)
+    if prediction:
+        clauses.append("prediction = ?")
+        params.append(prediction)
+    if min_score is not None:
+        clauses.append("qchat_score >= ?")
+        params.append(min_score)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = f"SELECT * FROM screenings {where} ORDER BY timestamp DESC, id DESC"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    conn = sqlite3.connect(f"{pathlib.Path(path).resolve().as_uri()}?mode=ro", uri=True, timeout=30)
+    try:
+        return pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the screening result store.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name in ('show', 'export'):
+        cmd = sub.add_parser(name)
+        if name == 'export':
+            cmd.add_argument('output', help="CSV file to write")
+        cmd.add_argument('--limit', type=int, default=20 if name == 'show' else None)
+        cmd.add_argument('--since', default=None, help="Earliest timestamp (YYYY-MM-DD[ HH:MM:SS])")
+        cmd.add_argument('--until', default=None)
+        cmd.add_argument('--prediction', choices=['YES', 'NO'], default=None)
+        cmd.add_argument('--min-score', type=int, default=None)
+    parser.add_argument('--db', default=RESULTS_DB_PATH)
+    args = parser.parse_args(argv)
+
+    df = history(args.db, args.limit, args.since, args.until, args.prediction, args.min_score)
+    if args.command == 'show':
+        print(df.to_string(index=False) if len(df) else "No screenings stored")
+    else:
+        df.to_csv(args.output, index=False)
+        print(f"Exported {len(df)} screenings to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+# retrainer.py
+"""
+Operator retraining with hot-swap of the serving model.
+
+Retraining is an operator task run from the command line, never from the
+public app: the new data is validated like the main dataset, the model is
+registered and promoted, and running apps swap it into their ModelHandle
+on the next page load (follow_registry) without a restart.
+
+Usage:
+    python -m src.core.retrainer new_screenings.csv
+    python -m src.core.retrainer new_screenings.csv --full
+"""
+import argparse
+import logging
+import sys
+import threading
+import time
+
+from src.core.data_loader import load_data
+from src.core.engines import load_engine
+from src.core.errors import ASDError
+from src.core.feature_store import encode_dataset
+from src.core.model_registry import ModelRegistry, dataset_fingerprint, trimmed_counts
+from src.core.model_trainer import MODEL_PARAMS, fit_model, label_counts, update_model
+from src.utils.fingerprint import stable_hash
+from src.utils.metrics import count_error
+
+
+logger = logging.getLogger(__name__)
+
+# Serializes reloads so concurrent page loads swap a new model in only once
+_follow_lock = threading.Lock()
+
+
+class ModelHandle:
+    """
+    Thread-safe holder for the model currently used for serving.
+    """
+    def __init__(self, model, wrap=None, key=None):
+        self._wrap = wrap or (lambda m: m)
+        self._lock = threading.Lock()
+        self._raw = model
+        self._model = self._wrap(model)
+        self.key = key
+        self.version = 0
+
+    def get(self):
+        """
+        Returns: Model to serve predictions with.
+        """
+        return self._model
+
+    def raw(self):
+        """
+        Returns: The underlying fitted estimator (without serving wrappers).
+        """
+        return self._raw
+
+    def swap(self, model, key=None):
+        """
+        Replace the serving model. In-flight predictions finish on the old one.
+        """
+        wrapped = self._wrap(model)
+        with self._lock:
+            self._raw = model
+            self._model = wrapped
+            self.key = key
+            self.version += 1
+
+
+def follow_registry(handle, registry, engine='flat_forest'):
+    """
+    Swap the registry's promoted model into handle if it changed since the
+    handle was filled (e.g. after a retrain or rollback from the command line).
+    A model that fails to load is logged and the current one keeps serving.
+    Returns: True if a new model was swapped in.
+    """
+    key = registry.current_key()
+    if not key or key == handle.key:
+        return False
+    with _follow_lock:
+        if key == handle.key:
+            return False
+        try:
+            handle.swap(load_engine(engine, registry, key), key=key)
+        except Exception as e:
+            count_error('model_reload')
+            logger.error(f"Could not load promoted model {key}; still serving {handle.key}: {e}")
+            return False
+    logger.info(f"Serving newly promoted model {key} (version {handle.version})")
+    return True
+
+
+def retrain(registry, data, incremental=True, n_new_trees=20):
+    """
+    Train on a preprocessed dataset (see load_data), then register and promote
+    the model. incremental=True grows the promoted forest with n_new_trees
+    trees fitted on data; incremental=False fits a fresh forest on data.
+    The entry's label_counts add up every dataset along its lineage, so the
+    balanced class weights of later growth cover all of the forest's data.
+    Returns: Registry key of the new model.
+    Raises: ModelError if there is no model to grow or data lacks a class.
+    """
+    started = time.perf_counter()
+    encoded = encode_dataset(data)
+    counts = label_counts(encoded[1])
+    # Same encoding and digest as the feature store, so ensure_model recognises the data
+    data_sha256 = dataset_fingerprint(encoded)
+    params = dict(MODEL_PARAMS)
+    parent = None
+    if incremental:
+        base = registry.load_model()
+        parent = registry.current_key()
+        prior_counts = registry.meta(parent).get('label_counts')
+        if prior_counts is None:
+            logger.warning(f"Model {parent} has no recorded label counts; balancing the new trees on the new data only")
+        model = update_model(base, data, n_new_trees, prior_counts=prior_counts)
+        if prior_counts is not None:
+            counts[:len(prior_counts)] += prior_counts
+        data_sha256 = stable_hash({'parent': parent, 'data': data_sha256})
+        params.update({'incremental_from': parent, 'n_new_trees': n_new_trees})
+    else:
+        model = fit_model(data)
+    key = registry.key_for(data_sha256, params=params)
+    # A grown forest keeps its parent's engines; a fresh one gets engines fitted on data
+    registry.register(model, key, data_sha256, params, extra={'label_counts': trimmed_counts(counts)},
+                      engine_data=None if incremental else data, engines_from=parent)
+    registry.promote(key)
+    logger.info(f"Retrained {key} on {len(data)} rows in {time.perf_counter() - started:.2f}s")
+    return key
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Retrain the model on labelled screenings and promote it.")
+    parser.add_argument('input', help="CSV with the load_data columns, including Class ASD Traits")
+    parser.add_argument('--full', action='store_true', help="fit a fresh forest on input instead of growing the current one")
+    parser.add_argument('--trees', type=int, default=20, help="trees to add for an incremental retrain")
+    args = parser.parse_args(argv)
+
+    try:
+        # Header stripping and required-column checks of the main dataset
+        data = load_data(args.input)
+        key = retrain(ModelRegistry(), data, incremental=not args.full, n_new_trees=args.trees)
+    except ASDError as e:
+        print(f"Retraining failed: {e}", file=sys.stderr)
+        return 1
+    print(f"Promoted {key} trained on {len(data)} rows; running apps switch to it on their next page load")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
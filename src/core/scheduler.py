@@ -0,0 +1,182 @@
+# scheduler.py
+"""
+Process-wide work scheduling shared by all Streamlit sessions.
+
+PredictionBatcher coalesces single predictions that arrive within a short
+window into one batched predict_proba call. BoundedExecutor runs slower jobs
+(PDF rendering) on a fixed pool and rejects work once too much is pending.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.core.errors import PredictionError, SchedulerBusyError
+from src.core.predictor import encode_features_batch, validate_screening
+from src.core.retrainer import ModelHandle
+from src.utils.metrics import timed
+
+
+logger = logging.getLogger(__name__)
+
+
+class WaitStats:
+    """
+    Thread-safe record of recent queue wait times.
+    """
+    def __init__(self, maxlen=2048):
+        self._waits = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.completed = 0
+
+    def record(self, wait):
+        with self._lock:
+            self._waits.append(wait)
+            self.completed += 1
+
+    def summary(self):
+        """
+        Returns: Dict with completed count and wait percentiles in milliseconds.
+        """
+        with self._lock:
+            waits = np.array(self._waits, dtype=float)
+            completed = self.completed
+        if waits.size == 0:
+            return {'completed': completed, 'wait_ms_p50': 0.0, 'wait_ms_p99': 0.0, 'wait_ms_max': 0.0}
+        p50, p99 = np.percentile(waits, [50, 99]) * 1000
+        return {
+            'completed': completed,
+            'wait_ms_p50': float(p50),
+            'wait_ms_p99': float(p99),
+            'wait_ms_max': float(waits.max() * 1000),
+        }
+
+
+class PredictionBatcher:
+    """
+    Coalesce prediction requests into batched predict_proba calls.
+    model may be a ModelHandle, so hot-swapped models are picked up per batch.
+    """
+    def __init__(self, model, feature_cols, threshold, window=0.005, max_batch=256):
+        self.model_handle = model if isinstance(model, ModelHandle) else ModelHandle(model)
+        self.feature_cols = feature_cols
+        self.threshold = threshold
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._stats = WaitStats()
+        self._worker = threading.Thread(target=self._run, name="prediction-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, answers, jaundice, family_asd, age_mons):
+        """
+        Queue one screening for the next batch.
+        Returns: Future resolving to (qchat_score, ml_result, proba, binary_answers).
+        Raises: PredictionError if the screening cannot be scored as given.
+        """
+        row = validate_screening(answers, jaundice, family_asd, age_mons)
+        future = Future()
+        self._queue.put((time.perf_counter(), row, future))
+        return future
+
+    def predict(self, answers, jaundice, family_asd, age_mons, timeout=None):
+        """
+        Blocking helper with the same result shape as make_prediction.
+        """
+        return self.submit(answers, jaundice, family_asd, age_mons).result(timeout=timeout)
+
+    def stats(self):
+        """
+        Returns: Dict with queue depth, batch count and wait percentiles.
+        """
+        return {'queue_depth': self._queue.qsize(), 'batches': self.batches, **self._stats.summary()}
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            for enqueued, _, _ in batch:
+                self._stats.record(started - enqueued)
+            try:
+                df = pd.DataFrame([row for _, row, _ in batch])
+                features, binary_answers = encode_features_batch(df, self.feature_cols)
+                with timed('predict_proba_batch'):
+                    probas = self.model_handle.get().predict_proba(features)[:, 1]
+                scores = binary_answers.sum(axis=1)
+                for i, (_, _, future) in enumerate(batch):
+                    score = int(scores[i])
+                    ml_result = "YES" if score > self.threshold else "NO"
+                    future.set_result((score, ml_result, probas[i], binary_answers[i].tolist()))
+            except Exception as e:
+                logger.error(f"Batched prediction failed: {e}")
+                error = e if isinstance(e, PredictionError) else PredictionError(f"Prediction failed: {e}")
+                for _, _, future in batch:
+                    future.set_exception(error)
+            self.batches += 1
+
+
+class BoundedExecutor:
+    """
+    Fixed-size worker pool that rejects work once max_pending jobs are queued.
+    """
+    def __init__(self, max_workers=2, max_pending=16, name="bounded"):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._stats = WaitStats()
+
+    def submit(self, fn, *args, block_timeout=1.0):
+        """
+        Run fn(*args) on the pool.
+        Returns: Future with fn's result.
+        Raises: SchedulerBusyError if no slot frees up within block_timeout seconds.
+        """
+        if not self._slots.acquire(timeout=block_timeout):
+            raise SchedulerBusyError(f"Work queue full ({self.max_pending} pending jobs)")
+        with self._lock:
+            self._pending += 1
+        enqueued = time.perf_counter()
+
+        def run():
+            self._stats.record(time.perf_counter() - enqueued)
+            return fn(*args)
+
+        try:
+            future = self._executor.submit(run)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def stats(self):
+        """
+        Returns: Dict with pending job count and wait percentiles.
+        """
+        return {'queue_depth': self._pending, **self._stats.summary()}
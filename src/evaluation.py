@@ -0,0 +1,416 @@
+# evaluation.py
+"""
+Evaluation harness for the Q-CHAT threshold and the Random Forest settings.
+
+Every (parameter set, fold) pair of a k-fold cross-validation is fitted in
+a process pool. Each worker memory-maps the encoded feature cache instead
+of receiving a copy of the data. The out-of-fold probabilities are saved
+per dataset, parameter set and fold layout under EVAL_CACHE_DIR, so that
+re-running an evaluation, or sweeping other cutoffs, needs no refitting.
+
+From the cached predictions, one vectorized pass gives:
+- sensitivity, specificity, PPV, NPV and accuracy for every Q-CHAT
+  threshold (score > threshold) and every probability cutoff (p >= cutoff);
+- a calibration table, the Brier score and ROC AUC for each parameter set.
+
+--engines compares scoring engines (src/core/engines.py) on one held-out
+fold: accuracy, sensitivity, specificity and AUC against per-row latency
+(single screenings and batches) and model size.
+
+Usage:
+    python -m src.evaluation
+    python -m src.evaluation --folds 10 --grid max_depth=3,5,8,None n_estimators=50,100
+    python -m src.evaluation --grid min_samples_leaf=1,5 -o evaluation.json
+    python -m src.evaluation --engines forest,flat_forest,linear,tree
+"""
+import argparse
+import json
+import logging
+import os
+import pickle
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from src.config import DATA_SOURCES, EVAL_CACHE_DIR, FEATURE_COLS, QCHAT_THRESHOLD
+from src.core.encoding import QCHAT_COLS
+from src.core.engines import ENGINES, FITTED_ENGINES
+from src.core.flat_forest import FlatForest
+from src.core.feature_store import dataset_key, load_feature_matrix
+from src.core.model_trainer import MODEL_PARAMS
+from src.utils.fingerprint import stable_hash
+from src.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+QCHAT_THRESHOLDS = np.arange(len(QCHAT_COLS) + 1)
+PROBABILITY_CUTOFFS = np.round(np.linspace(0.0, 1.0, 101), 2)
+
+# Feature matrix of the worker process, loaded once by _init_worker
+_worker_data = None
+
+
+def stratified_folds(y, k=5, seed=0):
+    """
+    Assign every row to one of k folds, keeping the class balance per fold.
+    Returns: int array of fold ids.
+    """
+    y = np.asarray(y)
+    rng = np.random.default_rng(seed)
+    folds = np.empty(len(y), dtype=np.int64)
+    for label in np.unique(y):
+        rows = rng.permutation(np.flatnonzero(y == label))
+        folds[rows] = np.arange(len(rows)) % k
+    return folds
+
+
+def _init_worker(data_path):
+    global _worker_data
+    _worker_data = load_feature_matrix(data_path)
+
+
+def _fit_fold(job):
+    """
+    Fit one parameter set on all folds but one.
+    Returns: (job id, out-of-fold probabilities of the held-out rows).
+    """
+    from sklearn.ensemble import RandomForestClassifier
+
+    job_id, params, folds, fold = job
+    x, y = _worker_data
+    train = folds != fold
+    model = RandomForestClassifier(**params)
+    model.fit(pd.DataFrame(np.asarray(x[train]), columns=FEATURE_COLS), np.asarray(y[train]))
+    held_out = pd.DataFrame(np.asarray(x[~train]), columns=FEATURE_COLS)
+    return job_id, model.predict_proba(held_out)[:, 1].astype(np.float32)
+
+
+def _cache_path(data_key, params, k, seed, cache_dir):
+    return os.path.join(cache_dir, f"{stable_hash({'data': data_key, 'params': params, 'k': k, 'seed': seed})[:20]}.npy")
+
+
+@timed('cross_validate')
+def cross_validate(data_path=DATA_SOURCES, param_sets=None, k=5, seed=0, max_workers=None, cache_dir=EVAL_CACHE_DIR):
+    """
+    Out-of-fold probabilities for each parameter set (merged over MODEL_PARAMS).
+    Cached results are reused; only missing parameter sets are fitted.
+    Returns: Labels, fold ids and a list of out-of-fold probability arrays.
+    Raises: DataLoadError if the dataset cannot be loaded.
+    """
+    param_sets = [{**MODEL_PARAMS, **p, 'n_jobs': 1} for p in (param_sets or [{}])]
+    x, y = load_feature_matrix(data_path)
+    folds = stratified_folds(y, k, seed)
+    data_key = dataset_key(data_path)
+    paths = [_cache_path(data_key, p, k, seed, cache_dir) for p in param_sets]
+    results = [np.load(path) if os.path.exists(path) else None for path in paths]
+    # A cache written while a source file failed validation covers fewer rows
+    results = [r if r is not None and len(r) == len(y) else None for r in results]
+
+    missing = [i for i, r in enumerate(results) if r is None]
+    if missing:
+        oof = {i: np.empty(len(y), dtype=np.float32) for i in missing}
+        jobs = [((i, fold), param_sets[i], folds, fold) for i in missing for fold in range(k)]
+        logger.info(f"Cross-validating {len(missing)} parameter sets x {k} folds in a process pool")
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(data_path,)) as pool:
+            for (i, fold), proba in pool.map(_fit_fold, jobs):
+                oof[i][folds == fold] = proba
+        os.makedirs(cache_dir, exist_ok=True)
+        for i in missing:
+            tmp_path = f"{paths[i]}.{os.getpid()}.tmp.npy"
+            np.save(tmp_path, oof[i])
+            os.replace(tmp_path, paths[i])
+            results[i] = oof[i]
+    return np.asarray(y), folds, results
+
+
+def confusion_by_cutoff(y, values, cutoffs, strict=False):
+    """
+    Confusion counts for every cutoff at once: a row is predicted positive when
+    its value is > cutoff (strict) or >= cutoff.
+    Returns: DataFrame with cutoff, tp, fp, tn and fn columns.
+    """
+    y = np.asarray(y).astype(bool)
+    values = np.asarray(values)
+    side = 'right' if strict else 'left'
+    # Number of rows of each class below each cutoff, from the sorted values
+    pos_below = np.searchsorted(np.sort(values[y]), cutoffs, side=side)
+    neg_below = np.searchsorted(np.sort(values[~y]), cutoffs, side=side)
+    n_pos, n_neg = int(y.sum()), int((~y).sum())
+    return pd.DataFrame({
+        'cutoff': cutoffs,
+        'tp': n_pos - pos_below,
+        'fp': n_neg - neg_below,
+        'tn': neg_below,
+        'fn': pos_below,
+    })
+
+
+def _ratio(num, den):
+    num, den = np.asarray(num, dtype=np.float64), np.asarray(den, dtype=np.float64)
+    return np.divide(num, den, out=np.full(num.shape, np.nan), where=den > 0)
+
+
+def rates(counts):
+    """
+    Add sensitivity, specificity, PPV, NPV, accuracy and Youden's J to confusion counts.
+    Returns: DataFrame.
+    """
+    tp, fp, tn, fn = (counts[c].to_numpy() for c in ('tp', 'fp', 'tn', 'fn'))
+    table = counts.copy()
+    table['sensitivity'] = _ratio(tp, tp + fn)
+    table['specificity'] = _ratio(tn, tn + fp)
+    table['ppv'] = _ratio(tp, tp + fp)
+    table['npv'] = _ratio(tn, tn + fn)
+    table['accuracy'] = _ratio(tp + tn, tp + fp + tn + fn)
+    table['youden'] = table['sensitivity'] + table['specificity'] - 1
+    return table
+
+
+def threshold_sweep(y, scores, thresholds=QCHAT_THRESHOLDS):
+    """
+    Returns: Rates for predicting ASD when the Q-Chat score is > each threshold.
+    """
+    return rates(confusion_by_cutoff(y, scores, thresholds, strict=True)).rename(columns={'cutoff': 'threshold'})
+
+
+def cutoff_sweep(y, proba, cutoffs=PROBABILITY_CUTOFFS):
+    """
+    Returns: Rates for predicting ASD when the probability is >= each cutoff.
+    """
+    return rates(confusion_by_cutoff(y, proba, cutoffs))
+
+
+def calibration_table(y, proba, n_bins=10):
+    """
+    Returns: Per probability bin the row count, mean predicted probability and observed ASD rate.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    proba = np.asarray(proba, dtype=np.float64)
+    bins = np.minimum((proba * n_bins).astype(np.int64), n_bins - 1)
+    count = np.bincount(bins, minlength=n_bins)
+    return pd.DataFrame({
+        'bin_low': np.arange(n_bins) / n_bins,
+        'bin_high': np.arange(1, n_bins + 1) / n_bins,
+        'count': count,
+        'mean_predicted': _ratio(np.bincount(bins, weights=proba, minlength=n_bins), count),
+        'observed_rate': _ratio(np.bincount(bins, weights=y, minlength=n_bins), count),
+    })
+
+
+def roc_auc(y, proba):
+    """
+    ROC AUC from ranks (Mann-Whitney U), ties counted as half.
+    Returns: AUC, or nan if only one class is present.
+    """
+    y = np.asarray(y).astype(bool)
+    n_pos, n_neg = int(y.sum()), int((~y).sum())
+    if not n_pos or not n_neg:
+        return float('nan')
+    ranks = pd.Series(np.asarray(proba)).rank(method='average').to_numpy()
+    return float((ranks[y].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
+
+
+def summarize(y, proba, n_bins=10):
+    """
+    Returns: Dict with AUC, Brier score, expected calibration error, the
+    cutoff with the best Youden's J and the full cutoff and calibration tables.
+    """
+    proba = np.asarray(proba, dtype=np.float64)
+    cutoffs = cutoff_sweep(y, proba)
+    calibration = calibration_table(y, proba, n_bins)
+    filled = calibration['count'] > 0
+    ece = float(np.sum(calibration['count'][filled]
+                       * np.abs(calibration['mean_predicted'][filled] - calibration['observed_rate'][filled])) / len(proba))
+    best = cutoffs.loc[cutoffs['youden'].idxmax()]
+    return {
+        'auc': roc_auc(y, proba),
+        'brier': float(np.mean((proba - np.asarray(y)) ** 2)),
+        'ece': ece,
+        'best_cutoff': float(best['cutoff']),
+        'best_cutoff_sensitivity': float(best['sensitivity']),
+        'best_cutoff_specificity': float(best['specificity']),
+        'cutoffs': cutoffs,
+        'calibration': calibration,
+    }
+
+
+def parse_grid(specs):
+    """
+    Parse ["max_depth=3,5,None", "n_estimators=50,100"] into every combination.
+    Returns: List of parameter dicts.
+    """
+    def parse_value(text):
+        text = text.strip()
+        if text == 'None':
+            return None
+        for cast in (int, float):
+            try:
+                return cast(text)
+            except ValueError:
+                pass
+        return text
+
+    param_sets = [{}]
+    for spec in specs or []:
+        name, sep, values = spec.partition('=')
+        if not sep:
+            raise ValueError(f"Grid entries look like name=v1,v2, got {spec!r}")
+        param_sets = [{**p, name.strip(): parse_value(v)} for p in param_sets for v in values.split(',')]
+    return param_sets
+
+
+def evaluate(data_path=DATA_SOURCES, param_sets=None, k=5, seed=0, max_workers=None):
+    """
+    Cross-validate every parameter set and sweep thresholds and cutoffs.
+    Returns: Dict with the Q-Chat threshold table and one summary per parameter set.
+    Raises: DataLoadError if the dataset cannot be loaded.
+    """
+    param_sets = param_sets or [{}]
+    y, _, results = cross_validate(data_path, param_sets, k, seed, max_workers)
+    x, _ = load_feature_matrix(data_path)
+    scores = np.asarray(x[:, :len(QCHAT_COLS)]).sum(axis=1)
+    return {
+        'rows': len(y),
+        'positives': int(np.sum(y)),
+        'folds': k,
+        'qchat_thresholds': threshold_sweep(y, scores),
+        'models': [{'params': params, **summarize(y, proba)} for params, proba in zip(param_sets, results)],
+    }
+
+
+def _latency_us(fn, X, repeat=5, min_seconds=0.05):
+    """
+    Returns: Median microseconds per row of fn(X).
+    """
+    fn(X)  # warm-up
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(X)
+        if time.perf_counter() - start >= min_seconds / repeat or number >= 1 << 16:
+            break
+        number *= 4
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(X)
+        samples.append((time.perf_counter() - start) / number / len(X) * 1e6)
+    return statistics.median(samples)
+
+
+@timed('compare_engines')
+def compare_engines(data_path=DATA_SOURCES, engines=ENGINES, seed=0, batch_rows=10_000):
+    """
+    Fit every engine on 4/5 of the data and score the remaining fold.
+    Returns: DataFrame with one row per engine.
+    Raises: DataLoadError if the dataset cannot be loaded.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+
+    x, y = load_feature_matrix(data_path)
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.int64)
+    test = stratified_folds(y, 5, seed) == 0
+    forest = None
+    rows = []
+    for name in engines:
+        if name in ('forest', 'flat_forest'):
+            if forest is None:
+                forest = RandomForestClassifier(**MODEL_PARAMS).fit(x[~test], y[~test])
+            model = forest if name == 'forest' else FlatForest.from_model(forest)
+            size = (len(pickle.dumps(forest)) if name == 'forest'
+                    else sum(getattr(model, a).nbytes for a in ('feature', 'threshold', 'left', 'right', 'value', 'roots')))
+        else:
+            model = FITTED_ENGINES[name].fit(x[~test], y[~test])
+            size = model.nbytes
+        proba = model.predict_proba(x[test])[:, 1]
+        at_half = rates(confusion_by_cutoff(y[test], proba, [0.5])).iloc[0]
+        batch = x[test][:batch_rows]
+        rows.append({
+            'engine': name,
+            'accuracy': at_half['accuracy'],
+            'sensitivity': at_half['sensitivity'],
+            'specificity': at_half['specificity'],
+            'auc': roc_auc(y[test], proba),
+            'brier': float(np.mean((proba - y[test]) ** 2)),
+            'single_us': _latency_us(model.predict_proba, x[test][:1]),
+            'batch_us_per_row': _latency_us(model.predict_proba, batch),
+            'size_bytes': size,
+        })
+    return pd.DataFrame(rows)
+
+
+def _to_json(report):
+    def convert(value):
+        if isinstance(value, pd.DataFrame):
+            return json.loads(value.to_json(orient='records'))
+        if isinstance(value, dict):
+            return {k: convert(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [convert(v) for v in value]
+        return value
+    return convert(report)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-validate the model and sweep screening thresholds.")
+    parser.add_argument('--data', default=DATA_SOURCES, help="Dataset files, directories or glob patterns")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--grid', nargs='*', default=[], help="Hyperparameter values, e.g. max_depth=3,5,None")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--engines', default=None,
+                        help=f"Compare scoring engines instead (comma-separated, from {','.join(ENGINES)})")
+    parser.add_argument('-o', '--output', default=None, help="Write the full report as JSON")
+    args = parser.parse_args(argv)
+
+    from src.core.errors import ASDError
+    from src.utils.logging_setup import configure_logging
+
+    configure_logging()
+    start = time.perf_counter()
+    if args.engines:
+        try:
+            engines = [e.strip() for e in args.engines.split(',')]
+            unknown = set(engines) - set(ENGINES)
+            if unknown:
+                raise ValueError(f"Unknown engines: {', '.join(sorted(unknown))}")
+            comparison = compare_engines(args.data, engines, args.seed)
+        except (ASDError, ValueError) as e:
+            print(f"Engine comparison failed: {e}", file=sys.stderr)
+            return 1
+        print(comparison.to_string(index=False, float_format='%.3f'))
+        print(f"\nDone in {time.perf_counter() - start:.1f}s")
+        if args.output:
+            comparison.to_json(args.output, orient='records', indent=2)
+        return 0
+    try:
+        report = evaluate(args.data, parse_grid(args.grid), args.folds, args.seed, args.workers)
+    except (ASDError, ValueError) as e:
+        print(f"Evaluation failed: {e}", file=sys.stderr)
+        return 1
+
+    columns = ['threshold', 'sensitivity', 'specificity', 'ppv', 'npv', 'accuracy']
+    print(f"{report['rows']} rows, {report['positives']} with ASD traits, {report['folds']}-fold CV")
+    print(f"\nQ-Chat threshold (current: score > {QCHAT_THRESHOLD}):")
+    print(report['qchat_thresholds'][columns].to_string(index=False, float_format='%.3f'))
+    print("\nModels (out-of-fold):")
+    summary = pd.DataFrame([{**m['params'], **{k: m[k] for k in ('auc', 'brier', 'ece', 'best_cutoff',
+                            'best_cutoff_sensitivity', 'best_cutoff_specificity')}} for m in report['models']])
+    print(summary.to_string(index=False, float_format='%.3f'))
+    best = min(report['models'], key=lambda m: m['brier'])
+    print(f"\nCalibration of the best-calibrated model {best['params']}:")
+    print(best['calibration'].to_string(index=False, float_format='%.3f'))
+    print(f"\nDone in {time.perf_counter() - start:.1f}s")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(_to_json(report), f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+# service.py
+"""
+Standalone HTTP scoring service (no Streamlit).
+
+Each worker loads the promoted model once on first use; the registry's
+forest arrays are memory-mapped, so workers on one host share them. Run with several workers:
+    gunicorn -w 4 -b 0.0.0.0:8000 src.service:app
+or for local development:
+    python -m src.service --port 8000
+
+Endpoints:
+    GET  /health         -> {"status": "ok"}
+    GET  /metrics        -> per-stage latency histograms and error counts
+                            (Prometheus text format, for the worker that answers)
+    POST /predict        -> {"answers": [10 x "Always".."Never"], "jaundice": "Yes",
+                             "family_asd": "No", "age_mons": 24}
+    POST /predict/batch  -> {"screenings": [{"A1": ..., "A10": ..., "Jaundice": ...,
+                             "Family_mem_with_ASD": ..., "Age_Mons": ...}, ...]}
+    Both accept "explain": true to add per-feature contributions to the probability.
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import pandas as pd
+
+from src.config import FEATURE_COLS, METRICS_FILE, QCHAT_THRESHOLD, SCORING_ENGINE, USE_PROB_TABLE
+from src.core.engines import FOREST_ENGINES, load_engine
+from src.core.errors import ASDError, ModelError, PredictionError
+from src.core.model_registry import ModelRegistry
+from src.core.model_trainer import MODEL_PATH
+from src.core.explainer import explain_features, explain_prediction, top_contributions
+from src.core.predictor import ERRORS_COL, encode_features_batch, make_prediction, make_predictions_batch
+from src.core.prob_table import with_prob_table
+from src.utils.logging_setup import configure_logging
+from src.utils.metrics import observe, render_prometheus, start_metrics_writer, timed
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+_registry = ModelRegistry()
+_model = None
+_model_version = None
+_model_lock = threading.Lock()
+
+
+@timed('get_model')
+def _load_model():
+    key = _registry.current_key()
+    if key:
+        model = load_engine(SCORING_ENGINE, _registry, key)
+        path = _registry.model_path(key)
+    else:
+        import joblib
+
+        model = joblib.load(MODEL_PATH)
+        path = MODEL_PATH
+    logger.info(f"Scoring service loaded model {key or MODEL_PATH} ({SCORING_ENGINE if key else 'forest'} engine)")
+    return with_prob_table(model, path) if USE_PROB_TABLE and (not key or SCORING_ENGINE in FOREST_ENGINES) else model
+
+
+def get_model():
+    """
+    Load the model once per worker process, reloading it when a different
+    model is promoted in the registry (or the legacy model file changes).
+    The registry's forest arrays are memory-mapped, so workers share one copy.
+    Returns: Loaded model.
+    Raises: ModelError if no model can be loaded.
+    """
+    global _model, _model_version
+    try:
+        version = (_registry.pointer_mtime(), os.stat(MODEL_PATH).st_mtime_ns if os.path.exists(MODEL_PATH) else None)
+    except OSError:
+        version = _model_version
+    if _model is None or version != _model_version:
+        with _model_lock:
+            if _model is None or version != _model_version:
+                # Started here rather than at import so each forked worker gets its own writers
+                configure_logging()
+                start_metrics_writer(METRICS_FILE)
+                try:
+                    _model = _load_model()
+                except Exception as e:
+                    raise ModelError(f"Error loading model: {e}") from e
+                _model_version = version
+    return _model
+
+
+def predict_one(payload):
+    """
+    Score a single screening payload.
+    Returns: JSON-serializable result dict.
+    """
+    try:
+        answers = payload['answers']
+        jaundice = payload['jaundice']
+        family_asd = payload['family_asd']
+        age_mons = int(payload['age_mons'])
+    except (KeyError, TypeError, ValueError) as e:
+        raise PredictionError(f"Invalid request body: {e}") from e
+    if not isinstance(answers, list) or len(answers) != 10:
+        raise PredictionError("'answers' must be a list of 10 Q-Chat answers")
+
+    model = get_model()
+    qchat_score, ml_result, proba, binary_answers = make_prediction(
+        model, answers, jaundice, family_asd, age_mons, FEATURE_COLS, QCHAT_THRESHOLD
+    )
+    result = {
+        'qchat_score': int(qchat_score),
+        'prediction': ml_result,
+        'probability': float(proba),
+        'binary_answers': [int(b) for b in binary_answers],
+    }
+    if payload.get('explain'):
+        try:
+            explanation = explain_prediction(model, binary_answers, jaundice, family_asd, age_mons, FEATURE_COLS)
+        except PredictionError as e:
+            # The configured engine has no trees to explain; the score itself is fine
+            result['warning'] = f"Explanation unavailable: {e}"
+        else:
+            result['bias'] = explanation['bias']
+            result['contributions'] = dict(explanation['contributions'])
+    return result
+
+
+def predict_batch(payload):
+    """
+    Score a list of screenings with one predict_proba call.
+    Returns: JSON-serializable result dict.
+    """
+    screenings = payload.get('screenings') if isinstance(payload, dict) else None
+    if not isinstance(screenings, list):
+        raise PredictionError("'screenings' must be a list of records")
+    if not screenings:
+        return {'results': []}
+    model = get_model()
+    df = pd.DataFrame(screenings)
+    results = make_predictions_batch(model, df, FEATURE_COLS, QCHAT_THRESHOLD)
+    response = [
+        {'error': error} if error else {'qchat_score': int(score), 'prediction': pred, 'probability': float(proba)}
+        for score, pred, proba, error in zip(results['Qchat-10 Score'], results['ML Prediction'],
+                                             results['Confidence'], results[ERRORS_COL])
+    ]
+    valid = (results[ERRORS_COL] == '').to_numpy()
+    if payload.get('explain') and valid.any():
+        # One vectorized pass over the scored rows
+        features, _ = encode_features_batch(df.rename(columns=lambda col: str(col).strip()), FEATURE_COLS)
+        try:
+            bias, contributions = explain_features(model, features[valid])
+        except PredictionError as e:
+            return {'results': response, 'warning': f"Explanation unavailable: {e}"}
+        for item, (_, row) in zip([r for r, ok in zip(response, valid) if ok], contributions.iterrows()):
+            item['bias'] = bias
+            item['contributions'] = dict(top_contributions(row))
+    return {'results': response}
+
+
+ROUTES = {
+    ('GET', '/health'): lambda payload: {'status': 'ok'},
+    ('POST', '/predict'): predict_one,
+    ('POST', '/predict/batch'): predict_batch,
+}
+
+
+def _respond(start_response, status, body):
+    data = json.dumps(body).encode('utf-8')
+    start_response(status, [('Content-Type', 'application/json'), ('Content-Length', str(len(data)))])
+    return [data]
+
+
+def _read_json(environ):
+    try:
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+    if length > MAX_BODY_BYTES:
+        raise PredictionError("Request body too large")
+    raw = environ['wsgi.input'].read(length) if length else b''
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw)
+    except ValueError as e:
+        raise PredictionError(f"Invalid JSON: {e}") from e
+
+
+def app(environ, start_response):
+    """WSGI entry point."""
+    method = environ.get('REQUEST_METHOD', 'GET')
+    path = environ.get('PATH_INFO', '/').rstrip('/') or '/'
+    if (method, path) == ('GET', '/metrics'):
+        data = render_prometheus().encode('utf-8')
+        start_response('200 OK', [('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+                                  ('Content-Length', str(len(data)))])
+        return [data]
+    handler = ROUTES.get((method, path))
+    if handler is None:
+        return _respond(start_response, '404 Not Found', {'error': f"No route for {method} {path}"})
+    stage = f"http {method} {path}"
+    started = time.perf_counter()
+    try:
+        response = _respond(start_response, '200 OK', handler(_read_json(environ)))
+        observe(stage, time.perf_counter() - started)
+        return response
+    except PredictionError as e:
+        observe(stage, time.perf_counter() - started, error=True)
+        return _respond(start_response, '400 Bad Request', {'error': str(e)})
+    except ASDError as e:
+        observe(stage, time.perf_counter() - started, error=True)
+        logger.error(f"Scoring service error: {e}")
+        return _respond(start_response, '503 Service Unavailable', {'error': str(e)})
+    except Exception as e:
+        observe(stage, time.perf_counter() - started, error=True)
+        logger.error(f"Unexpected scoring service error: {e}", exc_info=True)
+        return _respond(start_response, '500 Internal Server Error', {'error': 'Internal server error'})
+
+
+def main(argv=None):
+    from socketserver import ThreadingMixIn
+    from wsgiref.simple_server import WSGIServer, make_server
+
+    class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+        daemon_threads = True
+
+    parser = argparse.ArgumentParser(description="ASD scoring HTTP service (development server).")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    get_model()
+    with make_server(args.host, args.port, app, server_class=ThreadingWSGIServer) as server:
+        print(f"Serving ASD scoring on http://{args.host}:{args.port}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+# snapshot.py
+"""
+Warm-start snapshot for fast cold starts.
+
+`build` runs once at image build time. It precompiles bytecode, makes sure
+a model for the current dataset is registered and promoted, checks that the
+flattened serving forest matches the sklearn model on every possible input,
+and bakes the probability table, the chart images and the resized static images. It then writes
+SNAPSHOT_PATH. At startup, a snapshot whose dataset stamp still matches
+lets the app serve the promoted model without loading or hashing the
+dataset. `report` prints an import-time and startup-time breakdown.
+
+Heavy modules are imported inside the functions that need them, so that
+`report` measures a cold process.
+
+Usage:
+    python -m src.snapshot build
+    python -m src.snapshot verify
+    python -m src.snapshot report [-o startup.json]
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import platform
+import sys
+import time
+
+from src.config import DATA_SOURCES, PROB_TABLE_PATH, SCORING_ENGINE, SNAPSHOT_PATH
+
+logger = logging.getLogger(__name__)
+
+COMPILE_TARGETS = ['app.py', 'login.py', 'src', 'pages']
+# Imported when the app starts, in this order
+STARTUP_IMPORTS = ['numpy', 'pandas', 'streamlit', 'src.core.feature_store', 'src.core.model_registry',
+                   'src.core.prob_table', 'src.core.retrainer', 'src.core.scheduler',
+                   'src.utils.assets', 'src.utils.report_generator', 'src.utils.visualizer']
+# Deferred until first used (training, model file loading, chart rendering, PDF rendering)
+DEFERRED_IMPORTS = ['joblib', 'sklearn.ensemble', 'matplotlib.figure', 'PIL.Image', 'fpdf']
+
+
+def source_stamp(path=DATA_SOURCES):
+    """
+    Returns: [file, size, mtime_ns] of every dataset source file, or None if there are none.
+    """
+    from src.core.data_loader import resolve_sources
+    from src.core.errors import DataLoadError
+
+    try:
+        files = resolve_sources(path)
+    except DataLoadError:
+        return None
+    stamps = []
+    for file in files:
+        try:
+            stat = os.stat(file)
+        except OSError:
+            return None
+        stamps.append([os.path.abspath(file), stat.st_size, stat.st_mtime_ns])
+    return stamps
+
+
+def _timed_step(timings, name, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    timings[name] = time.perf_counter() - start
+    logger.info(f"Snapshot step {name}: {timings[name]:.3f}s")
+    return result
+
+
+def compile_sources(targets=COMPILE_TARGETS):
+    """
+    Precompile bytecode so the first import does not have to.
+    Returns: True if every target compiled.
+    """
+    import compileall
+
+    ok = True
+    for target in targets:
+        if os.path.isdir(target):
+            ok = compileall.compile_dir(target, quiet=1) and ok
+        elif os.path.isfile(target):
+            ok = compileall.compile_file(target, quiet=1) and ok
+    return bool(ok)
+
+
+def verify_serving_model(registry, key):
+    """
+    Check the registry entry: model file hash and flattened forest vs sklearn
+    on the whole feature space.
+    Returns: Max absolute probability difference (0.0 when exact).
+    Raises: ModelError if the entry is corrupt or the forests disagree.
+    """
+    import numpy as np
+    from src.core.errors import ModelError
+    from src.core.prob_table import feature_grid, model_probabilities
+    from src.utils.fingerprint import file_fingerprint
+
+    meta = registry.meta(key)
+    if meta.get('model_sha256') != file_fingerprint(registry.model_path(key)):
+        raise ModelError(f"Model file of {key} does not match its registry metadata")
+    grid = feature_grid()
+    expected = model_probabilities(registry.load_model(key), grid)
+    served = registry.load_serving(key).predict_proba(grid)[:, 1]
+    diff = float(np.max(np.abs(expected - served)))
+    if not np.array_equal(expected, served):
+        raise ModelError(f"Serving forest of {key} differs from the model (max abs diff {diff})")
+    return diff
+
+
+def build_snapshot(data_path=DATA_SOURCES, snapshot_path=SNAPSHOT_PATH, compile_targets=COMPILE_TARGETS):
+    """
+    Build the warm-start snapshot (see module docstring).
+    Returns: Snapshot dict as written.
+    Raises: ModelError if no model can be produced or verification fails.
+    """
+    from src.core.engines import FOREST_ENGINES, load_engine
+    from src.core.feature_store import load_feature_matrix
+    from src.core.model_registry import ModelRegistry, ensure_model
+    from src.core.model_trainer import MODEL_PATH
+    from src.core.prob_table import build_table, verify_table
+    from src.utils.assets import prebuild_assets
+    from src.utils.charts import prerender_charts
+
+    timings = {}
+    registry = ModelRegistry()
+    compiled = _timed_step(timings, 'compile', compile_sources, compile_targets) if compile_targets else None
+    features = _timed_step(timings, 'load_features', load_feature_matrix, data_path) if source_stamp(data_path) else None
+    key = _timed_step(timings, 'ensure_model', ensure_model, registry, features, MODEL_PATH)
+    _timed_step(timings, 'verify_model', verify_serving_model, registry, key)
+    if SCORING_ENGINE not in FOREST_ENGINES:
+        _timed_step(timings, 'engine', load_engine, SCORING_ENGINE, registry, key)
+
+    model_path = registry.model_path(key)
+    model = registry.load_model(key)
+    _timed_step(timings, 'prob_table', build_table, model, model_path, PROB_TABLE_PATH)
+    table_ok, _ = verify_table(model, model_path, PROB_TABLE_PATH)
+    _timed_step(timings, 'charts', prerender_charts)
+    _timed_step(timings, 'assets', prebuild_assets)
+
+    meta = registry.meta(key)
+    snapshot = {
+        'key': key,
+        'model_sha256': meta['model_sha256'],
+        'data_path': data_path,
+        'source_stamp': source_stamp(data_path),
+        'prob_table': PROB_TABLE_PATH if table_ok else None,
+        'compiled': compiled,
+        'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'python': platform.python_version(),
+        'sklearn_version': meta.get('sklearn_version'),
+        'scoring_engine': SCORING_ENGINE,
+        'build_seconds': timings,
+    }
+    os.makedirs(os.path.dirname(snapshot_path) or '.', exist_ok=True)
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot, f, indent=2)
+    os.replace(tmp_path, snapshot_path)
+    logger.info(f"Snapshot written to {snapshot_path} (model {key})")
+    return snapshot
+
+
+def load_snapshot(registry, data_path=DATA_SOURCES, snapshot_path=SNAPSHOT_PATH):
+    """
+    Cheap startup check: the snapshot exists, the dataset has not changed
+    since it was built (or is still absent) and the promoted model is present.
+    The promoted model is returned even if it was retrained or promoted after
+    the snapshot was built.
+    Returns: Registry key to serve, or None if the full startup path is needed.
+    """
+    try:
+        with open(snapshot_path) as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if snapshot.get('data_path') != data_path or snapshot.get('source_stamp') != source_stamp(data_path):
+        logger.info("Dataset changed since the snapshot was built; using the full startup path")
+        return None
+    key = registry.current_key()
+    if not key or not os.path.isdir(os.path.join(registry.entry_dir(key), 'forest')):
+        return None
+    return key
+
+
+def startup_report(snapshot_path=SNAPSHOT_PATH):
+    """
+    Time each startup import and step in this (fresh) process.
+    Returns: Dict with 'imports', 'deferred_imports' and 'startup' timings in seconds.
+    """
+    report = {'imports': {}, 'deferred_imports': {}, 'startup': {}}
+    for name in STARTUP_IMPORTS:
+        _timed_step(report['imports'], name, importlib.import_module, name)
+
+    from src.config import FEATURE_COLS, QCHAT_THRESHOLD
+    from src.core.model_registry import ModelRegistry
+    from src.core.predictor import make_prediction
+    from src.core.prob_table import with_prob_table
+    from src.utils.charts import qchat_chart_path
+    from src.utils.report_generator import render_pdf_report
+
+    steps = report['startup']
+    registry = ModelRegistry()
+    key = _timed_step(steps, 'snapshot_check', load_snapshot, registry, DATA_SOURCES, snapshot_path)
+    report['snapshot_valid'] = key is not None
+    key = key or registry.current_key()
+    if key:
+        forest = _timed_step(steps, 'load_serving', registry.load_serving, key)
+        model = _timed_step(steps, 'prob_table', with_prob_table, forest, registry.model_path(key))
+        answers = ['Always', 'Usually', 'Sometimes', 'Rarely', 'Never'] * 2
+        _timed_step(steps, 'first_prediction', make_prediction, model, answers, 'No', 'Yes', 24,
+                    FEATURE_COLS, QCHAT_THRESHOLD)
+    _timed_step(steps, 'first_chart', qchat_chart_path, 5)
+    _timed_step(steps, 'first_pdf', render_pdf_report, {'name': 'Anonymous User', 'Qchat-10 Score': 5})
+
+    # Whatever the steps above did not need is still unloaded
+    for name in DEFERRED_IMPORTS:
+        if name in sys.modules:
+            report['deferred_imports'][name] = 'loaded during startup'
+        else:
+            _timed_step(report['deferred_imports'], name, importlib.import_module, name)
+    report['total_startup_seconds'] = sum(report['imports'].values()) + sum(steps.values())
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and check the warm-start snapshot.")
+    parser.add_argument('command', choices=['build', 'verify', 'report'])
+    parser.add_argument('--data', default=DATA_SOURCES, help="Dataset sources used to train or check the model")
+    parser.add_argument('--no-compile', action='store_true', help="Skip precompiling bytecode")
+    parser.add_argument('-o', '--output', default=None, help="Write the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.command == 'report':
+        report = startup_report()
+        for section in ('imports', 'startup', 'deferred_imports'):
+            print(f"{section}:")
+            for name, value in report[section].items():
+                print(f"  {name:<32} {value * 1000:>9.1f} ms" if isinstance(value, float) else f"  {name:<32} {value}")
+        print(f"snapshot valid: {report['snapshot_valid']}")
+        print(f"total startup: {report['total_startup_seconds']:.3f}s")
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+        return 0
+
+    from src.core.errors import ASDError
+    from src.core.model_registry import ModelRegistry
+    from src.utils.logging_setup import configure_logging
+
+    configure_logging()
+    try:
+        if args.command == 'build':
+            snapshot = build_snapshot(args.data, compile_targets=None if args.no_compile else COMPILE_TARGETS)
+            print(f"Snapshot for model {snapshot['key']} written to {SNAPSHOT_PATH}")
+            for step, seconds in snapshot['build_seconds'].items():
+                print(f"  {step:<16} {seconds:.3f}s")
+            return 0
+        registry = ModelRegistry()
+        key = load_snapshot(registry, args.data)
+        if key is None:
+            print("Snapshot missing or stale")
+            return 1
+        verify_serving_model(registry, key)
+        print(f"OK: snapshot serves model {key}")
+        return 0
+    except ASDError as e:
+        print(f"Snapshot {args.command} failed: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
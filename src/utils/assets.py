@@ -0,0 +1,173 @@
+# assets.py
+"""
+Static images and page style for the Streamlit pages.
+
+Every image is served as a recompressed WebP variant no wider than the
+layout slot it is shown in (ASSET_WIDTHS). Variants are written to
+ASSET_CACHE_DIR, either ahead of time (prebuild_assets, run by
+`python -m src.snapshot build`) or on first use. Each variant file name
+includes the source file's size and mtime, so an edited image gets new
+variants. The encoded bytes are then kept in a byte-bounded in-memory LRU
+shared by all sessions, so a rerun neither touches the disk nor sends
+the full-size original. Streamlit serves identical image bytes under one
+media URL.
+
+The shared page CSS is built once and injected with inject_page_style().
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+from src.config import ASSET_CACHE_DIR, ASSET_MEMORY_BYTES, ASSET_WEBP_QUALITY, ASSET_WIDTHS
+from src.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+STATIC_IMAGES_DIR = r'static/images'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+# Widest image each layout slot can show
+SLOT_WIDTHS = {'centered': 800, 'wide': 1200, 'column': 480}
+
+PAGE_STYLE = ("<style>"
+              ".stApp{font-family:'Segoe UI',Arial,sans-serif;font-size:18px}"
+              "h1{font-family:'Trebuchet MS',Arial,sans-serif;color:white;font-size:2.5em;font-weight:bold}"
+              "</style>")
+
+
+class ByteLRU:
+    """
+    Thread-safe LRU cache bounded by the total size of its bytes values.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._items[key] = value
+            self.bytes += len(value)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def stats(self):
+        return {'items': len(self._items), 'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+_memory = ByteLRU(ASSET_MEMORY_BYTES)
+_build_lock = threading.Lock()
+
+
+def variant_width(width):
+    """
+    Returns: Smallest configured width that covers width (the largest one if none does).
+    """
+    return next((w for w in sorted(ASSET_WIDTHS) if w >= width), max(ASSET_WIDTHS))
+
+
+def variant_path(path, width, cache_dir=ASSET_CACHE_DIR):
+    stat = os.stat(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{stem}-{stat.st_size}-{stat.st_mtime_ns}-w{width}.webp")
+
+
+@timed('build_asset')
+def build_variant(path, width, cache_dir=ASSET_CACHE_DIR):
+    """
+    Write the WebP variant of path at width (never upscaled) if it does not exist.
+    Returns: Variant file path.
+    """
+    out_path = variant_path(path, width, cache_dir)
+    if os.path.exists(out_path):
+        return out_path
+    from PIL import Image
+
+    with _build_lock:
+        if not os.path.exists(out_path):
+            os.makedirs(cache_dir, exist_ok=True)
+            with Image.open(path) as image:
+                image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+                if image.width > width:
+                    image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+                tmp_path = f"{out_path}.{os.getpid()}.tmp"
+                image.save(tmp_path, format='WEBP', quality=ASSET_WEBP_QUALITY, method=6)
+            os.replace(tmp_path, out_path)
+            logger.info(f"Built {out_path} ({os.path.getsize(out_path)} bytes from {os.path.getsize(path)})")
+    return out_path
+
+
+def asset_bytes(path, width=SLOT_WIDTHS['centered']):
+    """
+    Encoded bytes of the variant of path that fits width, from memory when possible.
+    Falls back to the original file if it is smaller or cannot be converted.
+    Returns: Image bytes.
+    """
+    width = variant_width(width)
+    key = (path, width)
+    data = _memory.get(key)
+    if data is not None:
+        return data
+    try:
+        variant = build_variant(path, width)
+        source = variant if os.path.getsize(variant) < os.path.getsize(path) else path
+    except OSError as e:
+        logger.warning(f"Serving original {path}; could not build a variant: {e}")
+        source = path
+    with open(source, 'rb') as f:
+        data = f.read()
+    _memory.put(key, data)
+    return data
+
+
+def image(path, slot='centered', **kwargs):
+    """
+    st.image for a static image, sized for a layout slot ('centered', 'wide' or 'column').
+    """
+    st.image(asset_bytes(path, SLOT_WIDTHS[slot]), **kwargs)
+
+
+def inject_page_style(extra_css=''):
+    """
+    Add the shared page CSS (plus any page-specific rules).
+    """
+    st.markdown(PAGE_STYLE if not extra_css else f"{PAGE_STYLE}<style>{extra_css}</style>", unsafe_allow_html=True)
+
+
+def prebuild_assets(directory=STATIC_IMAGES_DIR, widths=ASSET_WIDTHS):
+    """
+    Build every variant of every image in directory (e.g. at image build time).
+    Returns: Number of variant files.
+    """
+    built = 0
+    for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            for width in widths:
+                build_variant(os.path.join(directory, name), width)
+                built += 1
+    return built
+
+
+def stats():
+    return _memory.stats()
@@ -0,0 +1,91 @@
+# bulk_export.py
+"""
+Bulk export of screening reports as one ZIP archive.
+
+Reports are rendered in parallel across a process pool and written into the
+archive as they complete, in input order. Only a bounded window of rendered
+reports is held before it is written, so memory follows the archive target:
+batch_predict streams to a file on disk, while the Batch page builds the ZIP
+in memory and is capped at BATCH_PAGE_MAX_REPORTS reports.
+"""
+import logging
+import os
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from src.utils.report_generator import render_pdf_report, report_filename
+
+
+logger = logging.getLogger(__name__)
+
+
+def batch_report_data(results, timestamp=None):
+    """
+    Turn make_predictions_batch output into per-child report dicts
+    (same fields as the single-screening report in app.py). Rows that were
+    not scored (a non-empty Errors column) get no report.
+    Yields: Report data dicts.
+    """
+    timestamp = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for _, row in results.iterrows():
+        if row.get('Errors'):
+            continue
+        yield {
+            'name': str(row.get('Case_No', 'Anonymous User')),
+            'email': 'anonymous@example.com',
+            'timestamp': timestamp,
+            'Qchat-10 Score': int(row['Qchat-10 Score']),
+            'ML Prediction': row['ML Prediction'],
+            'Confidence': f"{row['Confidence']:.2f}",
+            'Age (Months)': row.get('Age_Mons', 'N/A'),
+            'Sex': row.get('Sex', 'N/A'),
+            'Ethnicity': row.get('Ethnicity', 'N/A'),
+            'Jaundice': row.get('Jaundice', 'N/A'),
+            'Family with ASD': row.get('Family_mem_with_ASD', 'N/A'),
+            'Who Completed': row.get('Who completed the test', 'N/A'),
+        }
+
+
+def _render_entry(item):
+    index, data = item
+    return f"{index:06d}_{report_filename(data)}", render_pdf_report(data)
+
+
+def export_reports_zip(records, fileobj, total=None, max_workers=None, window=None, progress=None):
+    """
+    Render every report dict in records and stream them into a ZIP written to fileobj.
+    progress(done, total) is called after each report is written.
+    Returns: (written, failed) counts.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    window = window or max_workers * 4
+    written = failed = 0
+    pending = deque()
+
+    # PDF streams are already compressed, so entries are stored as is
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_STORED) as archive, \
+            ProcessPoolExecutor(max_workers=max_workers) as executor:
+
+        def drain_one():
+            nonlocal written, failed
+            name, pdf_bytes = pending.popleft().result()
+            if pdf_bytes is None:
+                failed += 1
+                logger.error(f"Bulk export: failed to render {name}")
+            else:
+                archive.writestr(name, pdf_bytes)
+                written += 1
+            if progress:
+                progress(written + failed, total)
+
+        for item in enumerate(records):
+            pending.append(executor.submit(_render_entry, item))
+            if len(pending) >= window:
+                drain_one()
+        while pending:
+            drain_one()
+
+    logger.info(f"Bulk export finished: {written} reports written, {failed} failed")
+    return written, failed
@@ -0,0 +1,198 @@
+# charts.py
+"""
+Pre-rendered Q-Chat score charts.
+
+The score is an integer from 0 to 10, so only 11 distinct charts exist. Each
+one is rendered once (lazily or via prerender_charts) and then served from
+memory. matplotlib is only imported the first time a chart is rendered.
+
+The Analysis page charts are drawn from the aggregates in src/core/analytics.py
+and cached there until the aggregates change.
+"""
+import functools
+import io
+import logging
+import os
+import threading
+from src.config import CHART_CACHE_DIR
+from src.utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+MAX_SCORE = 10
+# Axis labels for the dataset's Class ASD Traits label and for screening outcomes
+LABEL_OUTCOMES = ("No ASD traits", "ASD traits")
+SCREENING_OUTCOMES = ("Screened negative", "Screened positive")
+_render_lock = threading.Lock()
+_path_lock = threading.Lock()
+
+
+def _check_score(score):
+    if int(score) != score or not 0 <= score <= MAX_SCORE:
+        raise ValueError(f"Q-Chat score must be an integer from 0 to {MAX_SCORE}, got {score}")
+    return int(score)
+
+
+def _chart_file(score, cache_dir=CHART_CACHE_DIR):
+    return os.path.join(cache_dir, f"qchat_{score}.png")
+
+
+@functools.lru_cache(maxsize=MAX_SCORE + 1)
+def _render_png(score):
+    # Charts baked into the image (python -m src.snapshot build) skip matplotlib entirely
+    baked = _chart_file(score)
+    if os.path.exists(baked):
+        with open(baked, 'rb') as f:
+            return f.read()
+    return render_chart_png(score)
+
+
+def render_chart_png(score):
+    """
+    Draw the chart for score with matplotlib, ignoring baked files and the
+    in-memory cache (qchat_chart_png is the cached entry point).
+    Returns: PNG bytes.
+    """
+    score = _check_score(score)
+    # Figure + Agg canvas directly: no pyplot state, safe off the main thread
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    with _render_lock, timed('render_chart'):
+        fig = Figure(figsize=(8, 1.5))
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
+        colors = ['green' if i <= 3 else 'orange' if i <= 6 else 'red' for i in range(MAX_SCORE + 1)]
+        ax.barh([0] * (MAX_SCORE + 1), [1] * (MAX_SCORE + 1), left=range(MAX_SCORE + 1), color=colors)
+        ax.axvline(score, color='blue', linestyle='--', linewidth=2)
+        ax.set_yticks([])
+        ax.set_xticks(range(MAX_SCORE + 1))
+        ax.set_title("Q-Chat-10 Score Visualization")
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', bbox_inches='tight')
+    logger.debug(f"Rendered Q-Chat chart for score {score}")
+    return buf.getvalue()
+
+
+def qchat_chart_png(score):
+    """
+    Returns: PNG bytes of the chart for score, rendered at most once per process.
+    """
+    return _render_png(_check_score(score))
+
+
+def clear_chart_cache():
+    """
+    Forget the charts held in memory, so the next qchat_chart_png call pays
+    what a fresh process does (a baked file read, else a render).
+    """
+    _render_png.cache_clear()
+
+
+def is_baked(score):
+    """
+    Returns: True if the chart for score was baked by python -m src.snapshot build.
+    """
+    return os.path.exists(_chart_file(_check_score(score)))
+
+
+def qchat_chart_path(score, cache_dir=CHART_CACHE_DIR):
+    """
+    Chart as an RGB PNG file on disk (fpdf 1.7 reads images from paths and
+    does not support alpha channels). Written once and reused.
+    Returns: File path.
+    """
+    score = _check_score(score)
+    path = _chart_file(score, cache_dir)
+    if not os.path.exists(path):
+        from PIL import Image
+
+        with _path_lock:
+            if not os.path.exists(path):
+                os.makedirs(cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                Image.open(io.BytesIO(qchat_chart_png(score))).convert('RGB').save(tmp_path, format='PNG')
+                os.replace(tmp_path, path)
+    return path
+
+
+def prerender_charts(cache_dir=CHART_CACHE_DIR):
+    """
+    Render every possible chart up front and write it to cache_dir, where
+    later processes read it without importing matplotlib (python -m src.snapshot build).
+    Returns: List of chart file paths.
+    """
+    return [qchat_chart_path(score, cache_dir) for score in range(MAX_SCORE + 1)]
+
+
+def _figure_png(draw, figsize):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    with _render_lock, timed('render_chart'):
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        draw(fig, fig.subplots())
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', bbox_inches='tight')
+    return buf.getvalue()
+
+
+def score_age_heatmap_png(score_age, age_min):
+    """
+    Heatmap of screening counts per Q-Chat-10 score (rows) and age in months (columns).
+    Returns: PNG bytes.
+    """
+    def draw(fig, ax):
+        image = ax.imshow(score_age, aspect='auto', origin='lower', cmap='YlOrRd')
+        n_ages = len(score_age[0])
+        ticks = range(0, n_ages, 6)
+        ax.set_xticks(list(ticks))
+        ax.set_xticklabels([age_min + t for t in ticks])
+        ax.set_yticks(range(len(score_age)))
+        ax.set_xlabel("Age (months)")
+        ax.set_ylabel("Qchat-10 Score")
+        ax.set_title("Screenings by Q-Chat-10 Score and Age")
+        fig.colorbar(image, ax=ax, label="Screenings")
+    return _figure_png(draw, (10, 5))
+
+
+def family_history_png(asd_family, outcomes=LABEL_OUTCOMES, title="ASD Traits vs Family Members with ASD"):
+    """
+    Grouped bars of negative / positive counts with and without a family member
+    with ASD. asd_family is indexed [outcome, family history]; outcomes names
+    the two outcomes on the x axis.
+    Returns: PNG bytes.
+    """
+    def draw(fig, ax):
+        for family, (label, offset) in enumerate([("No family history", -0.2), ("Family history", 0.2)]):
+            ax.bar([offset, 1 + offset], [asd_family[0][family], asd_family[1][family]], width=0.4, label=label)
+        ax.set_xticks([0, 1])
+        ax.set_xticklabels(list(outcomes))
+        ax.set_ylabel("Screenings")
+        ax.set_title(title)
+        ax.legend()
+    return _figure_png(draw, (8, 4.5))
+
+
+def ethnicity_png(ethnicity, top=8, outcomes=LABEL_OUTCOMES, title="ASD Traits by Ethnicity"):
+    """
+    Grouped bars of negative / positive counts (named by outcomes) for the
+    `top` largest ethnicities; the rest are summed as 'other'.
+    Returns: PNG bytes.
+    """
+    ranked = sorted(ethnicity.items(), key=lambda item: -sum(item[1]))
+    groups = ranked[:top]
+    if len(ranked) > top:
+        groups.append(('other', [sum(c[0] for _, c in ranked[top:]), sum(c[1] for _, c in ranked[top:])]))
+
+    def draw(fig, ax):
+        positions = range(len(groups))
+        ax.bar([p - 0.2 for p in positions], [c[0] for _, c in groups], width=0.4, label=outcomes[0])
+        ax.bar([p + 0.2 for p in positions], [c[1] for _, c in groups], width=0.4, label=outcomes[1])
+        ax.set_xticks(list(positions))
+        ax.set_xticklabels([name for name, _ in groups], rotation=30, ha='right')
+        ax.set_ylabel("Screenings")
+        ax.set_title(title)
+        ax.legend()
+    return _figure_png(draw, (10, 5))
@@ -0,0 +1,23 @@
+# fingerprint.py
+import hashlib
+import json
+
+
+def file_fingerprint(path):
+    """
+    Returns: SHA-256 hex digest of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stable_hash(obj):
+    """
+    Hash a JSON-serializable object independently of dict ordering.
+    Returns: SHA-256 hex digest.
+    """
+    payload = json.dumps(obj, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
@@ -0,0 +1,176 @@
+# logging_setup.py
+"""
+One logging pipeline for the app, the scoring service and the CLIs.
+
+Modules log through logging.getLogger(__name__). configure_logging() puts a
+QueueHandler on the root logger, so a log call on a request thread only
+builds the record and enqueues it; a QueueListener thread formats the
+records as JSON lines and writes them to LOG_FILE. Levels can be set per
+module, and DEBUG records are sampled before they are queued.
+
+Settings (see src/config.py):
+    ASD_LOG_LEVEL=INFO
+    ASD_LOG_LEVELS=src.core.feature_store=DEBUG,src.utils.charts=WARNING
+    ASD_LOG_DEBUG_SAMPLE=100      # keep 1 in 100 DEBUG records per logger
+    ASD_LOG_JSON=0                # plain text lines instead of JSON
+"""
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+from src.config import LOG_DEBUG_SAMPLE, LOG_FILE, LOG_JSON, LOG_LEVEL, LOG_MODULE_LEVELS
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+# Attributes every LogRecord has; anything else was passed via extra=
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_lock = threading.Lock()
+_listener = None
+_queue_handler = None
+_settings = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line, including extra= fields.
+    """
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'thread': record.threadName,
+            'pid': record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep 1 in every `every` records at or below max_level, per logger.
+    Records above max_level always pass.
+    """
+    def __init__(self, every=100, max_level=logging.DEBUG):
+        super().__init__()
+        self.every = max(1, int(every))
+        self.max_level = max_level
+        self._counters = {}
+
+    def filter(self, record):
+        if record.levelno > self.max_level or self.every == 1:
+            return True
+        counter = self._counters.get(record.name)
+        if counter is None:
+            counter = self._counters.setdefault(record.name, itertools.count())
+        # itertools.count is atomic under the GIL, no lock needed
+        return next(counter) % self.every == 0
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue records without formatting them on the calling thread. The
+    message is merged with its args and tracebacks are rendered to text,
+    so the record is self-contained once the caller moves on.
+    """
+    def prepare(self, record):
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_module_levels(spec):
+    """
+    Parse "module=LEVEL,module=LEVEL" into a dict.
+    Returns: Dict of logger name to level name.
+    """
+    levels = {}
+    for item in (spec or '').split(','):
+        name, sep, level = item.partition('=')
+        if sep and name.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _file_handler(log_file, json_format):
+    os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+    # WatchedFileHandler reopens the file after external rotation and is
+    # safe with several processes appending to the same file
+    handler = logging.handlers.WatchedFileHandler(log_file, encoding='utf-8')
+    handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+def _start(log_file, level, module_levels, debug_sample, json_format):
+    global _listener, _queue_handler
+    log_queue = queue.SimpleQueue()
+    _queue_handler = _QueueHandler(log_queue)
+    _queue_handler.addFilter(SamplingFilter(debug_sample))
+    _listener = logging.handlers.QueueListener(log_queue, _file_handler(log_file, json_format))
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+
+def configure_logging(log_file=LOG_FILE, level=LOG_LEVEL, module_levels=None,
+                      debug_sample=LOG_DEBUG_SAMPLE, json_format=LOG_JSON):
+    """
+    Install the queue-based logging pipeline. Safe to call from every entry
+    point: only the first call in a process has an effect.
+    """
+    global _settings
+    with _lock:
+        if _listener is not None:
+            return
+        module_levels = parse_module_levels(LOG_MODULE_LEVELS) if module_levels is None else module_levels
+        _settings = (log_file, level, module_levels, debug_sample, json_format)
+        _start(*_settings)
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """
+    Flush queued records and stop the writer thread.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _restart_in_child():
+    # The writer thread does not survive fork (gunicorn workers, process pools)
+    global _listener, _lock
+    _lock = threading.Lock()
+    if _settings is not None:
+        _listener = None
+        _start(*_settings)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_in_child)
@@ -0,0 +1,251 @@
+# metrics.py
+"""
+Per-stage latency, call and error metrics in Prometheus text format.
+
+Core modules wrap their stages with timed(), as a context manager or a
+decorator. Each observation costs two perf_counter calls and a short locked
+update of a fixed-bucket histogram plus a window of recent samples, from
+which p50/p95/p99 are reported. Metrics are per process: the HTTP service
+serves them on GET /metrics, and start_metrics_writer() writes them to a file
+periodically (e.g. for node_exporter's textfile collector).
+
+Usage:
+    with timed('predict_proba'):
+        ...
+
+    @timed('render_pdf_report')
+    def render(...):
+        ...
+"""
+import bisect
+import functools
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from src.config import METRICS_FILE, METRICS_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES = (0.5, 0.95, 0.99)
+PREFIX = 'asd'
+
+
+class _Stage:
+    __slots__ = ('buckets', 'count', 'total', 'errors', 'recent')
+
+    def __init__(self, n_buckets, window):
+        self.buckets = [0] * (n_buckets + 1)  # last one is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.recent = deque(maxlen=window)
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of per-stage latency histograms and error counts.
+    """
+    def __init__(self, buckets=BUCKETS, window=2048):
+        self.bucket_bounds = tuple(buckets)
+        self.window = window
+        self._stages = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def _stage(self, stage):
+        entry = self._stages.get(stage)
+        if entry is None:
+            entry = self._stages[stage] = _Stage(len(self.bucket_bounds), self.window)
+        return entry
+
+    def observe(self, stage, seconds, error=False):
+        """
+        Record one call of stage that took seconds.
+        """
+        index = bisect.bisect_left(self.bucket_bounds, seconds)
+        with self._lock:
+            entry = self._stage(stage)
+            entry.buckets[index] += 1
+            entry.count += 1
+            entry.total += seconds
+            entry.recent.append(seconds)
+            if error:
+                entry.errors += 1
+
+    def count_error(self, stage):
+        """
+        Record a failure of stage that was handled without raising.
+        """
+        with self._lock:
+            self._stage(stage).errors += 1
+
+    def snapshot(self):
+        """
+        Returns: Dict per stage with count, errors, mean and recent p50/p95/p99 in milliseconds.
+        """
+        with self._lock:
+            stages = {name: (e.count, e.errors, e.total, sorted(e.recent)) for name, e in self._stages.items()}
+        result = {}
+        for name, (count, errors, total, recent) in sorted(stages.items()):
+            result[name] = {
+                'count': count,
+                'errors': errors,
+                'mean_ms': total / count * 1000 if count else 0.0,
+                **{f'p{int(q * 100)}_ms': _quantile(recent, q) * 1000 for q in QUANTILES},
+            }
+        return result
+
+    def render(self):
+        """
+        Returns: All metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            stages = {name: (list(e.buckets), e.count, e.total, e.errors, sorted(e.recent))
+                      for name, e in self._stages.items()}
+        bounds = [_format_float(b) for b in self.bucket_bounds] + ['+Inf']
+        duration = f'{PREFIX}_stage_duration_seconds'
+        errors = f'{PREFIX}_stage_errors_total'
+        quantiles = f'{PREFIX}_stage_duration_recent_seconds'
+        lines = [
+            f'# HELP {duration} Latency of each pipeline stage.',
+            f'# TYPE {duration} histogram',
+        ]
+        for name, (buckets, count, total, _, _) in sorted(stages.items()):
+            label = _escape(name)
+            cumulative = 0
+            for bound, n in zip(bounds, buckets):
+                cumulative += n
+                lines.append(f'{duration}_bucket{{stage="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{duration}_sum{{stage="{label}"}} {_format_float(total)}')
+            lines.append(f'{duration}_count{{stage="{label}"}} {count}')
+        lines += [f'# HELP {errors} Failed calls of each pipeline stage.', f'# TYPE {errors} counter']
+        for name, (_, _, _, n_errors, _) in sorted(stages.items()):
+            lines.append(f'{errors}{{stage="{_escape(name)}"}} {n_errors}')
+        lines += [f'# HELP {quantiles} Latency quantiles over the most recent {self.window} calls of each stage.',
+                  f'# TYPE {quantiles} gauge']
+        for name, (_, _, _, _, recent) in sorted(stages.items()):
+            for q in QUANTILES:
+                lines.append(f'{quantiles}{{stage="{_escape(name)}",quantile="{q}"}} {_format_float(_quantile(recent, q))}')
+        lines += [f'# HELP {PREFIX}_process_start_time_seconds Start time of the process.',
+                  f'# TYPE {PREFIX}_process_start_time_seconds gauge',
+                  f'{PREFIX}_process_start_time_seconds {_format_float(self.started)}']
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _format_float(value):
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REGISTRY = MetricsRegistry()
+
+
+class timed:
+    """
+    Time a stage, as a context manager or as a decorator. A stage that raises
+    is recorded with its latency and counted as an error.
+    """
+    __slots__ = ('stage', 'registry', 'start')
+
+    def __init__(self, stage, registry=None):
+        self.stage = stage
+        self.registry = registry or REGISTRY
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.stage, time.perf_counter() - self.start, error=exc_type is not None)
+        return False
+
+    def __call__(self, fn):
+        stage, registry = self.stage, self.registry
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            # A fresh timer per call keeps the decorator thread-safe
+            with timed(stage, registry):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+def observe(stage, seconds, error=False):
+    REGISTRY.observe(stage, seconds, error)
+
+
+def count_error(stage):
+    REGISTRY.count_error(stage)
+
+
+def snapshot():
+    return REGISTRY.snapshot()
+
+
+def render_prometheus():
+    return REGISTRY.render()
+
+
+def write_metrics_file(path=METRICS_FILE):
+    """
+    Atomically write the current metrics to path ({pid} is replaced by the process id).
+    Returns: Path written.
+    """
+    path = path.format(pid=os.getpid())
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+    return path
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def start_metrics_writer(path=METRICS_FILE, interval=METRICS_INTERVAL):
+    """
+    Write the metrics file every interval seconds from a daemon thread.
+    Started at most once per process and path; an empty path disables it.
+    Returns: The writer thread, or None if disabled.
+    """
+    if not path:
+        return None
+    key = (os.getpid(), path)
+    with _writers_lock:
+        if key in _writers:
+            return _writers[key]
+
+        def run():
+            while True:
+                try:
+                    write_metrics_file(path)
+                except OSError as e:
+                    logger.warning(f"Could not write metrics file {path}: {e}")
+                time.sleep(interval)
+
+        thread = threading.Thread(target=run, name="metrics-writer", daemon=True)
+        thread.start()
+        _writers[key] = thread
+        return thread
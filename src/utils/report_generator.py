@@ -1,39 +1,124 @@
 # report.py
-from fpdf import FPDF
-import os
+import copy
 import logging
+import threading
+from src.utils.charts import qchat_chart_path
+from src.utils.fingerprint import stable_hash
+from src.utils.metrics import count_error, timed
+from src.utils.report_store import get_report_store, report_fields
 
-# Configure logging
-logging.basicConfig(filename="asd_app.log", level=logging.DEBUG, 
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
-def generate_pdf_report(data):
-    try:
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
+_template = None
+_template_lock = threading.Lock()
+_chart_images = {}
+# Optional list of (feature, contribution) pairs from src.core.explainer
+CONTRIBUTIONS_KEY = 'Contributions'
+
+def _build_template():
+    """
+    Build the static part of the report (page, font, title) once.
+    """
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+
+    pdf.cell(200, 10, txt="ASD Prediction Report", ln=1, align='C')
+    pdf.ln(10)
+    return pdf
+
+def _get_template():
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                _template = _build_template()
+    return _template
 
-        pdf.cell(200, 10, txt="ASD Prediction Report", ln=1, align='C')
-        pdf.ln(10)
+def _clone_template(template):
+    """
+    Cheap copy of the template: only the containers fpdf mutates while
+    writing or closing a document are copied, the font metrics are shared.
+    """
+    pdf = copy.copy(template)
+    for name, value in vars(template).items():
+        if isinstance(value, dict):
+            setattr(pdf, name, dict(value))
+    # fpdf stores object numbers in these entries when the document is closed
+    pdf.fonts = {k: dict(v) for k, v in template.fonts.items()}
+    pdf.images = {k: dict(v) for k, v in template.images.items()}
+    pdf.current_font = pdf.fonts.get(pdf.font_family + pdf.font_style, pdf.current_font)
+    return pdf
 
-        for key, value in data.items():
-            pdf.cell(200, 10, txt=f"{key.capitalize()}: {value}", ln=1, align='L')
+def _add_chart(pdf, score):
+    """
+    Place the pre-rendered score chart; each chart file is parsed only once.
+    """
+    path = qchat_chart_path(score)
+    if path not in _chart_images:
+        _chart_images[path] = pdf._parsepng(path)
+    info = dict(_chart_images[path])
+    # Same bookkeeping fpdf's image() does on first use of a file
+    info['i'] = len(pdf.images) + 1
+    pdf.images[path] = info
+    pdf.ln(5)
+    pdf.image(path, x=10, w=190)
 
-        # Safely handle filename (email may be missing)
-        raw_email = data.get('email', 'unknown_user')
-        safe_email_part = raw_email.replace('@', '_').replace('/', '_').replace('\\', '_').replace(':', '_')
-        if not safe_email_part or safe_email_part.lower() == "n/a":
-            safe_email_part = "anonymous"
-        filename = f"asd_report_{safe_email_part}.pdf"
+def _add_contributions(pdf, contributions):
+    pdf.ln(5)
+    pdf.cell(200, 10, txt="Answers with the largest effect on the confidence:", ln=1, align='L')
+    for feature, value in contributions:
+        pdf.cell(200, 8, txt=f"    {feature}: {value:+.3f}", ln=1, align='L')
 
-        output_dir = "reports"
-        os.makedirs(output_dir, exist_ok=True)
-        filepath = os.path.join(output_dir, filename)
+@timed('render_pdf_report')
+def render_pdf_report(data):
+    """
+    Render a report straight to memory from the cached page template.
+    Returns: PDF bytes, or None if rendering fails.
+    """
+    try:
+        pdf = _clone_template(_get_template())
+        for key, value in report_fields(data).items():
+            if key != CONTRIBUTIONS_KEY:
+                pdf.cell(200, 10, txt=f"{key.capitalize()}: {value}", ln=1, align='L')
+        score = data.get('Qchat-10 Score')
+        if score is not None:
+            _add_chart(pdf, score)
+        if data.get(CONTRIBUTIONS_KEY):
+            _add_contributions(pdf, data[CONTRIBUTIONS_KEY])
+        # fpdf 1.7 keeps the document as a latin-1 str
+        return pdf.output(dest='S').encode('latin-1')
+    except Exception as e:
+        logger.error(f"Error rendering PDF report: {e}", exc_info=True)
+        count_error('render_pdf_report')
+        return None
 
-        pdf.output(filepath)
-        logging.info(f"Report generated: {filepath}")
+def report_filename(data):
+    """
+    Per-report file name: the email part plus a hash of the report data,
+    so concurrent anonymous users no longer share one file name.
+    """
+    # Safely handle filename (email may be missing)
+    raw_email = data.get('email', 'unknown_user')
+    safe_email_part = raw_email.replace('@', '_').replace('/', '_').replace('\\', '_').replace(':', '_')
+    if not safe_email_part or safe_email_part.lower() == "n/a":
+        safe_email_part = "anonymous"
+    return f"asd_report_{safe_email_part}_{stable_hash(data)[:12]}.pdf"
+
+def generate_pdf_report(data):
+    """
+    Render the report into the content-addressed report store, reusing the
+    stored file when the same result was reported before.
+    Returns: File path, or None if rendering fails.
+    """
+    try:
+        filepath, _ = get_report_store().get(data, render_pdf_report)
+        if filepath:
+            logger.info(f"Report stored: {filepath}")
         return filepath
 
     except Exception as e:
-        logging.error(f"Error generating PDF report: {e}", exc_info=True)
+        logger.error(f"Error generating PDF report: {e}", exc_info=True)
         return None
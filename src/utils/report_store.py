@@ -0,0 +1,215 @@
+# report_store.py
+"""
+Content-addressed storage for rendered PDF reports.
+
+A report is stored under the SHA-256 of the fields it shows (plus the
+report format version), so identical results map to the same file and are
+rendered only once. The submission timestamp is shown, and keyed, as the
+report date, so the same result reported on the same day shares a file.
+Files are written to a temporary name and published with a hard link,
+so concurrent writers in any process never expose a partial file, and
+when two write the same report the first one wins and only its bytes are
+counted. A read refreshes the file's mtime, which serves as its last-use
+time. Writes enforce the budget:
+- reports unused for longer than max_age are removed (swept at most every
+  sweep_interval seconds; `evict` from cron covers idle stores);
+- whenever the store exceeds max_bytes, the least recently used reports
+  are removed until it is below low_water of max_bytes.
+
+Usage:
+    python -m src.utils.report_store stats
+    python -m src.utils.report_store evict
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+from src.config import REPORTS_DIR, REPORTS_MAX_AGE_DAYS, REPORTS_MAX_BYTES
+from src.utils.fingerprint import stable_hash
+from src.utils.metrics import count_error, timed
+
+logger = logging.getLogger(__name__)
+
+# Bump when the report layout changes, so stored reports are not reused.
+# Version 3 prints the submission date only (see report_fields).
+REPORT_FORMAT_VERSION = 3
+
+
+def report_fields(data):
+    """
+    The fields a report shows: data with the per-second timestamp cut to its date.
+    Returns: Dict.
+    """
+    fields = dict(data)
+    if fields.get('timestamp'):
+        fields['timestamp'] = str(fields['timestamp'])[:10]
+    return fields
+
+
+def report_key(data):
+    """
+    Returns: Content address of the report for data (see report_fields).
+    """
+    return stable_hash({'format': REPORT_FORMAT_VERSION, 'data': report_fields(data)})[:32]
+
+
+class ReportStore:
+    """
+    Disk-bounded, content-addressed report files with LRU and age eviction.
+    """
+    def __init__(self, root=REPORTS_DIR, max_bytes=REPORTS_MAX_BYTES, max_age_days=REPORTS_MAX_AGE_DAYS,
+                 low_water=0.9, sweep_interval=3600):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400 if max_age_days else None
+        self.low_water = low_water
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._last_sweep = None
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        os.makedirs(root, exist_ok=True)
+        self._bytes = self._scan_bytes()
+
+    def path_for(self, key):
+        # Two-character fan-out keeps directories small
+        return os.path.join(self.root, key[:2], f"{key}.pdf")
+
+    def _scan(self):
+        entries = []
+        for shard in os.scandir(self.root):
+            if not shard.is_dir() or len(shard.name) != 2:
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.pdf'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _scan_bytes(self):
+        return sum(size for _, size, _ in self._scan())
+
+    def get(self, data, render):
+        """
+        Stored report for data, rendering and storing it with render(data) if needed.
+        Returns: (path, pdf bytes), or (None, None) if rendering fails.
+        """
+        key = report_key(data)
+        path = self.path_for(key)
+        try:
+            with open(path, 'rb') as f:
+                pdf_bytes = f.read()
+            os.utime(path)
+            self.hits += 1
+            return path, pdf_bytes
+        except FileNotFoundError:
+            pass
+        self.misses += 1
+        pdf_bytes = render(data)
+        if pdf_bytes is None:
+            return None, None
+        try:
+            self._write(path, pdf_bytes)
+        except OSError as e:
+            count_error('report_store_write')
+            logger.error(f"Could not store report {key}: {e}")
+            return None, pdf_bytes
+        return path, pdf_bytes
+
+    @timed('report_store_write')
+    def _write(self, path, pdf_bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(pdf_bytes)
+        try:
+            # Unlike os.replace, link fails if another writer published the report first
+            os.link(tmp_path, path)
+            created = True
+        except FileExistsError:
+            created = False
+        finally:
+            os.remove(tmp_path)
+        with self._lock:
+            if created:
+                self._bytes += len(pdf_bytes)
+            over_budget = self.max_bytes and self._bytes > self.max_bytes
+            sweep_due = self.max_age is not None and (
+                self._last_sweep is None or time.time() - self._last_sweep >= self.sweep_interval)
+        if over_budget or sweep_due:
+            self.evict()
+
+    @timed('report_store_evict')
+    def evict(self, now=None):
+        """
+        Remove expired reports, then the least recently used until under budget.
+        Other processes may evict the same files concurrently; missing files are skipped.
+        Returns: Number of reports removed.
+        """
+        now = now or time.time()
+        with self._lock:
+            self._last_sweep = now
+            entries = sorted(self._scan())
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * self.low_water if self.max_bytes else None
+            removed = 0
+            for mtime, size, path in entries:
+                expired = self.max_age is not None and now - mtime > self.max_age
+                if not expired and (target is None or total <= target):
+                    break
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                total -= size
+            self._bytes = total
+            self.evicted += removed
+        if removed:
+            logger.info(f"Evicted {removed} stored reports; {total / 1e6:.1f} MB remain in {self.root}")
+        return removed
+
+    def stats(self):
+        return {'bytes': self._bytes, 'max_bytes': self.max_bytes, 'hits': self.hits, 'misses': self.misses,
+                'evicted': self.evicted}
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_report_store():
+    """
+    Returns: The process-wide ReportStore with the configured directory and budget.
+    """
+    global _default_store
+    if _default_store is None:
+        with _default_lock:
+            if _default_store is None:
+                _default_store = ReportStore()
+    return _default_store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and trim the report store.")
+    parser.add_argument('command', choices=['stats', 'evict'])
+    parser.add_argument('--root', default=REPORTS_DIR)
+    args = parser.parse_args(argv)
+
+    store = ReportStore(args.root)
+    if args.command == 'evict':
+        print(f"Removed {store.evict()} reports")
+    entries = store._scan()
+    print(f"{len(entries)} reports, {store._bytes / 1e6:.1f} MB of {store.max_bytes / 1e6:.1f} MB budget in {args.root}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
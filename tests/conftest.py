@@ -0,0 +1,28 @@
+# conftest.py
+"""
+Shared fixtures: a small synthetic dataset and a forest fitted on it.
+
+Run from the repository root with `python -m pytest`.
+"""
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_screenings
+from src.core.data_loader import preprocess_data
+from src.core.model_trainer import fit_model, prepare_training_data
+
+
+@pytest.fixture(scope='session')
+def screenings():
+    return preprocess_data(generate_screenings(2000, seed=1))
+
+
+@pytest.fixture(scope='session')
+def forest(screenings):
+    return fit_model(screenings, n_estimators=20, n_jobs=1)
+
+
+@pytest.fixture(scope='session')
+def features(screenings):
+    x, _ = prepare_training_data(screenings)
+    return x.to_numpy(dtype=np.float64)
@@ -0,0 +1,35 @@
+# test_feature_store.py
+import json
+import os
+
+import numpy as np
+
+from benchmarks.synthetic import generate_screenings
+from src.core.feature_store import load_feature_matrix
+
+
+def write_sources(tmp_path):
+    sources = tmp_path / 'sources'
+    sources.mkdir()
+    for i in range(2):
+        generate_screenings(300, seed=i).to_csv(sources / f'clinic{i}.csv', index=False)
+    generate_screenings(300, seed=2).drop(columns=['Age_Mons']).to_csv(sources / 'clinic2.csv', index=False)
+    return sources
+
+
+def test_merged_entry_references_parts_and_retries_failures(tmp_path):
+    sources, cache_dir = write_sources(tmp_path), str(tmp_path / 'cache')
+    x, y = load_feature_matrix(str(sources), cache_dir, max_workers=1)
+    assert x.shape == (600, 13) and len(y) == 600
+
+    entries = [name for name in os.listdir(cache_dir) if os.path.isdir(os.path.join(cache_dir, name))]
+    merged = [name for name in entries if 'parts' in json.load(open(os.path.join(cache_dir, name, 'meta.json')))]
+    assert len(entries) == 3 and len(merged) == 1
+    # The merged entry only names its parts; the matrix is stored once
+    assert os.listdir(os.path.join(cache_dir, merged[0])) == ['meta.json']
+
+    # The invalid file was not cached as a failure: once fixed, it is picked up
+    generate_screenings(300, seed=2).to_csv(sources / 'clinic2.csv', index=False)
+    x, y = load_feature_matrix(str(sources), cache_dir, max_workers=1)
+    assert x.shape == (900, 13)
+    np.testing.assert_array_equal(y[:600], load_feature_matrix(str(sources / 'clinic[01].csv'), cache_dir)[1])
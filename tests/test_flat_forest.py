@@ -0,0 +1,23 @@
+# test_flat_forest.py
+import numpy as np
+
+from src.core.flat_forest import FlatForest
+from src.core.prob_table import feature_grid
+
+
+def test_predict_proba_matches_sklearn(forest, features):
+    flat = FlatForest.from_model(forest)
+    np.testing.assert_array_equal(flat.predict_proba(features), forest.predict_proba(features))
+
+
+def test_memory_mapped_copy_matches_sklearn(forest, tmp_path):
+    FlatForest.from_model(forest).save(str(tmp_path / 'forest'))
+    flat = FlatForest.load(str(tmp_path / 'forest'), mmap_mode='r')
+    grid = feature_grid()
+    np.testing.assert_array_equal(flat.predict_proba(grid), forest.predict_proba(grid))
+    np.testing.assert_array_equal(flat.classes_, forest.classes_)
+
+
+def test_block_boundaries_do_not_change_results(forest, features):
+    flat = FlatForest.from_model(forest)
+    np.testing.assert_array_equal(flat.predict_proba(features, block_size=7), flat.predict_proba(features))
@@ -0,0 +1,55 @@
+# test_model_registry.py
+import os
+
+import numpy as np
+import pytest
+
+from src.core.errors import ModelError
+from src.core.model_registry import ModelRegistry, dataset_fingerprint, ensure_model
+from src.core.model_trainer import fit_model
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path / 'registry'))
+
+
+def test_promote_and_rollback(registry, forest, screenings):
+    first = registry.register(forest, 'first')
+    second = registry.register(fit_model(screenings, n_estimators=5, n_jobs=1), 'second')
+    registry.promote(first)
+    registry.promote(second)
+    assert registry.current_key() == second
+    assert len(registry.load_serving().roots) == 5
+
+    assert registry.rollback() == first
+    assert registry.current_key() == first
+    assert len(registry.load_serving().roots) == len(forest.estimators_)
+    with pytest.raises(ModelError):
+        registry.rollback()
+
+
+def test_promote_unknown_key_fails(registry):
+    with pytest.raises(ModelError):
+        registry.promote('missing')
+    assert registry.current_key() is None
+
+
+def test_serving_copy_matches_registered_model(registry, forest, features):
+    registry.promote(registry.register(forest, 'served'))
+    np.testing.assert_array_equal(registry.load_serving().predict_proba(features), forest.predict_proba(features))
+
+
+def test_ensure_model_reuses_the_entry_for_the_same_data(registry, screenings):
+    small = screenings.head(300)
+    key = ensure_model(registry, small)
+    assert registry.meta(key)['data_sha256'] == dataset_fingerprint(small)
+    assert ensure_model(registry, small.copy()) == key
+    assert [meta['key'] for meta in registry.list()] == [key]
+
+
+def test_failed_register_leaves_no_temp_dir(registry, forest):
+    registry.register(forest, 'first')
+    with pytest.raises(Exception):
+        registry.register(object(), 'broken')
+    assert sorted(os.listdir(registry.root)) == ['first']
@@ -0,0 +1,66 @@
+# test_packed.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.config import FEATURE_COLS
+from src.core.data_loader import load_data
+from src.core.encoding import QCHAT_COLS
+from src.core.errors import DataLoadError
+from src.core.model_trainer import prepare_training_data
+from src.core.packed import PackedRecords
+from src.core.predictor import make_predictions_batch
+
+
+def test_frame_round_trip(screenings):
+    x, y = prepare_training_data(screenings)
+    records = PackedRecords.from_frame(screenings)
+    np.testing.assert_array_equal(records.features(), x.to_numpy())
+    np.testing.assert_array_equal(records.labels(), y.to_numpy())
+    np.testing.assert_array_equal(records.qchat_scores(), x[FEATURE_COLS[:10]].sum(axis=1).to_numpy())
+    frame = records.to_frame()
+    np.testing.assert_array_equal(frame[FEATURE_COLS].to_numpy(), x.to_numpy())
+    np.testing.assert_array_equal(frame['Class ASD Traits'].to_numpy(), y.to_numpy())
+
+
+def test_features_round_trip(screenings):
+    x, y = prepare_training_data(screenings)
+    records = PackedRecords.from_features(x.to_numpy(), y.to_numpy())
+    np.testing.assert_array_equal(records.features(), x.to_numpy())
+    np.testing.assert_array_equal(records.labels(), y.to_numpy())
+    assert records.nbytes == 3 * len(records)
+
+
+def test_save_load_and_concat(screenings, tmp_path):
+    records = PackedRecords.from_frame(screenings)
+    path = str(tmp_path / 'records.npz')
+    records.save(path)
+    loaded = PackedRecords.load(path)
+    np.testing.assert_array_equal(loaded.bits, records.bits)
+    np.testing.assert_array_equal(loaded.age, records.age)
+    joined = PackedRecords.concat([records[:100], records[100:]])
+    np.testing.assert_array_equal(joined.bits, records.bits)
+    assert len(PackedRecords.concat([])) == 0
+
+
+def test_unlabeled_batch_flags_invalid_rows(forest, tmp_path):
+    rows = pd.DataFrame({col: ['sometimes'] * 4 for col in QCHAT_COLS})
+    rows['Jaundice'] = ['yes', 'no', 'no', 'no']
+    rows['Family_mem_with_ASD'] = ['no', 'yes', 'no', 'no']
+    rows['Age_Mons'] = [24, 999, 30, 6]
+    rows.loc[2, 'A3'] = 'banana'
+    path = tmp_path / 'unlabeled.csv'
+    rows.to_csv(path, index=False)
+
+    records = load_data(str(path), packed=True)
+    assert not records.has_labels
+    assert 'Class ASD Traits' not in records.to_frame().columns
+    with pytest.raises(DataLoadError):
+        records.labels()
+    # 999 does not fit the age byte and is stored as 0, not clipped to 255
+    assert records.age[1] == 0
+
+    results = make_predictions_batch(forest, records, FEATURE_COLS, threshold=3)
+    assert list(results['ML Prediction']) == ['YES', 'INVALID', 'INVALID', 'INVALID']
+    assert list(results['Errors']) == ['', 'Age_Mons invalid', 'A1-A10 invalid', 'Age_Mons invalid']
+    assert results['Confidence'].notna().tolist() == [True, False, False, False]
@@ -0,0 +1,40 @@
+# test_prob_table.py
+import joblib
+import numpy as np
+import pytest
+from sklearn.base import clone
+
+from src.config import AGE_MAX
+from src.core.prob_table import TabulatedModel, build_table, feature_grid, verify_table, with_prob_table
+
+
+@pytest.fixture
+def table_paths(forest, tmp_path):
+    model_path = str(tmp_path / 'model.joblib')
+    table_path = str(tmp_path / 'model.probtable.npy')
+    joblib.dump(forest, model_path)
+    build_table(forest, model_path, table_path)
+    return model_path, table_path
+
+
+def test_table_matches_forest_on_every_input(forest, table_paths):
+    model = with_prob_table(forest, *table_paths)
+    assert isinstance(model, TabulatedModel)
+    grid = feature_grid()
+    # The table stores P(ASD); the other column is derived as 1 - P(ASD)
+    np.testing.assert_array_equal(model.predict_proba(grid)[:, 1], forest.predict_proba(grid)[:, 1])
+    assert verify_table(forest, *table_paths) == (True, 0.0)
+
+
+def test_out_of_range_rows_fall_back_to_forest(forest, features, table_paths):
+    model = with_prob_table(forest, *table_paths)
+    rows = features[:50].copy()
+    rows[::2, 12] = AGE_MAX + 6
+    np.testing.assert_array_equal(model.predict_proba(rows)[:, 1], forest.predict_proba(rows)[:, 1])
+
+
+def test_stale_table_is_ignored(forest, table_paths):
+    model_path, table_path = table_paths
+    # A different model file at the same path invalidates the table
+    joblib.dump(clone(forest).set_params(n_estimators=5), model_path)
+    assert with_prob_table(forest, model_path, table_path) is forest
@@ -0,0 +1,63 @@
+# test_report_store.py
+import os
+import time
+
+import pytest
+
+from src.utils.report_store import ReportStore, report_key
+
+REPORT = {'name': 'Anonymous User', 'timestamp': '2025-01-01 12:00:00', 'Qchat-10 Score': 6, 'ML Prediction': 'YES'}
+
+
+def render(data):
+    return b'%PDF' + bytes(996)
+
+
+def set_mtime(path, seconds_ago):
+    stamp = time.time() - seconds_ago
+    os.utime(path, (stamp, stamp))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ReportStore(str(tmp_path / 'reports'), max_bytes=10_000, max_age_days=1, low_water=0.5)
+
+
+def test_same_fields_share_a_report(store):
+    later = dict(REPORT, timestamp='2025-01-01 18:30:00')
+    assert report_key(later) == report_key(REPORT)
+    assert report_key(dict(REPORT, timestamp='2025-01-02 12:00:00')) != report_key(REPORT)
+    path, _ = store.get(REPORT, render)
+    assert store.get(later, render)[0] == path
+    assert (store.hits, store.misses) == (1, 1)
+
+
+def test_over_budget_evicts_least_recently_used(store):
+    paths = [store.get(dict(REPORT, **{'Qchat-10 Score': score}), render)[0] for score in range(9)]
+    for age, path in enumerate(reversed(paths)):
+        set_mtime(path, 60 * (age + 1))
+    # Reading the oldest report makes it the most recently used
+    store.get(dict(REPORT, **{'Qchat-10 Score': 0}), render)
+    store.get(dict(REPORT, **{'Qchat-10 Score': 9}), render)
+    assert store.stats()['evicted'] == 0
+    # The 11th report exceeds max_bytes: trim to low_water (5 reports)
+    store.get(dict(REPORT, **{'Qchat-10 Score': 10}), render)
+    assert store.stats()['bytes'] == 5_000
+    assert os.path.exists(paths[0])
+    assert not os.path.exists(paths[1])
+    assert os.path.exists(paths[8])
+
+
+def test_expired_reports_are_swept_on_write(store):
+    old, _ = store.get(REPORT, render)
+    set_mtime(old, 2 * 86400)
+    store._last_sweep = time.time() - store.sweep_interval
+    store.get(dict(REPORT, **{'Qchat-10 Score': 1}), render)
+    assert not os.path.exists(old)
+    assert store.stats()['bytes'] == 1000
+
+
+def test_rewriting_an_existing_report_is_counted_once(store):
+    path, _ = store.get(REPORT, render)
+    store._write(path, render(REPORT))
+    assert store.stats()['bytes'] == 1000
@@ -0,0 +1,43 @@
+# test_service.py
+import io
+import json
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+
+from src import service
+
+SCREENING = {'answers': ['sometimes'] * 10, 'jaundice': 'No', 'family_asd': 'Yes', 'age_mons': 24}
+
+
+def post(path, payload):
+    body = json.dumps(payload).encode('utf-8')
+    environ = {'REQUEST_METHOD': 'POST', 'PATH_INFO': path, 'CONTENT_LENGTH': str(len(body)),
+               'wsgi.input': io.BytesIO(body)}
+    setup_testing_defaults(environ)
+    status = []
+    response = service.app(environ, lambda s, headers: status.append(s))
+    return status[0], json.loads(b''.join(response))
+
+
+@pytest.fixture(autouse=True)
+def model(monkeypatch, forest):
+    monkeypatch.setattr(service, 'get_model', lambda: forest)
+
+
+def test_predict_scores_a_valid_screening():
+    status, body = post('/predict', SCREENING)
+    assert status == '200 OK'
+    assert body['qchat_score'] == 10 and body['prediction'] == 'YES'
+
+
+@pytest.mark.parametrize('field, value', [
+    ('answers', ['banana'] * 10),
+    ('jaundice', 'maybe'),
+    ('family_asd', 'maybe'),
+    ('age_mons', 999),
+])
+def test_predict_rejects_invalid_screenings(field, value):
+    status, body = post('/predict', dict(SCREENING, **{field: value}))
+    assert status == '400 Bad Request'
+    assert body['error'].startswith('Invalid screening')